@@ -1,55 +1,260 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+import atexit
 import datetime
+import hashlib
+import json
 import logging
+import os
 
-from google_list_scraper import GoogleMapsScraper
-from google_restaurant_info import GoogleRestaurantInfo
+from area_filter import AreaFilter
+from driver_pool import DriverPool
+from google_restaurant_info import GoogleRestaurantInfo, PlacesCache
+from http_prepass import HttpPrepass
+from model_gateway import get_gateway
+from reservation_url_store import ReservationUrlStore
+from restaurant_catalogue import RestaurantCatalogue
 from restaurant_filter import RestaurantFilter
+from search_jobs import JobQueue, JobQueueFull
+from tab_browser import TabBrowser
+from walker_farm import WalkerFarm
+from sqlite_cache import SqliteCache
+from ttl_cache import TTLCache
 
 # Configure logging
 logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 app = Flask(__name__)
 
+# Number of restaurant websites walked at once and the time each one is given
+FILTER_CONCURRENCY = int(os.getenv("FILTER_CONCURRENCY", 4))
+SITE_TIMEOUT = float(os.getenv("SITE_TIMEOUT", 90))
+
+# Browsers are shared between requests so Chrome startup is not paid per restaurant
+driver_pool = DriverPool(size=int(os.getenv("DRIVER_POOL_SIZE", FILTER_CONCURRENCY)),
+                         max_uses=int(os.getenv("DRIVER_MAX_USES", 20)))
+atexit.register(driver_pool.shutdown)
+
+# With WALKER_TABS set, websites are walked as tabs of one browser instead of a browser each
+WALKER_TABS = int(os.getenv("WALKER_TABS", 0))
+if WALKER_TABS:
+    walker_browsers = TabBrowser(tabs=WALKER_TABS, max_uses=int(os.getenv("WALKER_TAB_MAX_USES", 50)))
+    atexit.register(walker_browsers.shutdown)
+else:
+    walker_browsers = driver_pool
+
+# Places answers persist across requests and restarts
+places_cache = PlacesCache(os.getenv("PLACES_CACHE_PATH", "places_cache.sqlite3"),
+                           max_entries=int(os.getenv("PLACES_CACHE_MAX_ENTRIES", 10000)))
+
+# Reservation pages found by earlier walks, shared by every walker and worker
+reservation_urls = ReservationUrlStore(os.getenv("RESERVATION_URLS_PATH", "reservation_urls.sqlite3"))
+reservation_urls.warm_load()
+
+# Times recently found on each website, so repeated searches skip the walk
+AVAILABILITY_TTL = float(os.getenv("AVAILABILITY_TTL", 300))
+availability_cache = TTLCache(
+    ttl=AVAILABILITY_TTL,
+    max_entries=int(os.getenv("AVAILABILITY_CACHE_MAX_ENTRIES", 1024)),
+    persistent=SqliteCache(os.environ["AVAILABILITY_CACHE_PATH"], "availability", ttl=AVAILABILITY_TTL)
+    if os.getenv("AVAILABILITY_CACHE_PATH") else None
+)
+
+# With WALKER_PROCESSES set, websites are walked in worker processes that are
+# killed when they overrun SITE_TIMEOUT, so a hung browser cannot stall a search
+WALKER_PROCESSES = int(os.getenv("WALKER_PROCESSES", 0))
+
+# Model answers for pages that look the same, e.g. a booking widget's landing page.
+# Worker processes can only share them through SQLite, so the farm always gets a file.
+MODEL_CACHE_TTL = float(os.getenv("MODEL_CACHE_TTL", 24 * 3600))
+MODEL_CACHE_PATH = os.getenv("MODEL_CACHE_PATH") or ("model_responses.sqlite3" if WALKER_PROCESSES else None)
+model_response_cache = TTLCache(
+    ttl=MODEL_CACHE_TTL,
+    max_entries=int(os.getenv("MODEL_CACHE_MAX_ENTRIES", 1024)),
+    persistent=SqliteCache(MODEL_CACHE_PATH, "model_responses", ttl=MODEL_CACHE_TTL,
+                           max_entries=int(os.getenv("MODEL_CACHE_MAX_ENTRIES", 1024)) * 10)
+    if MODEL_CACHE_PATH else None
+)
+
+# Each worker gets its share of the model rate limits and reads the shared model cache
+walker_farm = WalkerFarm(workers=WALKER_PROCESSES, site_timeout=SITE_TIMEOUT,
+                         max_steps=int(os.getenv("WALKER_MAX_STEPS", 5)),
+                         max_jobs=int(os.getenv("WALKER_MAX_JOBS", 20)),
+                         response_cache_path=MODEL_CACHE_PATH,
+                         response_cache_ttl=MODEL_CACHE_TTL) if WALKER_PROCESSES else None
+if walker_farm is not None:
+    atexit.register(walker_farm.shutdown)
+
+# Websites are first fetched without a browser, over one pool of connections
+http_prepass = HttpPrepass(pool_size=max(8, FILTER_CONCURRENCY * 2))
+
+# The Google Maps list is scraped in the background, requests read the latest snapshot
+MAPS_LIST_URL = os.getenv("MAPS_LIST_URL", 'https://maps.app.goo.gl/SS8F4pbUHVw29FRv6')
+catalogue = RestaurantCatalogue(MAPS_LIST_URL, driver_pool, places_cache=places_cache,
+                                path=os.getenv("CATALOGUE_PATH", "catalogue.sqlite3"),
+                                refresh_interval=float(os.getenv("CATALOGUE_REFRESH_INTERVAL", 6 * 3600)))
+catalogue.start()
+atexit.register(catalogue.stop)
+# Seconds a request waits for the very first snapshot after startup
+CATALOGUE_WAIT = float(os.getenv("CATALOGUE_WAIT", 60))
+
 @app.route("/")
 def index():
     # Serve the HTML file
     return render_template("index.html") 
 
+def _parse_search(data):
+    """
+    Reads the dining time and map selection of a search request.
+
+    :return: A (dining_time, geometry) tuple, or None if the input is invalid.
+    """
+    dining_time = data.get("dining_time") if data else None
+    selected_area = data.get("map_selection") if data else None
+
+    if not dining_time or not selected_area:
+        return None
+
+    # Parse dining time
+    dining_time = datetime.datetime.strptime(dining_time, "%H:%M").time()
+    return dining_time, selected_area['geometry']
+
+def _time_filter(restaurants):
+    """
+    Creates the RestaurantFilter that checks the websites of the given restaurants.
+    """
+    # One instance per search so no place is looked up twice
+    google_maps_api = GoogleRestaurantInfo(cache=places_cache)
+    return RestaurantFilter(restaurants, driver_pool=walker_browsers, places=google_maps_api,
+                            reservation_urls=reservation_urls, availability_cache=availability_cache,
+                            response_cache=model_response_cache, http_prepass=http_prepass,
+                            walker_farm=walker_farm)
+
 @app.route("/filter-restaurants", methods=["POST"])
 def filter_restaurants():
     """
     Receives map selection and dining time from the frontend, 
     filters restaurants, and returns the filtered list.
+
+    If the request has "stream": true, the response is newline delimited JSON
+    instead: an "area" event with the restaurants inside the area, then a
+    "restaurant" event as each one is checked, then a "summary" event.
     """
     data = request.json
-    dining_time = data.get("dining_time")
-    selected_area = data.get("map_selection")  
-
-    if not dining_time or not selected_area:
+    search = _parse_search(data)
+    if search is None:
         return jsonify({"error": "Invalid input"}), 400
+    dining_time, geometry = search
 
-    # Parse dining time
-    dining_time = datetime.datetime.strptime(dining_time, "%H:%M").time()
-
-    # Grab the restaurant names from the Google Maps URL
-    url = 'https://maps.app.goo.gl/SS8F4pbUHVw29FRv6'
-    scraper = GoogleMapsScraper()
-    restaurant_names = scraper.get_restaurant_names(url)
-    google_maps_api = GoogleRestaurantInfo()
-    restaurants = google_maps_api.get_details_from_queries(restaurant_names)
-
-    # Filter restaurants based on time
-    restaurant_filter = RestaurantFilter(restaurants)
-    logging.info(f"Number of restaurants before filtering: {len(restaurants)}")
-    # Filter restaurants by area
-    filtered_restaurants = restaurant_filter.filter_by_area(selected_area['geometry']['coordinates'][0])
+    # Filter restaurants by area, reading the latest scrape of the Google Maps list
+    snapshot = catalogue.find_in_area(AreaFilter.from_geojson(geometry), wait=CATALOGUE_WAIT)
+    if snapshot is None:
+        return jsonify({"error": "Restaurant list is not ready yet"}), 503
+    filtered_restaurants = snapshot["restaurants"]
+    logging.info(f"Number of restaurants before filtering: {len(catalogue.index)}")
     logging.info(f"Number of restaurants after area filtering: {len(filtered_restaurants)}")
-    # Filter restaurants by time
-    filtered_restaurants = restaurant_filter.filter_by_time(dining_time)
+    # Filter restaurants by time, only walking the ones inside the area
+    restaurant_filter = _time_filter(filtered_restaurants)
+    if data.get("stream"):
+        events = (json.dumps(event) + "\n"
+                  for event in _search_events(restaurant_filter, dining_time, snapshot["version"]))
+        return Response(stream_with_context(events), mimetype="application/x-ndjson")
+    filtered_restaurants = restaurant_filter.filter_by_time(dining_time,
+                                                          max_workers=FILTER_CONCURRENCY,
+                                                          timeout=SITE_TIMEOUT)
     logging.info(f"Number of restaurants after area and time filtering: {len(filtered_restaurants)}")
+    logging.info(f"Places cache: {places_cache.stats()}")
+    logging.info(f"Availability cache: {availability_cache.stats()}")
+
+    return jsonify({"restaurants": filtered_restaurants, "catalogue_version": snapshot["version"]}), 200
+
+def _search_events(restaurant_filter, dining_time, catalogue_version):
+    """
+    Checks the restaurants of the filter, yielding the events of a streamed
+    /filter-restaurants response as dictionaries.
+    """
+    restaurants = restaurant_filter.restaurants
+    yield {"event": "area", "restaurants": restaurants, "catalogue_version": catalogue_version}
+    available_ids = set()
+    for restaurant, has_table in restaurant_filter.iter_by_time(dining_time,
+                                                               max_workers=FILTER_CONCURRENCY,
+                                                               timeout=SITE_TIMEOUT):
+        if has_table:
+            available_ids.add(id(restaurant))
+        yield {"event": "restaurant", "restaurant": restaurant, "available": has_table}
+    # The summary keeps the order of the area results, not the order the checks finished
+    available = [restaurant for restaurant in restaurants if id(restaurant) in available_ids]
+    logging.info(f"Number of restaurants after area and time filtering: {len(available)}")
+    yield {"event": "summary", "restaurants": available, "checked": len(restaurants),
+           "catalogue_version": catalogue_version}
+
+def _run_search_job(job, dining_time, geometry):
+    """
+    Runs a search in a background worker, recording its progress on the job.
+    """
+    snapshot = catalogue.find_in_area(AreaFilter.from_geojson(geometry), wait=CATALOGUE_WAIT)
+    if snapshot is None:
+        raise RuntimeError("Restaurant list is not ready yet")
+    for event in _search_events(_time_filter(snapshot["restaurants"]), dining_time, snapshot["version"]):
+        job.record(event)
+
+# Searches run by background workers so they do not hold up the web server
+search_jobs = JobQueue(_run_search_job,
+                       workers=int(os.getenv("SEARCH_WORKERS", 2)),
+                       max_depth=int(os.getenv("SEARCH_QUEUE_DEPTH", 20)),
+                       reuse_for=AVAILABILITY_TTL)
+
+@app.route("/jobs", methods=["POST"])
+def create_search_job():
+    """
+    Queues a search with the same input as /filter-restaurants and returns its
+    job id straight away. Identical searches share one job.
+    """
+    search = _parse_search(request.json)
+    if search is None:
+        return jsonify({"error": "Invalid input"}), 400
+    dining_time, geometry = search
+    key = hashlib.sha1(json.dumps([dining_time.isoformat(), datetime.date.today().isoformat(), geometry],
+                                  sort_keys=True).encode()).hexdigest()
+    try:
+        job, created = search_jobs.submit(key, dining_time, geometry)
+    except JobQueueFull:
+        return jsonify({"error": "Too many searches, try again shortly"}), 429, {"Retry-After": "30"}
+    return jsonify(dict(job.to_dict(), status_url=f"/jobs/{job.id}")), 202 if created else 200
 
-    return jsonify({"restaurants": filtered_restaurants}), 200
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_search_job(job_id):
+    """
+    Returns the progress of a search job and the restaurants with a table found so far.
+    """
+    job = search_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route("/refresh-restaurants", methods=["POST"])
+def refresh_restaurants():
+    """
+    Starts a new scrape of the Google Maps list in the background.
+    """
+    catalogue.request_refresh()
+    return jsonify({"status": "refresh requested", "catalogue_version": catalogue.version}), 202
+
+@app.route("/model-stats", methods=["GET"])
+def model_stats():
+    """
+    Returns the request, error, retry and latency counters of each model,
+    and the hit rate of the model response cache.
+    """
+    return jsonify({"models": get_gateway().stats(), "response_cache": model_response_cache.stats()}), 200
+
+@app.route("/walker-stats", methods=["GET"])
+def walker_stats():
+    """
+    Returns the outcomes of the walks run in worker processes and the workers alive.
+    """
+    if walker_farm is None:
+        return jsonify({"error": "Websites are not walked in worker processes, set WALKER_PROCESSES."}), 404
+    return jsonify(walker_farm.stats()), 200
 
 if __name__ == "__main__":
     app.run(debug=True)
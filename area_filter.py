@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class AreaFilter:
+    """
+    This class tests which points lie inside an area drawn on the map.
+    The area is one or more polygons, each made of an outer ring and optional
+    holes, with coordinates in GeoJSON [lng, lat] order. The polygon edges are
+    prepared once, so many restaurants can be tested together in one batch.
+
+    A point is inside a polygon if a ray cast from it eastwards crosses the
+    polygon's rings an odd number of times (the even-odd rule), which also
+    excludes points inside holes.
+    """
+
+    # The number of point/edge pairs tested at once, bounds memory use
+    BATCH_SIZE = 1 << 20
+
+    def __init__(self, polygons):
+        """
+        :param polygons: A list of polygons, each a list of rings, each a list of [lng, lat] positions.
+        """
+        self.polygons = []
+        for rings in polygons:
+            edges = [self._ring_edges(ring) for ring in rings if len(ring) >= 3]
+            if not edges:
+                continue
+            x1, y1, x2, y2 = (np.concatenate(parts) for parts in zip(*edges))
+            outer = np.asarray(rings[0], dtype=float)[:, :2]
+            bbox = (outer[:, 0].min(), outer[:, 1].min(), outer[:, 0].max(), outer[:, 1].max())
+            dy = y2 - y1
+            # Horizontal edges are never crossed, avoid dividing by zero for them
+            slope = np.divide(x2 - x1, dy, out=np.zeros_like(dy), where=dy != 0)
+            self.polygons.append((bbox, x1, y1, y2, slope))
+
+    @staticmethod
+    def _ring_edges(ring):
+        points = np.asarray(ring, dtype=float)[:, :2]
+        # Closing the ring is optional, a repeated last point adds an edge of zero length
+        following = np.roll(points, -1, axis=0)
+        return points[:, 0], points[:, 1], following[:, 0], following[:, 1]
+
+    @classmethod
+    def from_ring(cls, coordinates):
+        """
+        :param coordinates: A single ring of [lng, lat] positions.
+        """
+        return cls([[coordinates]])
+
+    @classmethod
+    def from_geojson(cls, geometry):
+        """
+        Builds the filter from a GeoJSON Polygon or MultiPolygon, or a Feature
+        holding one, as produced by Mapbox Draw.
+        """
+        if geometry.get('type') == 'Feature':
+            geometry = geometry['geometry']
+        if geometry['type'] == 'Polygon':
+            return cls([geometry['coordinates']])
+        if geometry['type'] == 'MultiPolygon':
+            return cls(geometry['coordinates'])
+        raise ValueError(f"Unsupported geometry type: {geometry['type']}")
+
+    def bounding_boxes(self):
+        """
+        :return: A (min_lng, min_lat, max_lng, max_lat) tuple for each polygon.
+        """
+        return [polygon[0] for polygon in self.polygons]
+
+    def contains(self, lngs, lats):
+        """
+        Tests which points are inside the area.
+
+        :param lngs: The longitudes of the points.
+        :param lats: The latitudes of the points.
+        :return: A boolean NumPy array, True where the point is inside.
+        """
+        lngs = np.asarray(lngs, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        inside = np.zeros(lngs.shape, dtype=bool)
+        for (min_lng, min_lat, max_lng, max_lat), x1, y1, y2, slope in self.polygons:
+            # Only points inside the bounding box need the edge test
+            candidates = np.flatnonzero((lngs >= min_lng) & (lngs <= max_lng) &
+                                        (lats >= min_lat) & (lats <= max_lat) & ~inside)
+            step = max(1, self.BATCH_SIZE // len(x1))
+            for start in range(0, len(candidates), step):
+                index = candidates[start:start + step]
+                px = lngs[index, None]
+                py = lats[index, None]
+                straddles = (y1 > py) != (y2 > py)
+                crossing_lng = x1 + (py - y1) * slope
+                crossings = np.count_nonzero(straddles & (px < crossing_lng), axis=1)
+                inside[index] = crossings % 2 == 1
+        return inside
@@ -0,0 +1,224 @@
+import logging
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Hosts of the booking providers restaurant websites commonly embed
+BOOKING_PROVIDERS = {
+    "opentable": ("opentable.com", "opentable.co.uk"),
+    "resdiary": ("resdiary.com",),
+    "sevenrooms": ("sevenrooms.com",),
+    "designmynight": ("designmynight.com",),
+}
+
+TIME_PATTERN = re.compile(r"\b([01]?\d|2[0-3])[:.]([0-5]\d)\s*([ap]\.?m\.?)?(?![\d])", re.IGNORECASE)
+SLOT_HINT_PATTERN = re.compile(r"slot|time", re.IGNORECASE)
+
+
+def provider_for_url(url):
+    """
+    :param url: An absolute URL.
+    :return: The name of the booking provider hosting the URL, or None.
+    """
+    host = urlparse(url).netloc.lower()
+    for provider, domains in BOOKING_PROVIDERS.items():
+        if any(host == domain or host.endswith("." + domain) for domain in domains):
+            return provider
+    return None
+
+
+def normalise_time(text):
+    """
+    Converts a time such as "19:00", "7.30pm" or "7:30 PM" to "HH:MM".
+
+    :return: The time, or None if the text holds no time.
+    """
+    match = TIME_PATTERN.search(text)
+    if match is None:
+        return None
+    hour, minute, meridiem = int(match.group(1)), match.group(2), match.group(3)
+    if meridiem:
+        if hour > 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower().startswith("p") else 0)
+    return f"{hour:02d}:{minute}"
+
+
+class BookingPage(HTMLParser):
+    """
+    This class reads the parts of a page's HTML the extractors look at:
+    iframes, scripts, links and elements that look like time slots.
+    """
+
+    def __init__(self, html, url):
+        super().__init__(convert_charrefs=True)
+        self.url = url
+        self.provider = provider_for_url(url)
+        self.iframes = []
+        self.scripts = []
+        self.links = []
+        self.slots = []
+        self.inline_scripts = []
+        self._open = []
+        self.feed(html)
+        self.close()
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "iframe" and attrs.get("src"):
+            self.iframes.append(urljoin(self.url, attrs["src"]))
+        elif tag == "script":
+            if attrs.get("src"):
+                self.scripts.append(urljoin(self.url, attrs["src"]))
+            self._open.append(("script", attrs, []))
+            return
+        elif tag == "input" and attrs.get("type") in ("button", "submit", "radio"):
+            self._add_slot(attrs, attrs.get("value", ""))
+        if tag in ("a", "button", "li", "span", "div", "label", "option"):
+            self._open.append((tag, attrs, []))
+
+    def handle_endtag(self, tag):
+        for i in range(len(self._open) - 1, -1, -1):
+            if self._open[i][0] == tag:
+                open_tag, attrs, text = self._open.pop(i)
+                text = " ".join(" ".join(text).split())
+                if open_tag == "script":
+                    self.inline_scripts.append(text)
+                    return
+                if open_tag == "a" and attrs.get("href"):
+                    self.links.append((urljoin(self.url, attrs["href"]), text))
+                self._add_slot(attrs, text)
+                if self._open:
+                    self._open[-1][2].append(text)
+                return
+
+    def handle_data(self, data):
+        if self._open:
+            self._open[-1][2].append(data)
+
+    def _add_slot(self, attrs, text):
+        """
+        Remembers an element that looks like a bookable time slot: its markup
+        mentions a slot or time, it is not disabled and its text is a time.
+        """
+        if "disabled" in attrs or attrs.get("aria-disabled") == "true":
+            return
+        hints = " ".join(str(attrs.get(name, "")) for name in ("class", "data-test", "data-testid", "data-auto", "data-time", "aria-label", "name"))
+        if not SLOT_HINT_PATTERN.search(hints) or len(text) > 20:
+            return
+        slot = normalise_time(attrs.get("data-time") or text)
+        if slot:
+            self.slots.append(slot)
+
+
+# Extractors are tried in order on every page before the vision model is asked.
+# Each takes a BookingPage and returns None if it does not recognise the page, or
+# a dictionary with either "available_times" or "next_url".
+EXTRACTORS = []
+
+
+def register_extractor(extractor):
+    """
+    Adds an extractor to the registry, usable as a decorator.
+    """
+    EXTRACTORS.append(extractor)
+    return extractor
+
+
+def _embedded_provider_url(page, provider):
+    for src in page.iframes + page.scripts:
+        if provider_for_url(src) == provider:
+            return src
+    return None
+
+
+@register_extractor
+def provider_time_slots(page):
+    """
+    On a booking provider's own page, read the time slots it lists.
+    """
+    if page.provider is None or not page.slots:
+        return None
+    return {"available_times": sorted(set(page.slots))}
+
+
+@register_extractor
+def opentable_widget(page):
+    """
+    OpenTable is embedded as an iframe or as a loader script carrying the restaurant id.
+    """
+    src = _embedded_provider_url(page, "opentable")
+    if src is None:
+        return None
+    match = re.search(r"[?&]rid=(\d+)", src)
+    if "/widget/" in src and match:
+        host = urlparse(src).netloc
+        return {"next_url": f"https://{host}/restref/client/?rid={match.group(1)}"}
+    return {"next_url": src} if src in page.iframes else None
+
+
+@register_extractor
+def resdiary_widget(page):
+    """
+    ResDiary widgets are iframes pointing at the booking page of the restaurant.
+    """
+    for src in page.iframes:
+        if provider_for_url(src) == "resdiary":
+            return {"next_url": src}
+    return None
+
+
+@register_extractor
+def sevenrooms_widget(page):
+    """
+    SevenRooms is embedded as an iframe or initialised from a script with the venue id.
+    """
+    for src in page.iframes:
+        if provider_for_url(src) == "sevenrooms":
+            return {"next_url": src}
+    if _embedded_provider_url(page, "sevenrooms") is None:
+        return None
+    for script in page.inline_scripts:
+        match = re.search(r"venueId\s*[:=]\s*['\"]([\w-]+)['\"]", script)
+        if match:
+            return {"next_url": f"https://www.sevenrooms.com/reservations/{match.group(1)}"}
+    return None
+
+
+@register_extractor
+def designmynight_widget(page):
+    """
+    DesignMyNight widgets are iframes on bookings.designmynight.com.
+    """
+    for src in page.iframes:
+        if provider_for_url(src) == "designmynight":
+            return {"next_url": src}
+    return None
+
+
+def extract_booking_info(html, url):
+    """
+    Runs the registered extractors on a page until one recognises it.
+
+    :param html: The page source.
+    :param url: The URL of the page, used to resolve relative links.
+    :return: A dictionary with "available_times" or "next_url" and the
+             name of the "extractor", or None if no extractor matched.
+    """
+    try:
+        page = BookingPage(html, url)
+    except Exception as e:
+        logging.warning(f"An error occurred while parsing the page for extractors: {e}")
+        return None
+    for extractor in EXTRACTORS:
+        result = extractor(page)
+        if result:
+            # Do not send the walker back to the page it is already on
+            if result.get("next_url") == url:
+                continue
+            logging.info(f"Extractor {extractor.__name__} matched {url}")
+            return dict(result, extractor=extractor.__name__)
+    return None
@@ -0,0 +1,85 @@
+import logging
+import re
+from urllib.parse import urlparse
+
+from booking_extractors import BookingPage, provider_for_url
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Words in a link's text or path that suggest it leads to the booking page
+BOOKING_WORDS = re.compile(r"\b(book(ing)?s?|reserv(e|ation|ations)|table)\b", re.IGNORECASE)
+STRONG_BOOKING_TEXT = re.compile(r"\b(book|reserve) (a|your) table\b|\breservations?\b|\bbook now\b", re.IGNORECASE)
+# Words that suggest a booking link is for something other than a table
+OTHER_BOOKING_WORDS = re.compile(r"\b(gift|voucher|event|private|party|parties|hire|cookbook|class|masterclass|careers?)\b", re.IGNORECASE)
+# Hosts that are never the restaurant's booking page
+IGNORED_HOSTS = ("facebook.com", "instagram.com", "twitter.com", "x.com", "tiktok.com", "google.com", "tripadvisor.com", "tripadvisor.co.uk")
+
+
+def _score_link(url, text, page_host):
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https"):
+        return 0
+    host = parsed.netloc.lower()
+    if any(host == ignored or host.endswith("." + ignored) for ignored in IGNORED_HOSTS):
+        return 0
+    if provider_for_url(url):
+        score = 90
+    else:
+        path_words = re.sub(r"[/_\-.?=&]+", " ", parsed.path + " " + parsed.query)
+        if STRONG_BOOKING_TEXT.search(text):
+            score = 60
+        elif BOOKING_WORDS.search(text):
+            score = 50
+        elif BOOKING_WORDS.search(path_words):
+            score = 40
+        else:
+            return 0
+        if host != page_host:
+            # An unknown host is less likely to be the booking page than the restaurant's own
+            score -= 10
+    if OTHER_BOOKING_WORDS.search(text) or OTHER_BOOKING_WORDS.search(parsed.path):
+        score -= 30
+    return max(score, 0)
+
+
+def find_booking_links(html, base_url):
+    """
+    Finds the links on a page that most likely lead to its booking page.
+    Embedded booking provider iframes rank highest, then links to booking
+    providers, then links whose text or path mentions booking or reserving.
+
+    :param html: The page source.
+    :param base_url: The URL of the page, used to resolve relative links.
+    :return: A list of (score, url) tuples, best first.
+    """
+    try:
+        page = BookingPage(html, base_url)
+    except Exception as e:
+        logging.warning(f"An error occurred while parsing the page for booking links: {e}")
+        return []
+    page_host = urlparse(base_url).netloc.lower()
+    current = base_url.split("#")[0]
+    scores = {}
+    for src in page.iframes:
+        if provider_for_url(src):
+            scores[src] = 100
+    for url, text in page.links:
+        url = url.split("#")[0]
+        if url == current:
+            continue
+        score = _score_link(url, text, page_host)
+        if score > scores.get(url, 0):
+            scores[url] = score
+    # Python's sort is stable, so equal scores keep page order
+    return sorted(((score, url) for url, score in scores.items() if score > 0), key=lambda link: -link[0])
+
+
+def best_booking_link(html, base_url, min_score=40):
+    """
+    :return: The URL of the best booking link scoring at least min_score, or None.
+    """
+    links = find_booking_links(html, base_url)
+    if links and links[0][0] >= min_score:
+        return links[0][1]
+    return None
@@ -0,0 +1,111 @@
+import logging
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Defines scorer(label), which returns a function scoring from 0 to 1 how well
+# a text matches the label. Shared by the click script and its tests.
+SCORE_SCRIPT = """
+const normalise = text => (text || '').toLowerCase().replace(/[^a-z0-9\\u00c0-\\u024f]+/g, ' ').trim();
+const bigrams = text => {
+    const pairs = new Set();
+    for (let i = 0; i < text.length - 1; i++) pairs.add(text.slice(i, i + 2));
+    return pairs;
+};
+// Words match if equal or if they share a stem, e.g. reserve and reservations
+const sameWord = (a, b) => {
+    if (a === b) return true;
+    let prefix = 0;
+    while (prefix < a.length && a[prefix] === b[prefix]) prefix++;
+    return prefix >= 4 && prefix >= Math.min(a.length, b.length) - 1;
+};
+const scorer = label => {
+    const target = normalise(label);
+    const targetWords = target.split(' ');
+    const targetBigrams = bigrams(target);
+    return text => {
+        text = normalise(text);
+        if (!text || !target) return 0;
+        if (text === target) return 1;
+        const padded = ' ' + text + ' ';
+        if (padded.includes(' ' + target + ' ')) {
+            // The label is part of a longer text, the more extra text the weaker the match
+            return 0.9 * target.length / text.length;
+        }
+        const words = text.split(' ');
+        if (text.length >= 3 && (' ' + target + ' ').includes(' ' + text + ' ')) {
+            return 0.7 * text.length / target.length;
+        }
+        const shared = targetWords.filter(word => words.some(other => sameWord(word, other))).length;
+        const overlap = shared / Math.max(targetWords.length, words.length);
+        const textBigrams = bigrams(text);
+        let common = 0;
+        for (const pair of textBigrams) if (targetBigrams.has(pair)) common++;
+        const dice = textBigrams.size + targetBigrams.size ? 2 * common / (textBigrams.size + targetBigrams.size) : 0;
+        return Math.max(0.8 * overlap, 0.7 * dice);
+    };
+};
+"""
+
+# Finds the visible clickable element whose text, aria-label, title or value
+# best matches the label, clicks it and describes it. Returns null if nothing
+# scores at least the minimum score.
+CLICK_SCRIPT = SCORE_SCRIPT + """
+const [label, minScore] = arguments;
+if (!normalise(label)) return null;
+const score = scorer(label);
+const visible = element => {
+    const rect = element.getBoundingClientRect();
+    const style = window.getComputedStyle(element);
+    return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+};
+const controls = 'button, a[href], [role="button"], [role="link"], [role="tab"], [role="menuitem"], [role="option"], ' +
+    'input[type="button"], input[type="submit"], input[type="reset"], summary';
+// Generic elements made clickable, often wrappers around a whole section
+const generic = 'label, [onclick], [tabindex]';
+let best = null;
+let bestScore = 0;
+for (const element of document.querySelectorAll(controls + ', ' + generic)) {
+    const control = element.matches(controls);
+    // A generic element only counts if it does not wrap other clickable elements
+    if (!control && element.querySelector(controls + ', ' + generic)) continue;
+    if (element.disabled || element.getAttribute('aria-disabled') === 'true' || !visible(element)) continue;
+    const images = Array.from(element.querySelectorAll('img[alt]')).map(image => image.alt).join(' ');
+    const texts = [element.innerText, element.getAttribute('aria-label'), element.title, element.value, images];
+    let elementScore = Math.max(...texts.map(score));
+    // Prefer real controls over generic elements made clickable
+    if (!control) elementScore -= 0.1;
+    else if (/^(BUTTON|A|INPUT)$/.test(element.tagName)) elementScore += 0.01;
+    if (elementScore > bestScore) {
+        best = element;
+        bestScore = elementScore;
+    }
+}
+if (!best || bestScore < minScore) return null;
+const description = best.tagName.toLowerCase() + (best.id ? '#' + best.id : '') +
+    ' "' + (best.innerText || best.getAttribute('aria-label') || best.title || best.value || '').trim().slice(0, 60) + '"';
+best.scrollIntoView({block: 'center'});
+best.click();
+return {description: description, score: Math.min(bestScore, 1)};
+"""
+
+
+def click_by_label(driver, label, min_score=0.5):
+    """
+    Clicks the visible clickable element that best matches a label, in one
+    script call. Buttons, links, role=button elements and inputs are
+    considered, matching on their text, aria-label, title and value.
+
+    :param driver: The WebDriver.
+    :param label: The label of the element to click, e.g. from the model.
+    :param min_score: The lowest match score, from 0 to 1, that is clicked.
+    :return: A dictionary with the description and score of the clicked element, or None.
+    """
+    try:
+        clicked = driver.execute_script(CLICK_SCRIPT, label, min_score)
+    except Exception as e:
+        logging.warning(f"An error occurred while clicking '{label}': {e}")
+        return None
+    if clicked:
+        logging.info(f"Clicked {clicked['description']} for label '{label}' (score {clicked['score']:.2f}).")
+    return clicked
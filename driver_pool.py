@@ -0,0 +1,207 @@
+import logging
+import threading
+from contextlib import contextmanager
+from functools import partial
+from queue import Queue, Empty
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+
+from load_profile import LoadProfile
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def setup_chrome_driver(driver_path='/opt/homebrew/bin/chromedriver', headless=True, load_profile=None):
+    """
+    Starts a new Chrome WebDriver with the options shared by every scraper.
+
+    :param driver_path: The path to the chromedriver binary.
+    :param headless: If True, Chrome is started without a window.
+    :param load_profile: The LoadProfile to apply, defaults to one configured from the environment.
+    :return: The WebDriver.
+    """
+    load_profile = load_profile or LoadProfile.from_env()
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    load_profile.apply_options(chrome_options)
+
+    service = Service(driver_path)
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    try:
+        load_profile.apply(driver)
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+
+class _PooledDriver:
+    """
+    A driver owned by the pool along with how many times it has been leased
+    and the browser context of its current lease.
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.home = driver.window_handles[0]
+        self.context_id = None
+
+
+class DriverPool:
+    """
+    This class keeps a fixed number of Chrome sessions alive and leases them
+    out, so browser startup is paid once per session instead of once per
+    restaurant. Each lease runs in a fresh browser context, so no cookies or
+    storage carry over to the next one. Sessions are recycled after max_uses
+    leases or as soon as they crash.
+    """
+
+    def __init__(self, size=2, max_uses=20, driver_path='/opt/homebrew/bin/chromedriver', headless=True, driver_factory=None, load_profile=None):
+        """
+        :param size: The maximum number of browsers alive at the same time.
+        :param max_uses: The number of leases after which a browser is restarted.
+        :param driver_path: The path to the chromedriver binary.
+        :param headless: If True, Chrome is started without a window.
+        :param driver_factory: Optional callable returning a new driver, defaults to Chrome.
+        :param load_profile: The LoadProfile applied to every lease, defaults to one configured from the environment.
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.size = size
+        self.max_uses = max_uses
+        self.load_profile = load_profile or LoadProfile.from_env()
+        self.driver_factory = driver_factory or partial(setup_chrome_driver, driver_path, headless, self.load_profile)
+        self._idle = Queue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all = set()
+        self._closed = False
+
+    def _create(self):
+        pooled = _PooledDriver(self.driver_factory())
+        with self._lock:
+            self._all.add(pooled)
+        logging.info(f"Driver pool started a new browser ({len(self._all)}/{self.size}).")
+        return pooled
+
+    def _discard(self, pooled):
+        with self._lock:
+            self._all.discard(pooled)
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logging.warning(f"An error occurred while quitting a pooled driver: {e}")
+
+    def _isolate(self, pooled):
+        """
+        Opens a tab in a new browser context for the lease. If Chrome cannot
+        create one the lease shares the default context and the browser is
+        discarded afterwards, so nothing it stored reaches the next lease.
+        """
+        driver = pooled.driver
+        try:
+            context_id = driver.execute_cdp_cmd("Target.createBrowserContext", {})["browserContextId"]
+            handle = driver.execute_cdp_cmd("Target.createTarget", {"url": "about:blank",
+                                                                    "browserContextId": context_id})["targetId"]
+            driver.switch_to.window(handle)
+            pooled.context_id = context_id
+            # Requests are blocked per tab
+            self.load_profile.apply(driver)
+        except WebDriverException as e:
+            logging.warning(f"Could not open a new browser context, the browser is discarded after this lease: {e}")
+
+    def _reset(self, pooled):
+        """
+        Returns a driver to a blank state: the lease's windows are closed and
+        its browser context, with the cookies and storage of every site it
+        visited, is disposed. Raises if the browser is no longer responsive.
+        """
+        driver = pooled.driver
+        for handle in list(driver.window_handles):
+            if handle != pooled.home:
+                driver.switch_to.window(handle)
+                driver.close()
+        driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": pooled.context_id})
+        pooled.context_id = None
+        driver.switch_to.window(pooled.home)
+
+    def _acquire(self, timeout):
+        if self._closed:
+            raise RuntimeError("Driver pool has been shut down.")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Timed out waiting for a free driver.")
+        try:
+            try:
+                return self._idle.get_nowait()
+            except Empty:
+                return self._create()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, pooled, crashed):
+        try:
+            if crashed or self._closed:
+                self._discard(pooled)
+                return
+            if pooled.uses >= self.max_uses:
+                logging.info(f"Recycling browser after {pooled.uses} uses.")
+                self._discard(pooled)
+                return
+            if pooled.context_id is None:
+                self._discard(pooled)
+                return
+            try:
+                self._reset(pooled)
+            except Exception as e:
+                logging.warning(f"Pooled driver failed to reset, discarding it: {e}")
+                self._discard(pooled)
+                return
+            self._idle.put(pooled)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+        Leases a driver for the duration of the with block.
+
+        :param timeout: Seconds to wait for a free driver, None waits forever.
+        :return: A context manager yielding the WebDriver.
+        """
+        pooled = self._acquire(timeout)
+        pooled.uses += 1
+        crashed = False
+        try:
+            self._isolate(pooled)
+            yield pooled.driver
+        except TimeoutException:
+            # A slow page is not a broken browser
+            raise
+        except WebDriverException:
+            crashed = True
+            raise
+        finally:
+            self._release(pooled, crashed)
+
+    def shutdown(self):
+        """
+        Quits every browser owned by the pool. Leased browsers are quit when
+        they are returned.
+        """
+        self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except Empty:
+                break
+            self._discard(pooled)
+        logging.info("Driver pool shut down.")
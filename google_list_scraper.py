@@ -1,11 +1,10 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import logging
 
+from driver_pool import setup_chrome_driver
+
 # Configure logging
 logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -17,22 +16,14 @@ class GoogleMapsScraper:
     The get_restaurant_names method takes a Google Maps URL as input and returns a list of restaurant names.
     """
     
-    def __init__(self, driver_path='/opt/homebrew/bin/chromedriver', headless=True):
+    def __init__(self, driver_path='/opt/homebrew/bin/chromedriver', headless=True, driver=None):
         self.driver_path = driver_path
         self.headless = headless
-        self.driver = self._setup_driver()
+        self.owns_driver = driver is None
+        self.driver = driver if driver is not None else self._setup_driver()
 
     def _setup_driver(self):
-        chrome_options = Options()
-        if self.headless:
-            chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-
-        service = Service(self.driver_path)
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        return driver
+        return setup_chrome_driver(self.driver_path, self.headless)
 
     def _load_page(self, url):
         self.driver.get(url)
@@ -60,7 +51,8 @@ class GoogleMapsScraper:
             return []
 
     def _close(self):
-        self.driver.quit()
+        if self.owns_driver:
+            self.driver.quit()
 
     def get_restaurant_names(self, url):
         wait = self._load_page(url)
@@ -1,24 +1,167 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
+import concurrent.futures
 import os
+import random
+import threading
+import time
 from pprint import pprint
 import logging
 
+from sqlite_cache import SqliteCache
+
 # Configure logging
 logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Place fields requested at each stage. Places bills and answers by field,
+# so each stage only asks for what it reads.
+SEARCH_FIELDS = ["place_id", "name", "geometry"]
+WEBSITE_FIELDS = ["website"]
+
+# Places statuses that mean "try again later" rather than a real answer
+RETRYABLE_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+
+
+class PlacesCache:
+    """
+    This class persists Places answers on disk so restarts and repeated
+    searches do not go back to the API. Query to place lookups practically
+    never change, so they are kept much longer than place details.
+    """
+
+    def __init__(self, path="places_cache.sqlite3", id_ttl=90 * 24 * 3600, details_ttl=7 * 24 * 3600, max_entries=None):
+        """
+        :param path: The SQLite database file.
+        :param id_ttl: Seconds a query to place lookup is kept.
+        :param details_ttl: Seconds place details are kept.
+        :param max_entries: Optional cap on the entries of each kind.
+        """
+        self.ids = SqliteCache(path, "place_ids", ttl=id_ttl, max_entries=max_entries)
+        self.details = SqliteCache(path, "place_details", ttl=details_ttl, max_entries=max_entries)
+
+    def stats(self):
+        """
+        :return: The hit and miss counters of both kinds of entry.
+        """
+        return {"ids": self.ids.stats(), "details": self.details.stats()}
+
+
 class GoogleRestaurantInfo:
     """
     This class is responsible for interacting with the Google Maps API to search for places,
     fetch place details, and extract websites.
+
+    Answers are remembered for the lifetime of the instance, so a place is never
+    requested twice when one instance is shared across a request. An optional
+    PlacesCache keeps them across instances and restarts.
     """
 
-    def __init__(self):
+    def __init__(self, cache=None, max_concurrency=8, max_retries=3, backoff=0.5, request_timeout=10):
         """
         Initializes the GoogleRestaurantInfo with the env API key.
+
+        :param cache: Optional PlacesCache consulted before calling the API.
+        :param max_concurrency: The maximum number of requests in flight at once.
+        :param max_retries: Retries for 5xx answers and OVER_QUERY_LIMIT.
+        :param backoff: Seconds before the first retry, doubled on each retry.
+        :param request_timeout: Seconds before a single request is abandoned.
         """
         load_dotenv()
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.request_timeout = request_timeout
+        # One keep-alive connection pool for every request of this instance
+        self.session = requests.Session()
+        retry = Retry(total=max_retries, backoff_factor=backoff, status_forcelist=[500, 502, 503, 504],
+                      allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self._places_by_query = {}
+        self._details_by_id = {}
+        self._lock = threading.Lock()
+
+    def _get_json(self, url, params):
+        """
+        Calls a Places endpoint through the pooled session. 5xx answers are
+        retried by the session, OVER_QUERY_LIMIT and UNKNOWN_ERROR are retried
+        here with exponential backoff and jitter.
+
+        :return: The decoded answer, or None if the request failed.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(url, params=params, timeout=self.request_timeout)
+            except requests.RequestException as e:
+                logging.warning(f"An error occurred while calling the Places API: {e}")
+                return None
+            if response.status_code != 200:
+                logging.warning(f"Failed to retrieve the page. Status code: {response.status_code}")
+                return None
+            try:
+                data = response.json()
+            except ValueError as e:
+                # e.g. an HTML error page from a proxy
+                logging.warning(f"The Places API answered with something other than JSON: {e}")
+                return None
+            if data.get('status') not in RETRYABLE_STATUSES or attempt == self.max_retries:
+                return data
+            delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            logging.info(f"Places answered {data.get('status')}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+    def _map(self, function, items):
+        """
+        Applies the function to every item, up to max_concurrency at once,
+        keeping the order of the items.
+        """
+        if len(items) <= 1:
+            return [function(item) for item in items]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(function, items))
+
+    def find_place(self, query, fields=SEARCH_FIELDS):
+        """
+        Searches for a place using the provided query.
+
+        :param query: The search query for the place.
+        :param fields: The place fields to return.
+        :return: A dictionary of the requested fields if found, otherwise None.
+        """
+        key = (query, tuple(fields))
+        if key in self._places_by_query:
+            return self._places_by_query[key]
+        cache_key = ",".join(fields) + "|" + query
+        cached = self.cache.ids.get_entry(cache_key) if self.cache else None
+        if cached is not None:
+            self._places_by_query[key] = cached[0]
+            return cached[0]
+        url = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
+        params = {
+            "input": query,
+            "inputtype": "textquery",
+            "fields": ",".join(fields),
+            "key": self.api_key,
+        }
+        data = self._get_json(url, params)
+        if data is None:
+            return None
+        if data.get('status') == 'OK' and data.get('candidates'):
+            place = data['candidates'][0]
+        elif data.get('status') == 'ZERO_RESULTS':
+            logging.info(f"No place found for query: {query}")
+            place = None
+        else:
+            logging.warning(f"Error searching for place: {data.get('status')}")
+            return None
+        self._places_by_query[key] = place
+        if self.cache:
+            self.cache.ids.set(cache_key, place)
+        return place
 
     def search_place(self, query):
         """
@@ -27,37 +170,48 @@ class GoogleRestaurantInfo:
         :param query: The search query for the place.
         :return: The place ID if found, otherwise None.
         """
-        url = f"https://maps.googleapis.com/maps/api/place/findplacefromtext/json?input={query}&inputtype=textquery&fields=place_id&key={self.api_key}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('status') == 'OK' and data.get('candidates'):
-                return data['candidates'][0]['place_id']
-            else:
-                logging.warning(f"Error searching for place: {data.get('status')}")
-                return None
-        else:
-            logging.warning(f"Failed to retrieve the page. Status code: {response.status_code}")
-            return None
+        place = self.find_place(query)
+        return place['place_id'] if place else None
 
-    def _fetch_place_details(self, place_id):
+    def _fetch_place_details(self, place_id, fields=None):
         """
         Fetches the details of a place using the provided place ID.
         
         :param place_id: The place ID of the place to fetch details for.
+        :param fields: The place fields to fetch, None fetches every field.
         :return: The place details if found, otherwise None.
         """
-        url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={place_id}&key={self.api_key}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('status') == 'OK':
-                return data.get('result')
-            else:
-                logging.warning(f"Error fetching place details: {data.get('status')}")
-                return None
+        if place_id not in self._details_by_id and self.cache:
+            cached = self.cache.details.get(place_id)
+            if cached is not None:
+                known = None if cached['fields'] is None else set(cached['fields'])
+                self._details_by_id[place_id] = (known, cached['details'])
+        known_fields, known_details = self._details_by_id.get(place_id, (set(), None))
+        if known_details is not None and (known_fields is None or (fields is not None and set(fields) <= known_fields)):
+            return known_details
+
+        url = "https://maps.googleapis.com/maps/api/place/details/json"
+        params = {"place_id": place_id, "key": self.api_key}
+        if fields is not None:
+            params["fields"] = ",".join(fields)
+        data = self._get_json(url, params)
+        if data is None:
+            return None
+        if data.get('status') == 'OK':
+            with self._lock:
+                # Merge with whatever another thread stored in the meantime
+                known_fields, known_details = self._details_by_id.get(place_id, (set(), None))
+                details = dict(known_details or {}, **data.get('result', {}))
+                known_fields = None if fields is None or known_fields is None else known_fields | set(fields)
+                self._details_by_id[place_id] = (known_fields, details)
+            if self.cache:
+                self.cache.details.set(place_id, {
+                    "fields": None if known_fields is None else sorted(known_fields),
+                    "details": details,
+                })
+            return details
         else:
-            logging.warning(f"Failed to retrieve the page. Status code: {response.status_code}")
+            logging.warning(f"Error fetching place details: {data.get('status')}")
             return None
 
     def _fetch_websites_from_ids(self, place_ids):
@@ -68,13 +222,36 @@ class GoogleRestaurantInfo:
         :return: A list of websites.
         """
         websites = []
-        for place_id in place_ids:
-            place_details = self._fetch_place_details(place_id)
+        all_details = self._map(lambda place_id: self._fetch_place_details(place_id, WEBSITE_FIELDS), place_ids)
+        for place_details in all_details:
             logging.debug(place_details)
-            if place_details and 'website' in place_details:
+            if place_details and place_details.get('website'):
                 websites.append(place_details['website'])
         return websites
 
+    def _search_place_ids(self, queries):
+        """
+        Searches for the place IDs of the queries, dropping duplicates.
+        """
+        place_ids = []
+        for place in self.find_places(queries):
+            if place and place['place_id'] not in place_ids:
+                place_ids.append(place['place_id'])
+        return place_ids
+
+    def find_places(self, queries, fields=SEARCH_FIELDS):
+        """
+        Searches for several places at once.
+
+        :param queries: A list of search queries for the places.
+        :param fields: The place fields to return.
+        :return: A list with the place found for each query, or None, in the order of the queries.
+        """
+        unique_queries = list(dict.fromkeys(queries))
+        places = self._map(lambda query: self.find_place(query, fields), unique_queries)
+        found = dict(zip(unique_queries, places))
+        return [found[query] for query in queries]
+
     def get_websites_from_queries(self, queries):
         """
         Searches for places using the provided queries and fetches their websites.
@@ -82,11 +259,7 @@ class GoogleRestaurantInfo:
         :param queries: A list of search queries for the places.
         :return: A list of websites.
         """
-        place_ids = []
-        for query in queries:
-            place_id = self.search_place(query)
-            if place_id:
-                place_ids.append(place_id)
+        place_ids = self._search_place_ids(queries)
         websites = self._fetch_websites_from_ids(place_ids)
         logging.info(f"Found {len(websites)} websites.")
         return websites
@@ -98,17 +271,51 @@ class GoogleRestaurantInfo:
         :param queries: A list of search queries for the places.
         :return: A list of place details.
         """
-        place_ids = []
-        for query in queries:
-            place_id = self.search_place(query)
-            if place_id:
-                place_ids.append(place_id)
-        place_details = []
-        for place_id in place_ids:
-            details = self._fetch_place_details(place_id)
-            if details:
-                place_details.append(details)
-        return place_details
+        place_ids = self._search_place_ids(queries)
+        all_details = self._map(self._fetch_place_details, place_ids)
+        return [details for details in all_details if details]
+
+    def get_places_from_queries(self, queries):
+        """
+        Searches for places using the provided queries. Only the fields needed
+        to filter by area are requested, the website is fetched later by
+        get_website for the places that are left.
+
+        :param queries: A list of search queries for the places.
+        :return: A list of places with place_id, name and geometry.
+        """
+        places = []
+        seen = set()
+        for place in self.find_places(queries):
+            if place and place['place_id'] not in seen:
+                seen.add(place['place_id'])
+                places.append(place)
+        return places
+
+    def get_website(self, place):
+        """
+        Returns the website of a place, fetching it only if the place does not
+        carry one yet. The website is stored on the place so later stages can
+        read it directly.
+
+        :param place: A place dictionary, ideally with a place_id.
+        :return: The website if found, otherwise None.
+        """
+        if 'website' in place:
+            return place['website']
+        place_id = place.get('place_id') or self.search_place(place['name'])
+        details = self._fetch_place_details(place_id, WEBSITE_FIELDS) if place_id else None
+        place['website'] = details.get('website') if details else None
+        return place['website']
+
+    def fetch_websites(self, places):
+        """
+        Fetches the websites of several places at once, storing each on its place.
+
+        :param places: A list of place dictionaries.
+        :return: A list with the website of each place, or None, in the order of the places.
+        """
+        return self._map(self.get_website, places)
 
 
 if __name__ == "__main__":
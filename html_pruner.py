@@ -0,0 +1,94 @@
+import re
+from html.parser import HTMLParser
+
+# Elements whose content is never shown as text
+HIDDEN_TAGS = {"script", "style", "noscript", "svg", "template", "head", "iframe", "canvas"}
+# Elements that have no end tag
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Text worth keeping outside interactive elements: times, dates and booking words
+RELEVANT_TEXT = re.compile(
+    r"\b\d{1,2}[:.]\d{2}\b|\b\d{1,2}\s*[ap]m\b|\b(book|reserv|table|guests?|covers?|party|date|time|available|availability|"
+    r"mon|tue|wed|thu|fri|sat|sun|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)",
+    re.IGNORECASE)
+# Elements whose text is kept as one labelled line
+INTERACTIVE_TAGS = {"a", "button", "option", "label", "h1", "h2", "h3"}
+
+
+class _Pruner(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = []
+        # Open elements as (tag, attrs, hidden, text) tuples, text is a list for interactive elements
+        self._open = []
+        self._hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            self.handle_startendtag(tag, attrs)
+            return
+        attrs = dict(attrs)
+        hidden = (tag in HIDDEN_TAGS or "hidden" in attrs or attrs.get("aria-hidden") == "true"
+                  or "display:none" in (attrs.get("style") or "").replace(" ", ""))
+        interactive = tag in INTERACTIVE_TAGS or attrs.get("role") == "button"
+        self._hidden += hidden
+        self._open.append((tag, attrs, hidden, [] if interactive else None))
+
+    def handle_startendtag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "input" and not self._hidden and attrs.get("type") != "hidden":
+            described = " ".join(f'{name}="{attrs[name]}"' for name in ("type", "name", "value", "placeholder", "aria-label")
+                                 if attrs.get(name))
+            if described:
+                self.lines.append(f"[input] {described}")
+
+    def handle_endtag(self, tag):
+        for i in range(len(self._open) - 1, -1, -1):
+            if self._open[i][0] == tag:
+                # Elements left open inside this one are closed with it
+                for open_tag, attrs, hidden, text in reversed(self._open[i:]):
+                    self._close(open_tag, attrs, hidden, text)
+                del self._open[i:]
+                return
+
+    def handle_data(self, data):
+        if self._hidden or not data.strip():
+            return
+        for _, _, _, text in reversed(self._open):
+            if text is not None:
+                # Text inside a button or link is part of its label
+                text.append(data)
+                return
+        if RELEVANT_TEXT.search(data):
+            self.lines.append(" ".join(data.split()))
+
+    def _close(self, tag, attrs, hidden, text):
+        self._hidden -= hidden
+        if text is None or self._hidden or hidden:
+            return
+        label = " ".join(" ".join(text).split()) or attrs.get("aria-label") or attrs.get("title") or ""
+        if not label:
+            return
+        kind = {"a": "link", "option": "option", "label": "label"}.get(tag, "heading" if tag.startswith("h") else "button")
+        self.lines.append(f"[{kind}] {label}")
+
+
+def prune_html(html, max_chars=6000):
+    """
+    Reduces a page to the text a model needs to find the next button or the
+    available times: buttons, links, form fields and visible text mentioning
+    times, dates or booking, one item per line.
+
+    :param html: The page source.
+    :param max_chars: The maximum length of the result.
+    :return: The pruned text.
+    """
+    pruner = _Pruner()
+    pruner.feed(html)
+    pruner.close()
+    lines = []
+    for line in pruner.lines:
+        # Menus and footers often repeat the same links
+        if line not in lines[-20:]:
+            lines.append(line)
+    pruned = "\n".join(lines)
+    return pruned[:max_chars]
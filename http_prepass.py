@@ -0,0 +1,110 @@
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from booking_extractors import extract_booking_info
+from booking_links import best_booking_link
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/126.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-GB,en;q=0.9",
+}
+
+
+class HttpPrepass:
+    """
+    This class looks at a restaurant website with plain HTTP requests before
+    a browser is used. The booking extractors and booking link ranking run on
+    the static HTML, which often finds the booking page and sometimes the
+    times themselves, so Chrome is only started for the pages that need it,
+    and then on the booking page instead of the home page.
+    """
+
+    def __init__(self, pool_size=8, request_timeout=10, max_hops=2, max_bytes=2_000_000, session=None):
+        """
+        :param pool_size: The number of connections kept open per host.
+        :param request_timeout: Seconds each request may take.
+        :param max_hops: The number of booking links followed.
+        :param max_bytes: Pages larger than this are cut off.
+        :param session: Optional requests.Session to use.
+        """
+        self.request_timeout = request_timeout
+        self.max_hops = max_hops
+        self.max_bytes = max_bytes
+        if session is None:
+            session = requests.Session()
+            retry = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(HEADERS)
+        self.session = session
+
+    def _fetch(self, url):
+        """
+        :return: A (html, final_url) tuple, or None if the page is not HTML or could not be fetched.
+        """
+        try:
+            with self.session.get(url, timeout=self.request_timeout, stream=True) as response:
+                if response.status_code >= 400 or "html" not in response.headers.get("Content-Type", "html"):
+                    logging.info(f"Pre-pass skipped {url}: {response.status_code} {response.headers.get('Content-Type')}")
+                    return None
+                body = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    body += chunk
+                    if len(body) >= self.max_bytes:
+                        break
+                return bytes(body).decode(response.encoding or "utf-8", errors="replace"), response.url
+        except requests.RequestException as e:
+            logging.info(f"Pre-pass could not fetch {url}: {e}")
+            return None
+
+    @staticmethod
+    def _in_time_range(times, time_range):
+        if time_range is None:
+            return times
+        start, end = time_range.start.strftime("%H:%M"), time_range.end.strftime("%H:%M")
+        return [t for t in times if start <= t <= end]
+
+    def check(self, url, time_range=None):
+        """
+        Looks for the times or the booking page of a website without a browser.
+
+        :param url: The restaurant's website.
+        :param time_range: Optional TimeRange the times are limited to.
+        :return: A dictionary with "available_times" if the times were found,
+                 with "start_url" if a browser should start on a booking page,
+                 or None if the website has to be walked from the start.
+        """
+        start_url = None
+        visited = set()
+        for _ in range(self.max_hops + 1):
+            if url in visited:
+                break
+            visited.add(url)
+            fetched = self._fetch(url)
+            if fetched is None:
+                break
+            html, final_url = fetched
+            visited.add(final_url)
+            result = extract_booking_info(html, final_url)
+            if result and "available_times" in result:
+                logging.info(f"Pre-pass found times on {final_url} with {result['extractor']}")
+                return {"available_times": self._in_time_range(result["available_times"], time_range), "url": final_url}
+            next_url = result["next_url"] if result else best_booking_link(html, final_url)
+            if next_url is None:
+                break
+            # The booking page found so far is where a browser would start
+            start_url = next_url
+            url = next_url
+        if start_url:
+            logging.info(f"Pre-pass found the booking page {start_url}")
+            return {"start_url": start_url}
+        return None
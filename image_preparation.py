@@ -0,0 +1,208 @@
+import io
+import logging
+import math
+
+from PIL import Image
+
+from booking_extractors import BOOKING_PROVIDERS
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Pixtral reads an image as 16x16 pixel patches, plus one break token per row of patches
+PATCH_SIZE = 16
+
+# Finds the visible elements that look booking related, scrolls the first one into
+# view if none are on screen and returns their rectangles in CSS pixels.
+BOOKING_ELEMENTS_SCRIPT = """
+const providers = arguments[0];
+const pattern = /\\bbook|reserv|\\btable\\b|\\b\\d{1,2}[:.]\\d{2}\\b/i;
+const slotPattern = /slot|time/i;
+const candidates = document.querySelectorAll(
+    'a, button, [role="button"], input[type="submit"], input[type="button"], select, input[type="date"], iframe, [class*="slot"], [data-test*="slot"]');
+const matches = [];
+for (const element of candidates) {
+    let match;
+    if (element.tagName === 'IFRAME') {
+        match = providers.some(host => (element.src || '').includes(host));
+    } else {
+        const label = [element.innerText, element.value, element.getAttribute('aria-label'), element.title].join(' ');
+        match = label.length < 200 && (pattern.test(label) || slotPattern.test(element.className || ''));
+    }
+    if (!match) continue;
+    const rect = element.getBoundingClientRect();
+    if (rect.width > 0 && rect.height > 0) matches.push(element);
+    if (matches.length >= 50) break;
+}
+const onScreen = element => {
+    const rect = element.getBoundingClientRect();
+    return rect.bottom > 0 && rect.top < window.innerHeight;
+};
+if (matches.length && !matches.some(onScreen)) {
+    matches[0].scrollIntoView({block: 'center'});
+}
+return {
+    scale: window.devicePixelRatio || 1,
+    rects: matches.filter(onScreen).map(element => {
+        const rect = element.getBoundingClientRect();
+        return [rect.left, rect.top, rect.width, rect.height];
+    })
+};
+"""
+
+PROVIDER_HOSTS = [domain for domains in BOOKING_PROVIDERS.values() for domain in domains]
+
+
+def estimate_image_tokens(width, height, patch_size=PATCH_SIZE):
+    """
+    Estimates the number of tokens a vision model spends reading an image.
+
+    :return: The estimated number of tokens.
+    """
+    rows = math.ceil(height / patch_size)
+    columns = math.ceil(width / patch_size)
+    return rows * columns + rows
+
+
+def perceptual_hash(image, hash_size=16):
+    """
+    Computes the difference hash (dHash) of an image: each bit says whether a
+    pixel of a small greyscale copy is brighter than its right neighbour.
+    Screenshots of the same page hash the same despite compression noise.
+
+    :param image: A PIL image.
+    :param hash_size: The hash has hash_size * hash_size bits.
+    :return: The hash as a hexadecimal string.
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(hash_size):
+        for column in range(hash_size):
+            offset = row * (hash_size + 1) + column
+            bits = (bits << 1) | (pixels[offset] > pixels[offset + 1])
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def region_of_interest(rects, image_size, scale=1.0, padding=48, min_size=(512, 384)):
+    """
+    Finds the part of a screenshot to keep: the box around the given element
+    rectangles, padded and grown to a minimum size so the model keeps some context.
+
+    :param rects: A list of [left, top, width, height] rectangles in CSS pixels.
+    :param image_size: The (width, height) of the screenshot in pixels.
+    :param scale: The number of screenshot pixels per CSS pixel.
+    :param padding: Pixels added around the box on each side.
+    :param min_size: The minimum (width, height) of the region in pixels.
+    :return: A (left, top, right, bottom) box, or None if there are no rectangles.
+    """
+    if not rects:
+        return None
+    image_width, image_height = image_size
+    left = min(rect[0] for rect in rects) * scale - padding
+    top = min(rect[1] for rect in rects) * scale - padding
+    right = max(rect[0] + rect[2] for rect in rects) * scale + padding
+    bottom = max(rect[1] + rect[3] for rect in rects) * scale + padding
+    box = []
+    for low, high, minimum, limit in ((left, right, min_size[0], image_width), (top, bottom, min_size[1], image_height)):
+        low, high = max(0, low), min(limit, high)
+        if high - low < minimum:
+            # Grow around the centre, shifting back inside the image at the edges
+            centre = (low + high) / 2
+            low = min(max(0, centre - minimum / 2), max(0, limit - minimum))
+            high = min(limit, low + minimum)
+        box.append((int(low), int(math.ceil(high))))
+    (left, right), (top, bottom) = box
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
+
+
+class PreparedImage:
+    """
+    This class holds an image ready to send to the model, with its size
+    and an estimate of the tokens it costs.
+    """
+
+    def __init__(self, data, width, height, region=None, hash=None):
+        """
+        :param data: The JPEG image as bytes.
+        :param region: The (left, top, right, bottom) box cropped from the screenshot, or None.
+        :param hash: The perceptual hash of the image.
+        """
+        self.data = data
+        self.width = width
+        self.height = height
+        self.region = region
+        self.hash = hash
+        self.estimated_tokens = estimate_image_tokens(width, height)
+
+    def to_dict(self):
+        return {
+            "width": self.width,
+            "height": self.height,
+            "bytes": len(self.data),
+            "estimated_tokens": self.estimated_tokens,
+            "region": self.region,
+        }
+
+
+class ImagePreparer:
+    """
+    This class turns a screenshot into the image sent to the vision model.
+    Screenshots are taken at a fixed viewport size, cropped to the booking
+    related part of the page when it can be found and scaled down to fit the
+    target dimensions, so small text such as time slots stays readable
+    without sending more pixels than needed.
+    """
+
+    def __init__(self, max_width=1024, max_height=1024, viewport=(1280, 800), quality=60, crop=True, padding=48, min_crop=(512, 384)):
+        """
+        :param max_width: The maximum width of the image sent to the model.
+        :param max_height: The maximum height of the image sent to the model.
+        :param viewport: The (width, height) the browser window is set to before a screenshot.
+        :param quality: The JPEG quality. 1-100 (100 is best).
+        :param crop: If True, crop to the booking related elements on the page.
+        :param padding: Pixels kept around the booking related elements.
+        :param min_crop: The minimum (width, height) of a cropped region.
+        """
+        self.max_width = max_width
+        self.max_height = max_height
+        self.viewport = viewport
+        self.quality = quality
+        self.crop = crop
+        self.padding = padding
+        self.min_crop = min_crop
+
+    def find_regions(self, driver):
+        """
+        Finds the booking related elements on the page, scrolling to them if needed.
+
+        :return: A (rects, scale) tuple, rects is empty if none were found.
+        """
+        if not self.crop:
+            driver.execute_script("window.scrollTo(0, 0);")
+            return [], 1.0
+        try:
+            result = driver.execute_script(BOOKING_ELEMENTS_SCRIPT, PROVIDER_HOSTS)
+            return result.get("rects") or [], float(result.get("scale") or 1.0)
+        except Exception as e:
+            logging.warning(f"An error occurred while finding booking elements: {e}")
+            return [], 1.0
+
+    def prepare(self, png, rects=None, scale=1.0, quality=None):
+        """
+        :param png: The screenshot as PNG bytes.
+        :param rects: Booking related element rectangles in CSS pixels.
+        :param scale: The number of screenshot pixels per CSS pixel.
+        :param quality: Overrides the JPEG quality.
+        :return: The PreparedImage.
+        """
+        image = Image.open(io.BytesIO(png)).convert("RGB")
+        region = region_of_interest(rects, image.size, scale, self.padding, self.min_crop) if self.crop else None
+        if region is not None:
+            image = image.crop(region)
+        image.thumbnail((self.max_width, self.max_height))
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality or self.quality)
+        return PreparedImage(buffer.getvalue(), image.width, image.height, region, perceptual_hash(image))
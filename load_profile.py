@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Analytics, advertising and chat widget hosts restaurant websites commonly load
+DEFAULT_BLOCKED_HOSTS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "googleadservices.com", "adservice.google.com", "connect.facebook.net", "analytics.tiktok.com",
+    "ct.pinterest.com", "snap.licdn.com", "sc-static.net", "bat.bing.com", "clarity.ms", "hotjar.com",
+    "fullstory.com", "segment.com", "segment.io", "mixpanel.com", "amplitude.com", "newrelic.com", "nr-data.net",
+    "intercom.io", "intercomcdn.com", "tawk.to", "crisp.chat", "livechatinc.com", "drift.com", "olark.com",
+    "zopim.com", "zdassets.com", "amazon-adsystem.com", "criteo.com", "criteo.net", "taboola.com",
+    "outbrain.com", "quantserve.com", "scorecardresearch.com", "adsrvr.org", "klaviyo.com",
+]
+FONT_PATTERNS = ["*.woff*", "*.ttf*", "*.otf*", "*.eot*", "*fonts.googleapis.com*", "*fonts.gstatic.com*", "*use.typekit.net*"]
+MEDIA_PATTERNS = ["*.mp4*", "*.webm*", "*.mov*", "*.m4v*", "*.mp3*", "*.m4a*", "*.ogg*", "*.wav*"]
+
+# Typical transfer sizes in bytes by resource type, used to estimate what blocking saved
+TYPICAL_BYTES = {"Script": 60_000, "Image": 40_000, "Font": 35_000, "Media": 500_000, "Stylesheet": 20_000, "XHR": 5_000, "Fetch": 5_000}
+OTHER_BYTES = 10_000
+
+
+class LoadProfile:
+    """
+    This class describes how Chrome loads pages for scraping. Navigation
+    returns once the DOM is ready instead of waiting for every resource, and
+    requests to tracker, ad and chat widget hosts, and optionally fonts and
+    media, are blocked through the DevTools protocol. The requests blocked on
+    each page can be reported along with an estimate of the bytes saved.
+    """
+
+    def __init__(self, page_load_strategy="eager", blocked_hosts=None, block_fonts=False, block_media=False, page_load_timeout=30, report=True):
+        """
+        :param page_load_strategy: "eager" returns from driver.get once the DOM is ready, "normal" waits for the load event.
+        :param blocked_hosts: Hosts whose requests are blocked, defaults to DEFAULT_BLOCKED_HOSTS.
+        :param block_fonts: If True, web fonts are blocked.
+        :param block_media: If True, video and audio are blocked.
+        :param page_load_timeout: Seconds driver.get may take before it raises.
+        :param report: If True, network events are logged so blocked requests can be reported.
+        """
+        self.page_load_strategy = page_load_strategy
+        self.blocked_hosts = list(DEFAULT_BLOCKED_HOSTS if blocked_hosts is None else blocked_hosts)
+        self.block_fonts = block_fonts
+        self.block_media = block_media
+        self.page_load_timeout = page_load_timeout
+        self.report_enabled = report
+
+    @classmethod
+    def from_env(cls):
+        """
+        Creates a profile from the LOAD_STRATEGY, LOAD_BLOCKED_HOSTS (comma separated,
+        added to the defaults), LOAD_BLOCK_FONTS and LOAD_BLOCK_MEDIA environment variables.
+        """
+        extra_hosts = [host.strip() for host in os.getenv("LOAD_BLOCKED_HOSTS", "").split(",") if host.strip()]
+        return cls(page_load_strategy=os.getenv("LOAD_STRATEGY", "eager"),
+                   blocked_hosts=DEFAULT_BLOCKED_HOSTS + extra_hosts,
+                   block_fonts=os.getenv("LOAD_BLOCK_FONTS", "0") == "1",
+                   block_media=os.getenv("LOAD_BLOCK_MEDIA", "0") == "1")
+
+    def blocked_url_patterns(self):
+        """
+        :return: The URL patterns passed to Network.setBlockedURLs.
+        """
+        patterns = [f"*://{host}/*" for host in self.blocked_hosts] + [f"*.{host}/*" for host in self.blocked_hosts]
+        if self.block_fonts:
+            patterns += FONT_PATTERNS
+        if self.block_media:
+            patterns += MEDIA_PATTERNS
+        return patterns
+
+    def apply_options(self, chrome_options):
+        """
+        Sets the options that must be given before Chrome starts.
+        """
+        chrome_options.page_load_strategy = self.page_load_strategy
+        if self.report_enabled:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+            chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
+    def apply(self, driver):
+        """
+        Starts blocking requests in the driver's current tab. Blocking is set
+        per tab, so this is called again after switching to a new tab.
+        """
+        driver.set_page_load_timeout(self.page_load_timeout)
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_url_patterns()})
+        # Lets code holding only the driver find its profile, e.g. to report
+        driver.load_profile = self
+
+    def report(self, driver):
+        """
+        Counts the requests made and blocked since the last report.
+
+        :return: A dictionary with the number of requests, blocked requests,
+                 bytes loaded and estimated bytes saved, or None if reporting is off.
+        """
+        if not self.report_enabled:
+            return None
+        try:
+            entries = driver.get_log("performance")
+        except Exception as e:
+            logging.warning(f"An error occurred while reading the performance log: {e}")
+            return None
+        result = {"requests": 0, "blocked_requests": 0, "bytes_loaded": 0, "estimated_bytes_saved": 0}
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            method, params = message.get("method"), message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                result["requests"] += 1
+            elif method == "Network.loadingFinished":
+                result["bytes_loaded"] += int(params.get("encodedDataLength", 0))
+            elif method == "Network.loadingFailed" and params.get("blockedReason"):
+                result["blocked_requests"] += 1
+                result["estimated_bytes_saved"] += TYPICAL_BYTES.get(params.get("type"), OTHER_BYTES)
+        if result["requests"]:
+            logging.info(f"Page load: {result['requests']} requests, {result['blocked_requests']} blocked, "
+                         f"{result['bytes_loaded']} bytes loaded, ~{result['estimated_bytes_saved']} bytes saved.")
+        return result
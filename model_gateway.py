@@ -0,0 +1,189 @@
+import logging
+import os
+import random
+import threading
+import time
+
+from mistralai import Mistral
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# HTTP statuses worth retrying, rate limits and server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ModelGatewayError(Exception):
+    """
+    Raised when a model request fails or cannot be sent before its deadline.
+    """
+
+
+class TokenBucket:
+    """
+    This class limits the rate of requests: each request takes a token, and
+    tokens are added at a fixed rate up to a maximum, which allows short bursts.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        :param rate: Tokens added per second.
+        :param capacity: The maximum number of tokens, the largest burst allowed.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """
+        Takes a token, waiting for one if needed.
+
+        :param deadline: Optional time.monotonic() value after which to give up.
+        :return: True if a token was taken, False if the deadline came first.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class ModelGateway:
+    """
+    This class sends every chat request of the process through one Mistral
+    client, so its connections are reused. Requests are rate limited with a
+    token bucket and the number in flight is capped, which keeps many
+    parallel walks under the API's rate limit. Transient failures are retried
+    with jittered exponential backoff until the request's deadline.
+    """
+
+    def __init__(self, api_key=None, rate=2.0, burst=4, max_in_flight=4, max_retries=3, backoff=0.5, request_timeout=10, client=None):
+        """
+        :param api_key: The Mistral API key, defaults to MISTRAL_API_KEY.
+        :param rate: Requests started per second on average.
+        :param burst: Requests that may start at once after a quiet period.
+        :param max_in_flight: The maximum number of requests waiting for an answer.
+        :param max_retries: Retries after a transient failure.
+        :param backoff: Seconds before the first retry, doubled for each following one.
+        :param request_timeout: Seconds a single attempt may take.
+        :param client: Optional client to use instead of creating one.
+        """
+        self.client = client or Mistral(api_key=api_key or os.environ["MISTRAL_API_KEY"])
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.request_timeout = request_timeout
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_retryable(error):
+        status = getattr(error, "status_code", None)
+        # Errors without a status are timeouts and connection failures
+        return status is None or status in RETRYABLE_STATUSES
+
+    def _record(self, model, latency=None, error=False, retry=False):
+        with self._lock:
+            stats = self._stats.setdefault(model, {"requests": 0, "errors": 0, "retries": 0,
+                                                   "total_latency": 0.0, "max_latency": 0.0})
+            if retry:
+                stats["retries"] += 1
+                return
+            stats["requests"] += 1
+            if error:
+                stats["errors"] += 1
+            if latency is not None:
+                stats["total_latency"] += latency
+                stats["max_latency"] = max(stats["max_latency"], latency)
+
+    def complete(self, model, messages, deadline=None):
+        """
+        Sends a chat request, retrying transient failures.
+
+        :param model: The name of the model.
+        :param messages: The chat messages.
+        :param deadline: Optional time.monotonic() value after which no more
+                         attempts are made, defaults to one request timeout
+                         plus the retries.
+        :return: The content of the model's answer.
+        :raises ModelGatewayError: If every attempt failed or the deadline passed.
+        """
+        start = time.monotonic()
+        if deadline is None:
+            deadline = start + self.request_timeout * (self.max_retries + 1)
+        attempt = 0
+        while True:
+            if time.monotonic() >= deadline or not self.bucket.acquire(deadline):
+                self._record(model, error=True)
+                raise ModelGatewayError(f"Deadline passed before a {model} request could be sent.")
+            if not self._in_flight.acquire(timeout=max(0, deadline - time.monotonic())):
+                self._record(model, error=True)
+                raise ModelGatewayError(f"Too many {model} requests in flight until the deadline.")
+            try:
+                remaining = deadline - time.monotonic()
+                timeout_ms = int(max(1, min(self.request_timeout, remaining)) * 1000)
+                response = self.client.chat.complete(model=model, messages=messages, timeout_ms=timeout_ms)
+                self._record(model, latency=time.monotonic() - start)
+                return response.choices[0].message.content
+            except Exception as e:
+                error = e
+            finally:
+                self._in_flight.release()
+            sleep = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            if attempt >= self.max_retries or not self._is_retryable(error) or time.monotonic() + sleep >= deadline:
+                self._record(model, latency=time.monotonic() - start, error=True)
+                raise ModelGatewayError(f"{model} request failed after {attempt + 1} attempts: {error}") from error
+            logging.info(f"Retrying {model} request in {sleep:.2f}s after: {error}")
+            self._record(model, retry=True)
+            attempt += 1
+            time.sleep(sleep)
+
+    def stats(self):
+        """
+        :return: A dictionary of request, error and retry counters and the
+                 average and maximum latency in seconds for each model.
+        """
+        with self._lock:
+            return {
+                model: dict(stats, average_latency=stats["total_latency"] / stats["requests"] if stats["requests"] else 0.0)
+                for model, stats in self._stats.items()
+            }
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def gateway_from_env(share=1):
+    """
+    Creates a gateway with limits from the MODEL_RATE, MODEL_BURST and
+    MODEL_MAX_IN_FLIGHT environment variables.
+
+    :param share: The number of processes splitting the limits, e.g. walker
+                  farm workers, so together they stay within them.
+    """
+    return ModelGateway(rate=float(os.getenv("MODEL_RATE", 2.0)) / share,
+                        burst=max(1, int(os.getenv("MODEL_BURST", 4)) // share),
+                        max_in_flight=max(1, int(os.getenv("MODEL_MAX_IN_FLIGHT", 4)) // share))
+
+
+def get_gateway():
+    """
+    Returns the gateway shared by the whole process, creating it on first use
+    with the limits from the environment.
+    """
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = gateway_from_env()
+        return _gateway
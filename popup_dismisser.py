@@ -0,0 +1,168 @@
+import logging
+
+from selenium.common.exceptions import NoAlertPresentException
+
+from booking_extractors import BOOKING_PROVIDERS
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Accept buttons of the common consent management platforms
+CONSENT_SELECTORS = [
+    "#onetrust-accept-btn-handler",
+    "#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll",
+    "#CybotCookiebotDialogBodyButtonAccept",
+    "#didomi-notice-agree-button",
+    ".qc-cmp2-summary-buttons button[mode='primary']",
+    "#truste-consent-button",
+    ".osano-cm-accept-all",
+    ".cky-btn-accept",
+    ".cmplz-accept",
+    "[data-tid='banner-accept']",
+    ".iubenda-cs-accept-btn",
+    ".cc-allow",
+    ".cc-dismiss",
+    "#wt-cli-accept-all-btn",
+    "#cookie_action_close_header",
+    "button.sp_choice_type_11",
+    "[data-testid='uc-accept-all-button']",
+]
+# Button texts that accept cookies inside a consent banner
+CONSENT_TEXTS = [
+    "accept all cookies", "accept all", "allow all cookies", "allow all", "accept cookies", "allow cookies",
+    "accept", "i accept", "i agree", "agree", "agree and close", "yes, i agree", "got it", "ok", "okay", "continue",
+]
+# Button texts and labels that close other overlays, e.g. newsletter signups
+CLOSE_TEXTS = ["close", "×", "✕", "x", "no thanks", "no, thanks", "dismiss", "not now", "maybe later"]
+# Frames worth looking inside, consent banners are often served from their own origin
+CONSENT_FRAME_HINTS = ["consent", "cookie", "cmp", "sp_message", "privacy", "gdpr"]
+# Hosts of booking widgets, a dialog framing one of them is never closed
+PROVIDER_HOSTS = [domain for domains in BOOKING_PROVIDERS.values() for domain in domains]
+
+# Clicks the visible consent accept buttons and overlay close buttons in the
+# current document, including open shadow roots, and returns what it clicked.
+# With overlays null, overlays are only closed the first time the script
+# runs in a document, so a dialog opened by a click on the page stays open.
+# Dialogs that look like a booking widget are never closed.
+DISMISS_SCRIPT = """
+const [selectors, consentTexts, closeTexts, providerHosts, overlayMode] = arguments;
+const dismissed = [];
+const visible = element => {
+    const rect = element.getBoundingClientRect();
+    const style = window.getComputedStyle(element);
+    return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+};
+const label = element => (element.innerText || element.value || element.getAttribute('aria-label') || element.title || '')
+    .trim().toLowerCase().replace(/\\s+/g, ' ');
+const describe = (element, reason) => reason + ': ' + element.tagName.toLowerCase() +
+    (element.id ? '#' + element.id : '') + ' "' + label(element).slice(0, 40) + '"';
+const click = (element, reason) => {
+    try { element.click(); dismissed.push(describe(element, reason)); return true; } catch (e) { return false; }
+};
+const roots = [document];
+for (const host of document.querySelectorAll('#usercentrics-root, #cmpwrapper, [id*="consent"]')) {
+    if (host.shadowRoot) roots.push(host.shadowRoot);
+}
+let accepted = false;
+for (const root of roots) {
+    for (const selector of selectors) {
+        const element = root.querySelector(selector);
+        if (element && visible(element) && click(element, 'consent')) { accepted = true; break; }
+    }
+    if (accepted) break;
+}
+const clickables = root => root.querySelectorAll('button, a, [role="button"], input[type="button"], input[type="submit"]');
+const banners = Array.from(document.querySelectorAll(
+    '[id*="cookie" i], [class*="cookie" i], [id*="consent" i], [class*="consent" i], [id*="gdpr" i], [class*="gdpr" i], [aria-label*="cookie" i]'))
+    .filter(visible);
+if (!accepted) {
+    outer: for (const text of consentTexts) {
+        for (const banner of banners) {
+            for (const element of clickables(banner)) {
+                if (visible(element) && label(element) === text && click(element, 'consent')) { accepted = true; break outer; }
+            }
+        }
+    }
+}
+const newDocument = !window.__table42PopupsSeen;
+window.__table42PopupsSeen = true;
+const closeOverlays = overlayMode === null ? newDocument : overlayMode;
+const bookingText = /\\b(book\\w*|reserv\\w*|table for|party size|guests|covers|availability)\\b/i;
+const isBooking = element =>
+    Array.from(element.querySelectorAll('iframe[src]')).some(frame => providerHosts.some(host => frame.src.includes(host))) ||
+    element.querySelector('input[type="date"], input[type="time"], input[type="datetime-local"]') !== null ||
+    bookingText.test(element.innerText || '');
+const overlays = closeOverlays ? Array.from(document.querySelectorAll(
+    '[role="dialog"], [aria-modal="true"], [class*="modal" i], [class*="popup" i], [class*="newsletter" i]'))
+    .filter(element => visible(element) && !banners.includes(element) && !isBooking(element)) : [];
+for (const overlay of overlays) {
+    for (const element of clickables(overlay)) {
+        const text = label(element);
+        if (visible(element) && (closeTexts.includes(text) || /^close\\b/.test(text)) && click(element, 'overlay')) break;
+    }
+}
+return dismissed;
+"""
+
+
+class PopupDismisser:
+    """
+    This class clears what usually covers a page before the walker can read
+    it: cookie consent banners, newsletter and other modal overlays, and
+    JavaScript alerts. Each document is handled in one script call that knows
+    the accept buttons of the common consent platforms, and frames that look
+    like consent banners are handled the same way.
+    """
+
+    def __init__(self, max_frames=3):
+        """
+        :param max_frames: The maximum number of frames looked inside per page.
+        """
+        self.max_frames = max_frames
+
+    def _dismiss_in_document(self, driver, overlays):
+        return driver.execute_script(DISMISS_SCRIPT, CONSENT_SELECTORS, CONSENT_TEXTS, CLOSE_TEXTS,
+                                     PROVIDER_HOSTS, overlays) or []
+
+    def _consent_frames(self, driver):
+        frames = driver.execute_script(
+            "const hints = arguments[0];"
+            "return Array.from(document.querySelectorAll('iframe')).filter(frame => {"
+            "  const rect = frame.getBoundingClientRect();"
+            "  const text = [frame.id, frame.name, frame.title, frame.src].join(' ').toLowerCase();"
+            "  return rect.width > 0 && rect.height > 0 && hints.some(hint => text.includes(hint));"
+            "});", CONSENT_FRAME_HINTS)
+        return (frames or [])[:self.max_frames]
+
+    def dismiss(self, driver, overlays=None):
+        """
+        Dismisses any alert, consent banner and overlay on the current page.
+
+        :param overlays: True or False to close overlays or not, None only
+                         closes them on a document not seen before, so a
+                         booking dialog opened by the walker stays open.
+        :return: A list describing what was dismissed.
+        """
+        dismissed = []
+        try:
+            # Checking for an alert does not wait, unlike waiting for alert_is_present
+            alert = driver.switch_to.alert
+            dismissed.append(f"alert: {alert.text}")
+            alert.dismiss()
+        except NoAlertPresentException:
+            pass
+        except Exception as e:
+            logging.warning(f"An error occurred while dismissing an alert: {e}")
+        try:
+            dismissed.extend(self._dismiss_in_document(driver, overlays))
+            for frame in self._consent_frames(driver):
+                try:
+                    driver.switch_to.frame(frame)
+                    dismissed.extend(f"frame {item}" for item in self._dismiss_in_document(driver, False))
+                finally:
+                    driver.switch_to.default_content()
+        except Exception as e:
+            logging.warning(f"An error occurred while dismissing popups: {e}")
+        if dismissed:
+            logging.info(f"Dismissed popups: {dismissed}")
+        return dismissed
@@ -19,7 +19,10 @@ class PromptStorage():
                         { "available_times": null,
                            "next_button": <button_text> 
                         }. 
-                        
+                        If there are no available times and no next button,
+                        return 
+                        { "available_times": null,
+                            "next_button": null } 
                         '''
                         + f''' 
                         The user is looking for a time between 
@@ -86,6 +89,7 @@ class PromptStorage():
             ]
         
         prompt_dispatch = {
+            "html_1": html_1,
             "image_1": image_1
         }
 
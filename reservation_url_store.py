@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+
+from sqlite_cache import SqliteCache
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class ReservationUrlStore:
+    """
+    This class remembers the reservation page of each restaurant website so a
+    walk can start on the booking page instead of the home page. Entries are
+    persisted in SQLite so they are shared between walkers, workers and
+    restarts. It behaves like the dictionary WebsiteWalker.cached_urls used to be.
+    """
+
+    def __init__(self, path="reservation_urls.sqlite3", ttl=30 * 24 * 3600):
+        """
+        :param path: The SQLite database file.
+        :param ttl: Seconds after its last validation that an entry is trusted.
+        """
+        self.ttl = ttl
+        self._db = SqliteCache(path, "reservation_urls", ttl=ttl)
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def warm_load(self):
+        """
+        Loads every stored entry into memory, e.g. at startup.
+
+        :return: The number of entries loaded.
+        """
+        entries = {website: (value['url'], stored_at) for website, value, stored_at in self._db.items()}
+        with self._lock:
+            self._memory.update(entries)
+        logging.info(f"Loaded {len(entries)} reservation page URLs.")
+        return len(entries)
+
+    def _lookup(self, website):
+        with self._lock:
+            entry = self._memory.get(website)
+        if entry is not None and (self.ttl is None or time.time() - entry[1] <= self.ttl):
+            return entry
+        cached = self._db.get_entry(website)
+        if cached is None:
+            return None
+        entry = (cached[0]['url'], cached[1])
+        with self._lock:
+            self._memory[website] = entry
+        return entry
+
+    def get(self, website, default=None):
+        entry = self._lookup(website)
+        return default if entry is None else entry[0]
+
+    def validated_at(self, website):
+        """
+        :return: The time.time() at which the page last yielded times, or None.
+        """
+        entry = self._lookup(website)
+        return None if entry is None else entry[1]
+
+    def __contains__(self, website):
+        return self._lookup(website) is not None
+
+    def __getitem__(self, website):
+        entry = self._lookup(website)
+        if entry is None:
+            raise KeyError(website)
+        return entry[0]
+
+    def __setitem__(self, website, url):
+        """
+        Stores the reservation page of a website, marking it validated now.
+        """
+        self._db.set(website, {"url": url})
+        with self._lock:
+            self._memory[website] = (url, time.time())
+
+    def __delitem__(self, website):
+        with self._lock:
+            self._memory.pop(website, None)
+        self._db.delete(website)
+
+    def __len__(self):
+        return len(self._db)
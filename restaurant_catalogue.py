@@ -0,0 +1,186 @@
+import copy
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from google_list_scraper import GoogleMapsScraper
+from google_restaurant_info import GoogleRestaurantInfo
+from spatial_index import GridIndex
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class RestaurantCatalogue:
+    """
+    This class keeps the restaurant list of a Google Maps list up to date in
+    the background. Each refresh scrapes the list, resolves the names with the
+    Places API and stores the result as a new numbered snapshot, so requests
+    read the latest snapshot instead of scraping. The latest snapshot is also
+    kept in a spatial index so area queries only test nearby restaurants.
+    """
+
+    def __init__(self, list_url, driver_pool, places_cache=None, path="catalogue.sqlite3", refresh_interval=6 * 3600, keep_snapshots=10):
+        """
+        :param list_url: The Google Maps list URL to scrape.
+        :param driver_pool: The DriverPool to lease a browser from when scraping.
+        :param places_cache: Optional PlacesCache used when resolving names.
+        :param path: The SQLite database file holding the snapshots.
+        :param refresh_interval: Seconds between scheduled refreshes.
+        :param keep_snapshots: The number of snapshots kept on disk.
+        """
+        self.list_url = list_url
+        self.driver_pool = driver_pool
+        self.places_cache = places_cache
+        self.refresh_interval = refresh_interval
+        self.keep_snapshots = keep_snapshots
+        self._db_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "version INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, "
+                "list_url TEXT NOT NULL, restaurants TEXT NOT NULL)"
+            )
+        self.index = GridIndex()
+        self._latest = self._load_latest()
+        self._ready = threading.Event()
+        if self._latest is not None:
+            self.index.update(json.loads(self._latest["restaurants"]))
+            self._ready.set()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _load_latest(self):
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT version, created_at, restaurants FROM snapshots WHERE list_url = ? "
+                "ORDER BY version DESC LIMIT 1", (self.list_url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"version": row[0], "created_at": row[1], "restaurants": row[2]}
+
+    def _scrape_names(self):
+        with self.driver_pool.lease() as driver:
+            scraper = GoogleMapsScraper(driver=driver)
+            return scraper.get_restaurant_names(self.list_url)
+
+    def _resolve(self, restaurant_names):
+        google_maps_api = GoogleRestaurantInfo(cache=self.places_cache)
+        return google_maps_api.get_places_from_queries(restaurant_names)
+
+    def refresh(self):
+        """
+        Scrapes the list and stores a new snapshot. If the scrape finds no
+        restaurants the previous snapshot is kept.
+
+        :return: The version of the new snapshot, or None if none was stored.
+        """
+        with self._refresh_lock:
+            start = time.monotonic()
+            restaurant_names = self._scrape_names()
+            if not restaurant_names:
+                logging.warning(f"No restaurants scraped from {self.list_url}, keeping the previous snapshot.")
+                return None
+            restaurants = self._resolve(restaurant_names)
+            encoded = json.dumps(restaurants)
+            created_at = time.time()
+            with self._db_lock, self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO snapshots (created_at, list_url, restaurants) VALUES (?, ?, ?)",
+                    (created_at, self.list_url, encoded)
+                )
+                version = cursor.lastrowid
+                self._conn.execute(
+                    "DELETE FROM snapshots WHERE list_url = ? AND version NOT IN ("
+                    "SELECT version FROM snapshots WHERE list_url = ? ORDER BY version DESC LIMIT ?)",
+                    (self.list_url, self.list_url, self.keep_snapshots)
+                )
+            self.index.update(json.loads(encoded))
+            self._latest = {"version": version, "created_at": created_at, "restaurants": encoded}
+            self._ready.set()
+            logging.info(f"Restaurant snapshot {version} stored with {len(restaurants)} restaurants "
+                         f"in {time.monotonic() - start:.1f}s.")
+            return version
+
+    def latest(self, wait=None):
+        """
+        Returns the latest snapshot. The restaurants are a fresh copy, so the
+        caller may modify them.
+
+        :param wait: Seconds to wait for the first snapshot if there is none yet.
+        :return: A dictionary with version, created_at and restaurants, or None.
+        """
+        if wait is not None:
+            self._ready.wait(wait)
+        latest = self._latest
+        if latest is None:
+            return None
+        return {
+            "version": latest["version"],
+            "created_at": latest["created_at"],
+            "restaurants": json.loads(latest["restaurants"]),
+        }
+
+    @property
+    def version(self):
+        """
+        The version of the latest snapshot, or None if there is none yet.
+        """
+        latest = self._latest
+        return latest["version"] if latest is not None else None
+
+    def find_in_area(self, area_filter, wait=None):
+        """
+        Returns the restaurants of the latest snapshot inside an area. The
+        restaurants are a fresh copy, so the caller may modify them.
+
+        :param area_filter: The AreaFilter describing the area.
+        :param wait: Seconds to wait for the first snapshot if there is none yet.
+        :return: A dictionary with version, created_at and restaurants, or None.
+        """
+        if wait is not None:
+            self._ready.wait(wait)
+        latest = self._latest
+        if latest is None:
+            return None
+        return {
+            "version": latest["version"],
+            "created_at": latest["created_at"],
+            "restaurants": copy.deepcopy(self.index.query_area(area_filter)),
+        }
+
+    def request_refresh(self):
+        """
+        Asks the background thread to refresh now instead of waiting for the schedule.
+        """
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            latest = self._latest
+            if latest is None or time.time() - latest["created_at"] >= self.refresh_interval or self._wake.is_set():
+                self._wake.clear()
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logging.warning(f"An error occurred while refreshing the restaurant list: {e}")
+            # Retry sooner while there is no snapshot to serve
+            self._wake.wait(self.refresh_interval if self._latest is not None else 60)
+
+    def start(self):
+        """
+        Starts refreshing in a background thread.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="restaurant-catalogue", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
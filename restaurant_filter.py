@@ -1,73 +1,264 @@
 from pprint import pprint
+import concurrent.futures
 import logging
+import time
+from datetime import date, datetime
 from google_list_scraper import GoogleMapsScraper
+from area_filter import AreaFilter
+from driver_pool import DriverPool
 from google_restaurant_info import GoogleRestaurantInfo
-from selenium_ai import WebsiteWalker
+from http_prepass import HttpPrepass
+from selenium_ai import WebsiteWalker, TimeRange
+from walker_farm import NO_TIMES, TIMEOUT, TIMES
 
 # Configure logging
 logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
 class RestaurantFilter:
-    def __init__(self, restaurants):
+    def __init__(self, restaurants, driver_pool=None, places=None, reservation_urls=None, availability_cache=None, response_cache=None, http_prepass=None, walker_farm=None):
         """
         Restaurant list should be a list of dictionaries gathered from the 
         Google Places API.
+
+        :param driver_pool: Optional DriverPool, or TabBrowser, to lease
+                            browsers from when walking websites. If not given, a pool is created
+                            for each time filter and shut down afterwards.
+        :param places: Optional GoogleRestaurantInfo that already looked up
+                       the restaurants, so its answers are reused.
+        :param reservation_urls: Optional mapping from a website to its
+                                 reservation page, shared by every walker.
+        :param availability_cache: Optional TTLCache of the times recently
+                                   found on each website.
+        :param response_cache: Optional TTLCache of model answers for pages
+                               that look the same, shared by every walker.
+        :param http_prepass: The HttpPrepass looking at websites without a
+                             browser before they are walked.
+        :param walker_farm: Optional WalkerFarm walking websites in worker
+                            processes instead of leasing from the driver pool.
         """
         self.restaurants = restaurants
+        self.driver_pool = driver_pool
+        self.places = places or GoogleRestaurantInfo()
+        self.reservation_urls = reservation_urls if reservation_urls is not None else {}
+        self.availability_cache = availability_cache
+        self.response_cache = response_cache
+        self.http_prepass = http_prepass or HttpPrepass()
+        self.walker_farm = walker_farm
 
     def filter(self, criteria):
         return [restaurant for restaurant in self.restaurants if criteria(restaurant)]
+
+    def filter_concurrently(self, criteria, max_workers=4, timeout=None):
+        """
+        Same as filter, but evaluates the criteria for up to max_workers
+        restaurants at once. The result keeps the order of self.restaurants.
+
+        :param criteria: Function taking a restaurant and returning a bool.
+        :param max_workers: The maximum number of criteria running at once.
+        :param timeout: Seconds each restaurant is given before it is treated
+                        as not matching, None waits forever.
+        :return: The restaurants matching the criteria.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            matches = list(executor.map(
+                lambda restaurant: self._run_criteria(criteria, restaurant, timeout),
+                self.restaurants
+            ))
+        return [restaurant for restaurant, match in zip(self.restaurants, matches) if match]
+
+    def iter_concurrently(self, criteria, max_workers=4, timeout=None):
+        """
+        Evaluates the criteria like filter_concurrently, but yields each
+        restaurant as soon as its criteria finishes, in completion order.
+
+        :return: A generator of (restaurant, matches) tuples.
+        """
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {
+                executor.submit(self._run_criteria, criteria, restaurant, timeout): restaurant
+                for restaurant in self.restaurants
+            }
+            for future in concurrent.futures.as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # If the caller stops early, e.g. a client disconnects, drop the checks not yet started
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _run_criteria(criteria, restaurant, timeout):
+        """
+        Runs the criteria for a single restaurant. The criteria gets its own
+        thread so the timeout starts when this restaurant starts, not when it
+        was queued. Errors and timeouts count as not matching.
+        """
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(criteria, restaurant)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            logging.warning(f"Timed out after {timeout}s checking {restaurant.get('name')}")
+            return False
+        except Exception as e:
+            logging.warning(f"An error occurred while checking {restaurant.get('name')}: {e}")
+            return False
+        finally:
+            # Do not wait for a timed out check, it stops at its own deadline
+            executor.shutdown(wait=False)
     
     def filter_by_area(self, coordinates):
-        def criteria(restaurant):
-            """
-            Check if the restaurant is within the selected area
-            We do this by making a line from the restaurant to some arbitrary 
-            point outside the area and checking how many times it intersects 
-            with the area. 
-            """
-
-            lat = restaurant['geometry']['location']['lat']
-            lng = restaurant['geometry']['location']['lng']
-            test_line = {'lat1': lat, 'lng1': lng, 'lat2': 0.0, 'lng2': 0.0}
-            sides = []
-            prev = coordinates[0]
-            for i in range(1, len(coordinates)):
-                side = {'lat1': prev[1], 'lng1': prev[0], 'lat2': coordinates[i][1], 'lng2': coordinates[i][0]}
-                prev = coordinates[i]
-                sides.append(side)
-            
-            intersections = 0
-            for side in sides:
-                # Check if the test line intersects with the side
-                if (test_line['lat1'] > side['lat1']) != (test_line['lat2'] > side['lat1']) and (test_line['lng1'] < side['lng1'] or test_line['lng2'] < side['lng1']):
-                    intersections += 1
-            
-            return intersections % 2 == 1
-            
-        return self.filter(criteria)
-    
-    def filter_by_time(self, dining_time):
         """
-        TODO: Check if dining time is in the same format as restaurant_times
+        Keeps the restaurants inside a single polygon ring.
+
+        :param coordinates: The ring as a list of [lng, lat] positions.
         """
+        return self.filter_by_area_filter(AreaFilter.from_ring(coordinates))
+
+    def filter_by_geometry(self, geometry):
+        """
+        Keeps the restaurants inside a GeoJSON Polygon or MultiPolygon, holes included.
+
+        :param geometry: The geometry, or a Feature holding it, as drawn with Mapbox Draw.
+        """
+        return self.filter_by_area_filter(AreaFilter.from_geojson(geometry))
+
+    def filter_by_area_filter(self, area_filter):
+        """
+        Tests every restaurant against the area in one batch.
+
+        :param area_filter: The AreaFilter describing the area.
+        """
+        if not self.restaurants:
+            return []
+        locations = [restaurant['geometry']['location'] for restaurant in self.restaurants]
+        inside = area_filter.contains([location['lng'] for location in locations],
+                                      [location['lat'] for location in locations])
+        return [restaurant for restaurant, is_inside in zip(self.restaurants, inside) if is_inside]
+
+    @staticmethod
+    def _availability_key(website, time_range):
+        return f"{website}|{time_range.start.isoformat()}|{time_range.end.isoformat()}"
+
+    def _time_criteria(self, dining_time, driver_pool, day, timeout):
+        """
+        Builds the criteria checking a restaurant's website for a table at the
+        dining time. The times found are stored on each restaurant under
+        'availability', along with when they were checked, whether they
+        came from the cache and the outcome of the check.
+        """
+        # The walker reports times as "HH:MM" strings
+        if not isinstance(dining_time, str):
+            dining_time = dining_time.strftime("%H:%M")
+        time_range = TimeRange.for_day(day or date.today())
+
         def criteria(restaurant):
-            walker = WebsiteWalker()
-            google_maps_api = GoogleRestaurantInfo()
-            info = google_maps_api.get_details_from_queries([restaurant['name']])
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            website = self.places.get_website(restaurant)
             
-            if info[0].get('website'):
-                logging.info(f"Walking website of {restaurant['name']}")
-                logging.info(info[0]['website'])
-                restaurant_times = walker.walk_website(info[0]['website'])
+            if website:
+                key = self._availability_key(website, time_range)
+                cached = self.availability_cache.get_entry(key) if self.availability_cache is not None else None
+                if cached is not None:
+                    logging.info(f"Using cached times for {restaurant['name']}")
+                    restaurant_times, checked_at = cached
+                    outcome = TIMES
+                else:
+                    # A known reservation page needs a browser anyway
+                    prepass = None if website in self.reservation_urls else self.http_prepass.check(website, time_range)
+                    if prepass is not None and "available_times" in prepass:
+                        logging.info(f"Found times for {restaurant['name']} without a browser")
+                        restaurant_times = prepass["available_times"]
+                        outcome = TIMES if restaurant_times else NO_TIMES
+                    elif self.walker_farm is not None:
+                        result = self._walk_in_farm(website, time_range, deadline, prepass and prepass["start_url"])
+                        restaurant_times, outcome = result["available_times"], result["outcome"]
+                    else:
+                        logging.info(f"Walking website of {restaurant['name']}")
+                        logging.info(website)
+                        with driver_pool.lease(timeout=timeout) as driver:
+                            walker = WebsiteWalker(driver=driver, cached_urls=self.reservation_urls,
+                                                   response_cache=self.response_cache)
+                            restaurant_times = walker.walk_website(website, deadline=deadline, time_range=time_range,
+                                                                   start_url=prepass and prepass["start_url"])
+                        if restaurant_times:
+                            outcome = TIMES
+                        elif deadline is not None and time.monotonic() > deadline:
+                            outcome = TIMEOUT
+                        else:
+                            outcome = NO_TIMES
+                    checked_at = time.time()
+                    # Only cache times that were found, an empty list may be a failed walk
+                    if restaurant_times and self.availability_cache is not None:
+                        checked_at = self.availability_cache.set(key, restaurant_times)
+                restaurant['availability'] = {
+                    "available_times": restaurant_times,
+                    "checked_at": datetime.fromtimestamp(checked_at).isoformat(timespec="seconds"),
+                    "cached": cached is not None,
+                    "outcome": outcome,
+                }
             else:
                 # If the website is not available, we can't get the restaurant times
                 logging.warning(f"Could not get the website for {restaurant['name']}")
                 return False
             return dining_time in restaurant_times
-            
-        return self.filter(criteria)
+
+        return criteria
+
+    def _walk_in_farm(self, website, time_range, deadline, start_url):
+        """
+        Walks a website in the walker farm with the time left until the
+        deadline, keeping the shared reservation pages in step with what the
+        worker's walker found.
+
+        :return: The result of WalkerFarm.walk.
+        """
+        result = self.walker_farm.walk(website, time_range=time_range, start_url=start_url,
+                                       reservation_url=self.reservation_urls.get(website),
+                                       timeout=None if deadline is None else deadline - time.monotonic())
+        if result["reservation_url"]:
+            self.reservation_urls[website] = result["reservation_url"]
+        elif website in self.reservation_urls and result["outcome"] == NO_TIMES:
+            # The walker dropped the reservation page because it stopped showing times
+            del self.reservation_urls[website]
+        return result
+
+    def filter_by_time(self, dining_time, max_workers=1, timeout=None, day=None):
+        """
+        Keeps the restaurants whose website shows a table at the dining time.
+
+        :param dining_time: A datetime.time or a "HH:MM" string.
+        :param max_workers: The number of restaurant websites walked at once.
+        :param timeout: Seconds each website is given, None waits forever.
+        :param day: The datetime.date to book, defaults to today.
+        """
+        driver_pool = self.driver_pool or DriverPool(size=max_workers)
+        # Resolve every website up front in one concurrent batch
+        self.places.fetch_websites(self.restaurants)
+        criteria = self._time_criteria(dining_time, driver_pool, day, timeout)
+        try:
+            if max_workers == 1 and timeout is None:
+                return self.filter(criteria)
+            return self.filter_concurrently(criteria, max_workers=max_workers, timeout=timeout)
+        finally:
+            if self.driver_pool is None:
+                driver_pool.shutdown()
+
+    def iter_by_time(self, dining_time, max_workers=1, timeout=None, day=None):
+        """
+        Checks every restaurant like filter_by_time, yielding each one as soon
+        as its website has been checked.
+
+        :return: A generator of (restaurant, has_table) tuples in completion order.
+        """
+        driver_pool = self.driver_pool or DriverPool(size=max_workers)
+        try:
+            self.places.fetch_websites(self.restaurants)
+            criteria = self._time_criteria(dining_time, driver_pool, day, timeout)
+            yield from self.iter_concurrently(criteria, max_workers=max_workers, timeout=timeout)
+        finally:
+            if self.driver_pool is None:
+                driver_pool.shutdown()
 
 if __name__ == "__main__":
     # Example data
@@ -76,7 +267,7 @@ if __name__ == "__main__":
     scraper = GoogleMapsScraper()
     restaurant_names = scraper.get_restaurant_names(url)
     google_maps_api = GoogleRestaurantInfo()
-    restaurants = google_maps_api.get_details_from_queries(restaurant_names)
+    restaurants = google_maps_api.get_places_from_queries(restaurant_names)
     
     selected_area = {
                     'id': '24c303aa50e7a8a6da996d724dc49ddf',
@@ -87,11 +278,12 @@ if __name__ == "__main__":
                     }
 
     # Create a RestaurantFilter object
-    restaurant_filter = RestaurantFilter(restaurants)
+    restaurant_filter = RestaurantFilter(restaurants, places=google_maps_api)
     print(len(restaurants))
     # Filter restaurants by area
-    filtered_restaurants = restaurant_filter.filter_by_area(selected_area['geometry']['coordinates'][0])
+    filtered_restaurants = restaurant_filter.filter_by_geometry(selected_area['geometry'])
     print(len(filtered_restaurants))
     # Filter restaurants by time
+    restaurant_filter = RestaurantFilter(filtered_restaurants, places=google_maps_api)
     filtered_restaurants = restaurant_filter.filter_by_time("18:00")
     print(len(filtered_restaurants))
\ No newline at end of file
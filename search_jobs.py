@@ -0,0 +1,164 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class JobQueueFull(Exception):
+    """
+    Raised when a job is submitted while the queue is at its maximum depth.
+    """
+
+
+class SearchJob:
+    """
+    This class holds the state of one restaurant search run in the background.
+    The search reports its progress by recording the same events a streamed
+    /filter-restaurants response sends.
+    """
+
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = "queued"
+        self.created_at = time.time()
+        self.finished_at = None
+        self.error = None
+        self.total = None
+        self.checked = 0
+        self.available = []
+        self.catalogue_version = None
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        """
+        Updates the job from a search event.
+
+        :param event: An "area", "restaurant" or "summary" event dictionary.
+        """
+        with self._lock:
+            if event["event"] == "area":
+                self.total = len(event["restaurants"])
+                self.catalogue_version = event.get("catalogue_version")
+            elif event["event"] == "restaurant":
+                self.checked += 1
+                if event["available"]:
+                    self.available.append(event["restaurant"])
+            elif event["event"] == "summary":
+                self.available = event["restaurants"]
+
+    def _start(self):
+        with self._lock:
+            self.status = "running"
+
+    def _finish(self, status, error=None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "progress": {"checked": self.checked, "total": self.total},
+                "restaurants": list(self.available),
+                "catalogue_version": self.catalogue_version,
+                "error": self.error,
+            }
+
+
+class JobQueue:
+    """
+    This class runs searches on a fixed pool of background worker threads.
+    The queue has a maximum depth so a burst of searches is turned away
+    instead of piling up. A search identical to one that is queued, running
+    or finished less than reuse_for seconds ago returns the existing job.
+    """
+
+    def __init__(self, run, workers=2, max_depth=20, reuse_for=300, keep_for=3600):
+        """
+        :param run: Function called as run(job, *args) that performs the search.
+        :param workers: The number of searches run at once.
+        :param max_depth: The maximum number of searches waiting to run.
+        :param reuse_for: Seconds a finished job is returned for identical searches.
+        :param keep_for: Seconds a finished job can still be looked up.
+        """
+        self.run = run
+        self.reuse_for = reuse_for
+        self.keep_for = keep_for
+        self._queue = queue.Queue(maxsize=max_depth)
+        self._jobs = {}
+        self._jobs_by_key = {}
+        self._lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"search-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _prune(self, now):
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and now - job.finished_at > self.keep_for:
+                del self._jobs[job_id]
+                if self._jobs_by_key.get(job.key) is job:
+                    del self._jobs_by_key[job.key]
+
+    def submit(self, key, *args):
+        """
+        Queues a search, or returns the job already handling the same search.
+
+        :param key: Identifies identical searches.
+        :param args: Passed to run after the job.
+        :return: A (job, created) tuple.
+        :raises JobQueueFull: If the queue is at its maximum depth.
+        """
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            existing = self._jobs_by_key.get(key)
+            if existing is not None and existing.status != "failed" and (
+                    existing.finished_at is None or now - existing.finished_at <= self.reuse_for):
+                return existing, False
+            job = SearchJob(key)
+            try:
+                self._queue.put_nowait((job, args))
+            except queue.Full:
+                raise JobQueueFull(f"{self._queue.maxsize} searches are already waiting.")
+            self._jobs[job.id] = job
+            self._jobs_by_key[key] = job
+        logging.info(f"Search job {job.id} queued, {self._queue.qsize()} waiting.")
+        return job, True
+
+    def get(self, job_id):
+        """
+        :return: The job with the given id, or None.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def depth(self):
+        """
+        :return: The number of searches waiting to run.
+        """
+        return self._queue.qsize()
+
+    def _work(self):
+        while True:
+            job, args = self._queue.get()
+            job._start()
+            try:
+                self.run(job, *args)
+                job._finish("done")
+                logging.info(f"Search job {job.id} finished.")
+            except Exception as e:
+                logging.warning(f"Search job {job.id} failed: {e}")
+                job._finish("failed", str(e))
+            finally:
+                self._queue.task_done()
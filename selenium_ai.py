@@ -1,28 +1,35 @@
 from weasyprint import HTML, CSS
-import tempfile
-import os 
 import base64
+import hashlib
 import json
 import time
 import logging
-import concurrent.futures
-from datetime import datetime
-from PIL import Image
-from mistralai import Mistral
+from datetime import datetime, date
 from dotenv import load_dotenv
-from selenium import webdriver
-from selenium.common.exceptions import ElementNotInteractableException, NoSuchElementException
-from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from booking_extractors import extract_booking_info
+from booking_links import best_booking_link
+from click_resolver import click_by_label
+from driver_pool import setup_chrome_driver
+from image_preparation import ImagePreparer
+from load_profile import LoadProfile
+from model_gateway import get_gateway
+from html_pruner import prune_html
+from popup_dismisser import PopupDismisser
 from prompt_storage import PromptStorage
+from tab_browser import TabDriver
 
 # Configure logging
 logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# The model reading screenshots and the cheaper one tried first on the page text
+VISION_MODEL = "pixtral-12b-2409"
+TEXT_MODEL = "mistral-small-latest"
+
 class TimeRange:
     def __init__(self, start: datetime, end: datetime):
         """
@@ -40,98 +47,117 @@ class TimeRange:
     def get_start(self):
         return self.start.strftime("%A, %B %d, %Y %H:%M")
 
+    @classmethod
+    def for_day(cls, day: date, start_hour=1, end_hour=23):
+        """
+        Creates a TimeRange covering the given hours of a day.
+
+        :param day: The day as a datetime.date object.
+        :return: The TimeRange.
+        """
+        return cls(datetime(day.year, day.month, day.day, start_hour),
+                   datetime(day.year, day.month, day.day, end_hour))
+
 
 class WebsiteWalker:
     """
     This website walker class is for recursively stepping through a website
     and finding what times are available.
     """
-    def __init__(self, driver_path='/opt/homebrew/bin/chromedriver', headless=True):
+    def __init__(self, driver_path='/opt/homebrew/bin/chromedriver', headless=True, driver=None, cached_urls=None, image_preparer=None, response_cache=None, gateway=None, cascade=True, text_model=TEXT_MODEL, popup_dismisser=None, max_depth=5):
+        """
+        :param driver: An already running WebDriver, e.g. one leased from a
+                       DriverPool or a tab leased from a TabBrowser. The
+                       walker will not quit a driver it was given.
+        :param cached_urls: Optional mapping from a website to its reservation
+                            page, e.g. a ReservationUrlStore shared between walkers.
+        :param image_preparer: The ImagePreparer turning screenshots into model input.
+        :param response_cache: Optional TTLCache of model answers for pages that
+                               look the same, shared between walkers.
+        :param gateway: The ModelGateway used for model requests, defaults to
+                        the one shared by the process.
+        :param cascade: If True, ask the text model about the page text before
+                        sending a screenshot to the vision model.
+        :param text_model: The model used for the page text.
+        :param popup_dismisser: The PopupDismisser clearing banners before each step.
+        :param max_depth: The maximum number of steps taken on a website.
+        """
         # Load the environment variables
         load_dotenv()
         self.driver_path = driver_path
         self.headless = headless
-        self.driver = self._setup_driver()
+        self.owns_driver = driver is None
+        self.driver = driver if driver is not None else self._setup_driver()
         self.incorrect_button_labels = []
-        self.cached_urls = {}
+        self.cached_urls = cached_urls if cached_urls is not None else {}
+        self.image_preparer = image_preparer or ImagePreparer()
+        self.response_cache = response_cache
+        self.gateway = gateway
+        self.cascade = cascade
+        self.text_model = text_model
+        self.popup_dismisser = popup_dismisser or PopupDismisser()
+        self.max_depth = max_depth
+        # What was dismissed during the current walk
+        self.dismissed_popups = []
+        # The booking link the current walk jumped to, if any
+        self.booking_link = None
+        # True if the current walk stopped because a page could not be read, e.g. the model failed
+        self.read_failed = False
+        # The time.monotonic() value the current walk must finish by
+        self.deadline = None
+        # The size and estimated token cost of the last image sent to the model
+        self.last_image = None
     
     def _setup_driver(self):
-        chrome_options = Options()
-        if self.headless:
-            chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-
-        service = Service(self.driver_path)
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        return driver
+        return setup_chrome_driver(self.driver_path, self.headless)
+
+    def reset(self):
+        """
+        Clears the per-site state so the walker can be reused for another website.
+        """
+        self.incorrect_button_labels = []
+        self.dismissed_popups = []
+        self.booking_link = None
+        self.read_failed = False
     
     def _load_page(self, url):
-        self.driver.get(url)
+        try:
+            self.driver.get(url)
+        except TimeoutException:
+            # Slow subresources should not cost the page, walk what has loaded so far
+            logging.warning(f"Timed out loading {url}, stopping the page and using what has loaded.")
+            self.driver.execute_script("window.stop();")
         WebDriverWait(self.driver, 10).until(
             EC.presence_of_element_located((By.TAG_NAME, "body"))
         )
         logging.info(f"Page loaded: {url}")
+        load_profile = getattr(self.driver, "load_profile", None)
+        if isinstance(load_profile, LoadProfile):
+            load_profile.report(self.driver)
 
     def _click_button_by_label(self, label):
-        permutations = self._generate_xpath_permutations(label.lower().capitalize())
-        for perm in permutations:
-            try:
-                button = self.driver.find_element(By.XPATH, perm)
-                if button.is_displayed() and button.is_enabled():
-                    button.click()
-                    logging.info(f"Button '{perm}' clicked successfully.")
-                    return True
-                else:
-                    # Check if the parent node is interactable and click it
-                    logging.info(f"Button '{perm}' is not interactable. Checking parent node.")
-                    parent = button.find_element(By.XPATH, "..")
-                    if parent.is_displayed() and parent.is_enabled():
-                        parent.click()
-                        logging.info(f"Parent of button '{perm}' clicked successfully.")
-                        return True
-            except NoSuchElementException:
-                continue
-        logging.info(f"No button with label permutations of '{label}' found, adding it to the list of incorrect buttons.")
-        self.incorrect_button_labels.append(label)
-        return False
-
-    def _generate_label_permutations(self, label):
-        """
-        Generates permutations of the given label.
-        
-        :param label: The label to generate permutations for.
-        :return: A list of permutations.
         """
-        permutations = [label, label.lower().capitalize(), label.lower(), label.upper()]
-        return permutations
+        Clicks the visible element best matching the label.
 
-    def _generate_xpath_permutations(self, label):
+        :return: True if an element was clicked.
         """
-        Generates permutations of the given label.
-        
-        :param label: The label to generate permutations for.
-        :return: A list of permutations.
-        """
-        permutations = [f"button[title='{label}']",
-                        f"//button[contains(text(), '{label}')]",
-                        f"//button[text()='{label}']",
-                        f"//button[.//span[text()='{label}']]",
-                        f"//a[text()='{label}']"
-                        ]
-        return permutations
-    
+        if click_by_label(self.driver, label):
+            return True
+        logging.info(f"No element matching '{label}' found, adding it to the list of incorrect buttons.")
+        self.incorrect_button_labels.append(label)
+        return False
+
     def _close(self):
-        self.driver.quit()
+        if self.owns_driver:
+            self.driver.quit()
 
-    def _get_website_image(self, permanent=False, save_path='website.png', quality=10):
+    def _get_website_image(self, permanent=False, save_path='website.png', quality=None):
         """
-        Gets a screenshot of the website and compresses it.
-        :param permanent: If True, the image will be saved permanently.
-        :param save_path: The path to save the image.
-        :param quality: The quality of the compressed image. 1-100 (100 is best).
-        :return: The path to the compressed image.
+        Gets a screenshot of the website and prepares it for the model in memory.
+        :param permanent: If True, the screenshot and the prepared image are also saved to disk.
+        :param save_path: The path to save the screenshot, the prepared image is saved next to it.
+        :param quality: Overrides the quality of the prepared image. 1-100 (100 is best).
+        :return: The prepared JPEG image as bytes.
         """
 
         try:
@@ -140,32 +166,31 @@ class WebsiteWalker:
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
 
-            # Maximize the browser window
-            self.driver.maximize_window()
-            
-            # Scroll to the top of the page
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            
-            # Create a file and save as img
+            # Use the same viewport for every screenshot
+            self.driver.set_window_size(*self.image_preparer.viewport)
+
+            # Scroll to the booking related part of the page, or the top
+            rects, scale = self.image_preparer.find_regions(self.driver)
+
+            png = self.driver.get_screenshot_as_png()
+
+            # Crop, scale and compress the image without touching the disk
+            prepared = self.image_preparer.prepare(png, rects, scale, quality)
+            self.last_image = prepared
+            logging.info(f"Prepared image {prepared.width}x{prepared.height}, {len(prepared.data)} bytes, "
+                         f"~{prepared.estimated_tokens} tokens, region {prepared.region}")
+
             if permanent:
-                self.driver.save_screenshot(save_path)
+                with open(save_path, "wb") as file:
+                    file.write(png)
                 logging.info(f"Permanent Screenshot saved at: {save_path}")
-            else:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_img:
-                    self.driver.save_screenshot(temp_img.name)
-                    logging.info(f"Temporary PNG created at: {temp_img.name}")
-                    save_path = temp_img.name
-
-            # Open the image using Pillow
-            image = Image.open(save_path)
-            
-            # Compress the image
-            compressed_path = save_path.replace(".png", "_compressed.jpg")
-            image.save(compressed_path, "JPEG", quality=quality)
-            logging.info(f"Compressed image saved at: {compressed_path}")
-            return compressed_path
+                compressed_path = save_path.replace(".png", "_compressed.jpg")
+                with open(compressed_path, "wb") as file:
+                    file.write(prepared.data)
+                logging.info(f"Compressed image saved at: {compressed_path}")
+            return prepared.data
         except Exception as e:
-            logging.warning(f"An error occurred while extracting png link: {e}")
+            logging.warning(f"An error occurred while taking a screenshot: {e}")
             return None
 
     def _get_website_html(self, save_path='website.html'):
@@ -185,17 +210,41 @@ class WebsiteWalker:
             logging.warning(f"An error occurred while extracting html link: {e}")
             return None
         
-    def _encode_image_to_base64(self, image_path):
+    def _encode_image_to_base64(self, image):
         """
-        Encodes a local image to base64 format.
+        Encodes an image to base64 format.
         
-        :param image_path: The path to the local image file.
+        :param image: The image as bytes.
         :return: The base64-encoded image string.
         """
-        with open(image_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-        return encoded_string
+        return base64.b64encode(image).decode('utf-8')
     
+    def _ask_model(self, model, messages):
+        """
+        Sends a chat request through the model gateway, giving up when the
+        walk's deadline passes.
+
+        :return: The content of the model's answer.
+        :raises ModelGatewayError: If the request failed.
+        """
+        gateway = self.gateway or get_gateway()
+        deadline = None
+        if self.deadline is not None:
+            deadline = min(self.deadline, time.monotonic() + gateway.request_timeout * (gateway.max_retries + 1))
+        if isinstance(self.driver, TabDriver):
+            # Other tabs of the browser run while this one waits on the model
+            with self.driver.released():
+                return gateway.complete(model, messages, deadline=deadline)
+        return gateway.complete(model, messages, deadline=deadline)
+
+    def _response_cache_key(self, prompt_type, page_hash, time_range):
+        """
+        :return: The key of a model answer for a page, which also depends on
+                 the time range and the buttons already tried.
+        """
+        return json.dumps([prompt_type, page_hash, time_range.get_start(), time_range.get_end(),
+                           sorted(self.incorrect_button_labels)])
+
     def _get_button_to_next_page_or_times(self, time_range: TimeRange = TimeRange(datetime(datetime.now().year, datetime.now().month, datetime.now().day, 1), datetime(datetime.now().year, datetime.now().month, datetime.now().day, 23))) -> dict:
         """
         Prerequisite: The website must be loaded.
@@ -203,23 +252,73 @@ class WebsiteWalker:
         Gets the next page of the website.
         Updates the state of the drive to the next page.
         The default time range is from 1am to 11pm and is disgusting. 
+
+        In cascade mode the pruned page text is first given to the cheaper
+        text model, the screenshot is only sent to the vision model if the
+        text answer is empty or unreadable.
         
         :return: If the times were found, return the times. Otherwise, return None.
         """
+        if self.cascade:
+            result = self._get_button_from_html(time_range)
+            if isinstance(result, dict) and (result.get("available_times") or result.get("next_button")):
+                return result
+            logging.info("The text model found no times or next button, asking the vision model.")
+        return self._get_button_from_image(time_range)
 
-        api_key = os.environ["MISTRAL_API_KEY"]
-        model = "pixtral-12b-2409"
-        client = Mistral(api_key=api_key)
+    def _get_button_from_html(self, time_range: TimeRange):
+        """
+        Prerequisite: The website must be loaded.
+
+        Asks the text model for the next button or times, given the page
+        reduced to its buttons, links, form fields and booking related text.
+        """
+        try:
+            html_content = prune_html(self.driver.page_source)
+        except Exception as e:
+            logging.warning(f"An error occurred while pruning the page: {e}")
+            return None
+        if not html_content:
+            return None
+        page_hash = hashlib.sha1(html_content.encode()).hexdigest()
+        return self._ask_for_page_dict("html_1", self.text_model, page_hash, time_range, html_content=html_content)
+
+    def _get_button_from_image(self, time_range: TimeRange):
+        """
+        Prerequisite: The website must be loaded.
 
+        Asks the vision model for the next button or times, given a screenshot.
+        """
         # Get the image from the website
-        image_path = self._get_website_image()
-        encoded_image = self._encode_image_to_base64(image_path)
+        image = self._get_website_image()
+        if image is None:
+            return None
+        encoded_image = self._encode_image_to_base64(image)
+        return self._ask_for_page_dict("image_1", VISION_MODEL, self.last_image.hash, time_range, encoded_image=encoded_image)
+
+    def _ask_for_page_dict(self, prompt_type, model, page_hash, time_range, **prompt_content):
+        """
+        Asks a model for the next button or times on a page, reusing the
+        answer for a page with the same hash if there is one.
+
+        :param prompt_type: The PromptStorage prompt to use.
+        :param page_hash: Identifies what the model is shown, None disables the cache.
+        :param prompt_content: The page as encoded_image or html_content.
+        :return: The page dict, or None if the model failed or gave no dictionary.
+        """
+        cache_key = None
+        if self.response_cache is not None and page_hash:
+            cache_key = self._response_cache_key(prompt_type, page_hash, time_range)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                logging.info(f"Model Response (cached): {cached}")
+                return cached
 
         logging.info("Currently these are the incorrect button labels: " + str(self.incorrect_button_labels))
-        content = PromptStorage.get("image_1", 
+        content = PromptStorage().get(prompt_type,
                     time_range=time_range, 
-                    encoded_image=encoded_image, 
-                    incorrect_button_labels=self.incorrect_button_labels
+                    incorrect_button_labels=self.incorrect_button_labels,
+                    **prompt_content
                     )
         # Define the messages for the chat
         messages = [
@@ -229,31 +328,50 @@ class WebsiteWalker:
             }
         ]
 
-        def get_chat_response():
-            return client.chat.complete(model=model, messages=messages)
-
         try:
-            # Use ThreadPoolExecutor to run the function with a timeout
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(get_chat_response)
-                chat_response = future.result(timeout=10)  # Timeout after 10 seconds
-        except concurrent.futures.TimeoutError:
-            logging.warning("The chat response took too long and timed out.")
-            return None
+            raw_result = self._ask_model(model, messages)
         except Exception as e:
             logging.warning(f"An error occurred while getting the chat response: {e}")
             return None
 
-        raw_result = chat_response.choices[0].message.content
         # Try to covert the result to a dictionary
         try:
             result = json.loads(raw_result)
-            logging.info(f"Model Response: {result}")
+            logging.info(f"Model Response ({model}): {result}")
         except Exception as e:
             logging.warning(f"An error occurred while converting the result to a dictionary: {e}")
             return None
+        if not isinstance(result, dict):
+            logging.warning(f"The model response is not a dictionary: {result}")
+            return None
+        # Times change between visits and an empty answer may be a misread or a
+        # widget still loading, only answers naming a button are reused
+        if cache_key is not None and result.get("next_button") and not result.get("available_times"):
+            self.response_cache.set(cache_key, result)
         return result
     
+    def _extract_from_page(self, time_range: TimeRange):
+        """
+        Prerequisite: The website must be loaded.
+
+        Runs the deterministic booking extractors on the page source, so pages
+        built by known booking providers do not need the model.
+
+        :return: A page dict with "available_times" within the time range or
+                 "next_url", or None if no extractor recognised the page.
+        """
+        try:
+            result = extract_booking_info(self.driver.page_source, self.driver.current_url)
+        except Exception as e:
+            logging.warning(f"An error occurred while running the booking extractors: {e}")
+            return None
+        if result is None:
+            return None
+        if "available_times" in result:
+            start, end = time_range.start.strftime("%H:%M"), time_range.end.strftime("%H:%M")
+            result["available_times"] = [t for t in result["available_times"] if start <= t <= end]
+        return result
+
     def _get_times(self, time_range: TimeRange = TimeRange(datetime(datetime.now().year, datetime.now().month, datetime.now().day, 1), datetime(datetime.now().year, datetime.now().month, datetime.now().day, 23))) -> list:
         """
         Prerequisite: The website must be loaded.
@@ -263,13 +381,13 @@ class WebsiteWalker:
         :return: If the times were found, return the times.
         """
 
-        api_key = os.environ["MISTRAL_API_KEY"]
-        model = "pixtral-12b-2409"
-        client = Mistral(api_key=api_key)
+        model = VISION_MODEL
 
         # Get the image from the website
-        image_path = self._get_website_image()
-        encoded_image = self._encode_image_to_base64(image_path)
+        image = self._get_website_image()
+        if image is None:
+            return []
+        encoded_image = self._encode_image_to_base64(image)
         prompt = f'''
                     Look at this image of a website reservation page,
                     if I wanted to book this restaurant at between
@@ -303,13 +421,11 @@ class WebsiteWalker:
         logging.debug(prompt)
 
         # Get the chat response
-        chat_response = client.chat.complete(
-            model=model,
-            messages=messages
-        )
-
-        # Print the content of the response
-        raw_result = chat_response.choices[0].message.content
+        try:
+            raw_result = self._ask_model(model, messages)
+        except Exception as e:
+            logging.warning(f"An error occurred while getting the chat response: {e}")
+            return []
         logging.debug(raw_result)
         # Try to covert the result to a list
         try:
@@ -330,44 +446,122 @@ class WebsiteWalker:
     
     def _close_popups(self):
         """
-        Closes any popups that appear on the webpage.
+        Closes any alert, cookie banner or overlay on the webpage without waiting for one.
+        Overlays are only closed on a newly loaded document, so a booking
+        dialog opened by the previous step's click stays open.
+
+        :return: A list describing what was dismissed.
         """
-        try:
-             # Wait for the alert to be present
-            WebDriverWait(self.driver, 1).until(EC.alert_is_present())
-            
-            # Switch to the alert and dismiss it
-            alert = self.driver.switch_to.alert
-            alert.dismiss()
-            logging.info("Alert dismissed successfully.")
-        except Exception as e:
-            logging.warning(f"An error occurred while closing popups: {e}")
+        dismissed = self.popup_dismisser.dismiss(self.driver)
+        self.dismissed_popups.extend(dismissed)
+        return dismissed
         
-    def walk_website(self, url):
+    def walk_website(self, url, deadline=None, time_range=None, start_url=None):
         """
         Walks the website and finds the available times.
         
         :param url: The URL of the website to walk.
+        :param deadline: Optional time.monotonic() value after which no more
+                         steps are taken.
+        :param time_range: The TimeRange to look for, defaults to today.
+        :param start_url: Optional booking page to start on, e.g. found by the
+                          HTTP pre-pass. The website is walked from the start
+                          if no times are found there.
         :return: The available times if found, otherwise None.
         """
+        self.reset()
+        self.deadline = deadline
+        time_range = time_range or TimeRange.for_day(date.today())
+        if url in self.cached_urls:
+            # Use the cached URL if it exists
+            cached_url = self.cached_urls[url]
+            logging.info(f"Using cached reservation page URL: {cached_url}")
+            available_times = self._walk(cached_url, url, deadline, time_range)
+            # A page that could not be read says nothing about the cached URL, keep it
+            if available_times or self.read_failed or (deadline is not None and time.monotonic() > deadline):
+                return available_times
+            # The reservation page moved or stopped showing times, start again from the website
+            logging.info(f"Cached reservation page URL for {url} no longer yields times, dropping it.")
+            del self.cached_urls[url]
+            self.reset()
+        elif start_url is not None and start_url != url:
+            logging.info(f"Starting at booking page: {start_url}")
+            available_times = self._walk(start_url, url, deadline, time_range)
+            if available_times or (deadline is not None and time.monotonic() > deadline):
+                return available_times
+            logging.info(f"No times found on {start_url}, walking {url} from the start.")
+            self.reset()
+            # Jumping to the best booking link would lead back to the same page
+            return self._walk(url, url, deadline, time_range)
+        available_times = self._walk(url, url, deadline, time_range, prenavigate=True)
+        if available_times or self.booking_link is None or (deadline is not None and time.monotonic() > deadline):
+            return available_times
+        # The booking link was a wrong guess, walk from the website itself
+        logging.info(f"No times found after jumping to {self.booking_link}, walking {url} from the start.")
+        self.reset()
+        return self._walk(url, url, deadline, time_range)
+
+    def _jump_to_booking_link(self, url):
+        """
+        Prerequisite: The website must be loaded.
+
+        Loads the best booking link on the page, if there is one, so the walk
+        starts on the booking page instead of clicking its way there. If the
+        link fails to load the website is loaded again.
+
+        :param url: The URL of the loaded website.
+        :return: True if a booking link was loaded.
+        """
+        try:
+            link = best_booking_link(self.driver.page_source, self.driver.current_url)
+        except Exception as e:
+            logging.warning(f"An error occurred while looking for booking links: {e}")
+            return False
+        if link is None:
+            return False
+        logging.info(f"Jumping to booking link: {link}")
+        try:
+            self._load_page(link)
+            self.booking_link = link
+            return True
+        except Exception as e:
+            logging.warning(f"An error occurred while loading booking link {link}: {e}")
+            self._load_page(url)
+            return False
+
+    def _walk(self, url, original_url, deadline, time_range, prenavigate=False):
+        """
+        Walks from the given page until times are found or the walk gives up.
+
+        :param url: The URL to start walking from.
+        :param original_url: The website the walk is for, used as the cache key.
+        :param deadline: Optional time.monotonic() value after which no more
+                         steps are taken.
+        :param time_range: The TimeRange to look for.
+        :param prenavigate: If True, first jump to the best booking link on the page.
+        :return: The available times if found, otherwise an empty list.
+        """
         depth = 0
         notFound = True
         available_times = []
-        original_url = url
-        if url in self.cached_urls:
-            # Use the cached URL if it exists
-            url = self.cached_urls[url]
-            logging.info(f"Using cached reservation page URL: {url}")
-            
+
         # IMPORTANT: PAGE MUST BE LOADED 
         self._load_page(url)
-        while (notFound and depth < 5):
+        if prenavigate:
+            self._jump_to_booking_link(url)
+        while (notFound and depth < self.max_depth):
+            if deadline is not None and time.monotonic() > deadline:
+                logging.warning(f"Deadline reached while walking {original_url}")
+                return []
             depth += 1
             self._close_popups()
-            page_dict = self._get_button_to_next_page_or_times()
+            page_dict = self._extract_from_page(time_range)
+            if page_dict is None:
+                page_dict = self._get_button_to_next_page_or_times(time_range)
             # Check if an error has occurred
             if page_dict is None:
                 logging.warning("No page dict found.")
+                self.read_failed = True
                 return []
             logging.debug(f"Page dict: {page_dict}")
             if page_dict.get("available_times"):
@@ -377,6 +571,9 @@ class WebsiteWalker:
                 self.cached_urls[original_url] = self.driver.current_url
                 logging.info(f"Reservation page URL saved: {self.driver.current_url}")
                 notFound = False
+            elif page_dict.get("next_url"):
+                logging.info(f"Extractor {page_dict.get('extractor')} found the booking page {page_dict['next_url']}")
+                self._load_page(page_dict["next_url"])
             elif page_dict.get("next_button"):
                 num_pages = len(self.driver.window_handles)
                 self._click_button_by_label(page_dict["next_button"])
@@ -384,6 +581,10 @@ class WebsiteWalker:
                     logging.info("New tab opened.")
                     # Switch to the newly opened tab
                     self.driver.switch_to.window(self.driver.window_handles[-1])
+                    load_profile = getattr(self.driver, "load_profile", None)
+                    if isinstance(load_profile, LoadProfile):
+                        # Requests are blocked per tab
+                        load_profile.apply(self.driver)
                     # Wipe the incorrect button labels
                     self.incorrect_button_labels = []
                 else:
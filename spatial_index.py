@@ -0,0 +1,131 @@
+import math
+import threading
+from collections import defaultdict
+
+
+class GridIndex:
+    """
+    This class buckets places into a uniform grid of lng/lat cells so an area
+    query only looks at the places in the cells its bounding box touches.
+    Places are keyed by place_id and can be inserted, moved and removed one at
+    a time, so the index can follow catalogue refreshes without a rebuild.
+    """
+
+    def __init__(self, cell_size=0.01):
+        """
+        :param cell_size: The width and height of a cell in degrees, 0.01 is roughly 1km in London.
+        """
+        self.cell_size = cell_size
+        self._cells = defaultdict(dict)
+        self._entries = {}
+        self._order = 0
+        self._lock = threading.RLock()
+
+    def _cell(self, lng, lat):
+        return math.floor(lng / self.cell_size), math.floor(lat / self.cell_size)
+
+    def insert(self, key, item, lng, lat):
+        """
+        Adds a place, replacing any place with the same key.
+
+        :param key: The key of the place, e.g. its place_id.
+        :param item: The value returned by queries.
+        """
+        with self._lock:
+            cell = self._cell(lng, lat)
+            order = self._order
+            if key in self._entries:
+                order = self._entries[key][3]
+                if self._entries[key][0] == cell:
+                    # Still in the same cell, no need to move it
+                    self._cells[cell][key] = item
+                    self._entries[key] = (cell, lng, lat, order)
+                    return
+                self.remove(key)
+            else:
+                self._order += 1
+            self._cells[cell][key] = item
+            self._entries[key] = (cell, lng, lat, order)
+
+    def remove(self, key):
+        """
+        Removes a place if it is in the index.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            cell = self._cells[entry[0]]
+            del cell[key]
+            if not cell:
+                del self._cells[entry[0]]
+
+    def update(self, places):
+        """
+        Makes the index hold exactly the given places, only touching the ones
+        that were added, removed or changed.
+
+        :param places: A list of place dictionaries with place_id and geometry.
+        """
+        with self._lock:
+            keys = set()
+            for place in places:
+                key = place['place_id']
+                keys.add(key)
+                location = place['geometry']['location']
+                self.insert(key, place, location['lng'], location['lat'])
+            for key in set(self._entries) - keys:
+                self.remove(key)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def query_bbox(self, min_lng, min_lat, max_lng, max_lat):
+        """
+        Returns the places inside a bounding box, in insertion order.
+
+        :return: A list of (item, lng, lat) tuples.
+        """
+        return [(item, lng, lat) for _, item, lng, lat in self._query_bbox(min_lng, min_lat, max_lng, max_lat)]
+
+    def _query_bbox(self, min_lng, min_lat, max_lng, max_lat):
+        with self._lock:
+            min_x, min_y = self._cell(min_lng, min_lat)
+            max_x, max_y = self._cell(max_lng, max_lat)
+            if (max_x - min_x + 1) * (max_y - min_y + 1) <= len(self._cells):
+                cells = [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)
+                         if (x, y) in self._cells]
+            else:
+                # The box covers more cells than are occupied, visit the occupied ones instead
+                cells = [(x, y) for x, y in self._cells if min_x <= x <= max_x and min_y <= y <= max_y]
+            found = []
+            for cell in cells:
+                for key, item in self._cells[cell].items():
+                    _, lng, lat, order = self._entries[key]
+                    if min_lng <= lng <= max_lng and min_lat <= lat <= max_lat:
+                        found.append((order, item, lng, lat))
+        found.sort(key=lambda entry: entry[0])
+        return found
+
+    def query_area(self, area_filter):
+        """
+        Returns the places inside an area, in insertion order. Only places in
+        the cells under the area's bounding boxes are given the exact test.
+
+        :param area_filter: The AreaFilter describing the area.
+        :return: A list of items.
+        """
+        candidates = {}
+        for bbox in area_filter.bounding_boxes():
+            for order, item, lng, lat in self._query_bbox(*bbox):
+                candidates[order] = (item, lng, lat)
+        if not candidates:
+            return []
+        items, lngs, lats = zip(*(candidates[order] for order in sorted(candidates)))
+        inside = area_filter.contains(lngs, lats)
+        return [item for item, is_inside in zip(items, inside) if is_inside]
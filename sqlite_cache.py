@@ -0,0 +1,123 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class SqliteCache:
+    """
+    This class is a small persistent key value cache backed by a SQLite table.
+    Values are stored as JSON, entries expire after ttl seconds and the least
+    recently used entries are evicted once there are more than max_entries.
+    Several caches can share one database file by using different tables, and
+    several processes can share the same file.
+    """
+
+    def __init__(self, path="cache.sqlite3", table="cache", ttl=None, max_entries=None):
+        """
+        :param path: The SQLite database file.
+        :param table: The table holding this cache.
+        :param ttl: Seconds an entry stays valid, None keeps entries forever.
+        :param max_entries: The maximum number of entries kept, None is unbounded.
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+
+    def _is_expired(self, stored_at, now):
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def get_entry(self, key):
+        """
+        Gets an entry along with the time it was stored.
+
+        :param key: The key of the entry.
+        :return: A (value, stored_at) tuple if found and not expired, otherwise None.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self._is_expired(row[1], now):
+                if row is not None:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            if self.max_entries is not None:
+                self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def get(self, key, default=None):
+        """
+        :param key: The key of the entry.
+        :param default: Returned if the entry is missing or expired.
+        :return: The cached value.
+        """
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value):
+        """
+        Stores a JSON serialisable value, evicting the least recently used
+        entries if the cache is full.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            if self.max_entries is not None:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def items(self):
+        """
+        :return: A list of (key, value, stored_at) tuples for every entry that has not expired.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(f"SELECT key, value, stored_at FROM {self.table}").fetchall()
+        return [(key, json.loads(value), stored_at) for key, value, stored_at in rows
+                if not self._is_expired(stored_at, now)]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self):
+        """
+        :return: A dictionary with the hit and miss counters and the number of entries.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,335 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from driver_pool import setup_chrome_driver
+from load_profile import LoadProfile
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Starts a navigation without waiting for it, marking the document being left
+NAVIGATE_SCRIPT = "window.__table42Leaving = arguments[0]; window.location.assign(arguments[0]);"
+# True once the new document has been parsed. A navigation that only changes
+# the fragment keeps the document, so it is done once the URL has changed.
+READY_SCRIPT = """
+if (document.readyState === 'loading') return false;
+return window.__table42Leaving === undefined || window.location.href === window.__table42Leaving;
+"""
+
+
+class _Browser:
+    """
+    One Chrome process along with the turn its tabs take to send commands.
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        # Held by the tab whose commands are running, released while it waits
+        self.turn = threading.Lock()
+        self.home = driver.window_handles[0]
+        self.active = self.home
+        # Every window handle belonging to the browser or one of its tabs
+        self.known = set(driver.window_handles)
+        self.tabs_opened = 0
+        self.open_tabs = 0
+        self.retired = False
+
+    def adopt(self, tab):
+        """
+        Gives the windows nobody owns yet, e.g. a popup, to the tab whose turn it is.
+        """
+        for handle in self.driver.window_handles:
+            if handle not in self.known:
+                self.known.add(handle)
+                tab.handles.append(handle)
+
+
+class _TabSwitchTo:
+    """
+    Stands in for driver.switch_to, keeping track of the tab's current window.
+    """
+    def __init__(self, tab):
+        self._tab = tab
+
+    def window(self, handle):
+        self._tab._hold()
+        browser = self._tab._browser
+        browser.driver.switch_to.window(handle)
+        browser.active = handle
+        self._tab.handle = handle
+
+    def __getattr__(self, name):
+        self._tab._hold()
+        return getattr(self._tab._browser.driver.switch_to, name)
+
+
+class TabDriver:
+    """
+    Looks like a WebDriver but drives a single tab of a shared browser. Each
+    command first waits for the browser's turn and switches to the tab. The
+    turn is kept until the tab waits, on a page load or inside released(),
+    so other tabs run their commands in the meantime.
+    """
+
+    def __init__(self, browser, handle, context_id=None, page_load_timeout=30, poll_interval=0.1):
+        self._browser = browser
+        self._holding = False
+        self.handle = handle
+        # The tab's own window first, followed by any popups it opened
+        self.handles = [handle]
+        self.context_id = context_id
+        self.page_load_timeout = page_load_timeout
+        self.poll_interval = poll_interval
+
+    def _hold(self):
+        if not self._holding:
+            self._browser.turn.acquire()
+            self._holding = True
+        if self._browser.active != self.handle:
+            self._browser.driver.switch_to.window(self.handle)
+            self._browser.active = self.handle
+
+    def release(self):
+        """
+        Gives the browser to the other tabs until this tab's next command.
+        """
+        if self._holding:
+            self._holding = False
+            self._browser.turn.release()
+
+    @contextmanager
+    def released(self):
+        """
+        Lets the other tabs use the browser while this one waits, e.g. on a model.
+        """
+        self.release()
+        yield
+
+    def __getattr__(self, name):
+        self._hold()
+        return getattr(self._browser.driver, name)
+
+    @property
+    def switch_to(self):
+        return _TabSwitchTo(self)
+
+    @property
+    def window_handles(self):
+        self._hold()
+        self._browser.adopt(self)
+        return list(self.handles)
+
+    @property
+    def current_window_handle(self):
+        return self.handle
+
+    def get(self, url):
+        """
+        Loads a page, letting the other tabs use the browser while it loads.
+
+        :raises TimeoutException: If the page is not parsed within page_load_timeout.
+        """
+        self._hold()
+        self._browser.driver.execute_script(NAVIGATE_SCRIPT, url)
+        deadline = time.monotonic() + self.page_load_timeout
+        while True:
+            self.release()
+            time.sleep(self.poll_interval)
+            self._hold()
+            try:
+                if self._browser.driver.execute_script(READY_SCRIPT):
+                    return
+            except WebDriverException:
+                # The old document may be gone before the new one can run scripts
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutException(f"Timed out loading {url} after {self.page_load_timeout}s")
+
+    def close(self):
+        """
+        Closes the tab's current window.
+        """
+        self._hold()
+        browser = self._browser
+        browser.driver.close()
+        browser.known.discard(self.handle)
+        self.handles.remove(self.handle)
+        browser.active = None
+        if self.handles:
+            self.switch_to.window(self.handles[0])
+
+    def quit(self):
+        # The browser is shared, its tabs are closed when the lease ends
+        logging.info("Ignoring quit on a tab, it is closed when its lease ends.")
+
+
+class TabBrowser:
+    """
+    This class walks several websites at once in a single Chrome process.
+    Each lease is a tab, in its own browser context so cookies and storage
+    are not shared, and the tabs take turns sending commands: a tab gives the
+    browser up while its page loads or it waits on a model, so many sites
+    share one browser's memory. It is leased like a DriverPool. The browser
+    is restarted after max_uses tabs or when it crashes.
+    """
+
+    def __init__(self, tabs=4, max_uses=50, isolate=True, driver_path='/opt/homebrew/bin/chromedriver', headless=True, driver_factory=None, load_profile=None, poll_interval=0.1):
+        """
+        :param tabs: The maximum number of tabs open at the same time.
+        :param max_uses: The number of tabs after which the browser is restarted.
+        :param isolate: If True, every tab gets its own browser context.
+        :param driver_path: The path to the chromedriver binary.
+        :param headless: If True, Chrome is started without a window.
+        :param driver_factory: Optional callable returning a new driver, defaults to Chrome.
+        :param load_profile: The LoadProfile applied to every tab, defaults to one configured from the environment.
+        :param poll_interval: Seconds between checks of a loading page.
+        """
+        if tabs < 1:
+            raise ValueError("Number of tabs must be at least 1.")
+        self.tabs = tabs
+        self.max_uses = max_uses
+        self.isolate = isolate
+        self.load_profile = load_profile or LoadProfile.from_env()
+        self.driver_factory = driver_factory or partial(setup_chrome_driver, driver_path, headless, self.load_profile)
+        self.poll_interval = poll_interval
+        self._slots = threading.BoundedSemaphore(tabs)
+        self._lock = threading.Lock()
+        self._browser = None
+        self._closed = False
+
+    def _checkout(self):
+        with self._lock:
+            if self._browser is None:
+                self._browser = _Browser(self.driver_factory())
+                logging.info("Tab browser started a new browser.")
+            browser = self._browser
+            browser.tabs_opened += 1
+            browser.open_tabs += 1
+            if browser.tabs_opened >= self.max_uses:
+                # Later leases start a new browser, this one quits after its last tab
+                logging.info(f"Recycling browser after {browser.tabs_opened} tabs.")
+                self._retire(browser)
+            return browser
+
+    def _retire(self, browser):
+        browser.retired = True
+        if self._browser is browser:
+            self._browser = None
+
+    def _checkin(self, browser, crashed):
+        if crashed and not browser.retired:
+            try:
+                with browser.turn:
+                    browser.driver.window_handles
+            except Exception as e:
+                logging.warning(f"Tab browser is no longer responsive, restarting it: {e}")
+                with self._lock:
+                    self._retire(browser)
+        with self._lock:
+            browser.open_tabs -= 1
+            if not (browser.retired and browser.open_tabs == 0):
+                return
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logging.warning(f"An error occurred while quitting the tab browser: {e}")
+
+    def _open_tab(self, browser):
+        driver = browser.driver
+        with browser.turn:
+            handle, context_id = None, None
+            if self.isolate:
+                try:
+                    context_id = driver.execute_cdp_cmd("Target.createBrowserContext", {})["browserContextId"]
+                    handle = driver.execute_cdp_cmd("Target.createTarget", {"url": "about:blank",
+                                                                            "browserContextId": context_id})["targetId"]
+                    driver.switch_to.window(handle)
+                except Exception as e:
+                    logging.warning(f"Could not open a tab in a new browser context, sharing the default one: {e}")
+                    handle, context_id = None, None
+            if handle is None:
+                driver.switch_to.new_window("tab")
+                handle = driver.current_window_handle
+            browser.active = handle
+            browser.known.add(handle)
+            # Requests are blocked per tab
+            self.load_profile.apply(driver)
+        return TabDriver(browser, handle, context_id, page_load_timeout=self.load_profile.page_load_timeout,
+                         poll_interval=self.poll_interval)
+
+    def _close_tab(self, tab):
+        browser = tab._browser
+        driver = browser.driver
+        with browser.turn:
+            for handle in tab.handles:
+                try:
+                    driver.switch_to.window(handle)
+                    driver.close()
+                except WebDriverException as e:
+                    logging.info(f"Window {handle} was already closed: {e}")
+                browser.known.discard(handle)
+            if tab.context_id is not None:
+                driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": tab.context_id})
+            driver.switch_to.window(browser.home)
+            browser.active = browser.home
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+        Opens a tab for the duration of the with block.
+
+        :param timeout: Seconds to wait for a free tab, None waits forever.
+        :return: A context manager yielding a TabDriver.
+        """
+        if self._closed:
+            raise RuntimeError("Tab browser has been shut down.")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Timed out waiting for a free tab.")
+        try:
+            browser = self._checkout()
+            try:
+                tab = self._open_tab(browser)
+            except Exception:
+                self._checkin(browser, crashed=True)
+                raise
+            crashed = False
+            try:
+                yield tab
+            except TimeoutException:
+                # A slow page is not a broken browser
+                raise
+            except WebDriverException:
+                crashed = True
+                raise
+            finally:
+                tab.release()
+                try:
+                    self._close_tab(tab)
+                except Exception as e:
+                    logging.warning(f"An error occurred while closing a tab: {e}")
+                    crashed = True
+                self._checkin(browser, crashed)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        """
+        Quits the browser. If tabs are open it is quit when the last one closes.
+        """
+        self._closed = True
+        with self._lock:
+            browser = self._browser
+            if browser is None:
+                return
+            self._retire(browser)
+            if browser.open_tabs:
+                return
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logging.warning(f"An error occurred while quitting the tab browser: {e}")
+        logging.info("Tab browser shut down.")
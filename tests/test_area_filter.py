@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+
+from area_filter import AreaFilter
+
+
+class TestAreaFilter(unittest.TestCase):
+    def test_concave_polygon(self):
+        """
+        ##### 
+        ##X## <- inside
+        ##O## <- in the notch, outside
+        Coordinates are [lng, lat].
+        """
+        coordinates = [[1, 0], [1, 2], [5, 2], [5, 0], [4, 0], [4, 1], [2, 1], [2, 0], [1, 0]]
+        area = AreaFilter.from_ring(coordinates)
+        inside = area.contains([3, 3, 1.5, 4.5], [1.5, 0.5, 0.5, 0.5])
+        self.assertEqual(inside.tolist(), [True, False, True, True])
+
+    def test_unclosed_ring(self):
+        area = AreaFilter.from_ring([[1, 1], [1, 10], [11, 10], [11, 1]])
+        self.assertEqual(area.contains([5, 12], [5, 5]).tolist(), [True, False])
+
+    def test_polygon_with_hole(self):
+        geometry = {
+            "type": "Polygon",
+            "coordinates": [
+                [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]],
+                [[4, 4], [6, 4], [6, 6], [4, 6], [4, 4]],
+            ]
+        }
+        area = AreaFilter.from_geojson(geometry)
+        self.assertEqual(area.contains([2, 5], [2, 5]).tolist(), [True, False])
+
+    def test_multipolygon_feature(self):
+        feature = {
+            "type": "Feature",
+            "properties": {},
+            "geometry": {
+                "type": "MultiPolygon",
+                "coordinates": [
+                    [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]],
+                    [[[5, 5], [6, 5], [6, 6], [5, 6], [5, 5]]],
+                ]
+            }
+        }
+        area = AreaFilter.from_geojson(feature)
+        self.assertEqual(area.contains([0.5, 5.5, 3], [0.5, 5.5, 3]).tolist(), [True, True, False])
+
+    def test_ray_crossing_is_exact(self):
+        """
+        A slanted edge right of the point must only count if the ray really reaches it.
+        """
+        area = AreaFilter.from_ring([[0, 0], [10, 0], [2, 10], [0, 10]])
+        self.assertEqual(area.contains([5, 1], [8, 8]).tolist(), [False, True])
+
+    def test_many_points(self):
+        area = AreaFilter.from_ring([[0, 0], [1, 0], [1, 1], [0, 1]])
+        rng = np.random.default_rng(42)
+        lngs = rng.uniform(-1, 2, 50000)
+        lats = rng.uniform(-1, 2, 50000)
+        expected = (lngs > 0) & (lngs < 1) & (lats > 0) & (lats < 1)
+        np.testing.assert_array_equal(area.contains(lngs, lats), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from booking_extractors import extract_booking_info, normalise_time, provider_for_url
+
+
+class TestBookingExtractors(unittest.TestCase):
+    def test_normalise_time(self):
+        self.assertEqual(normalise_time("19:00"), "19:00")
+        self.assertEqual(normalise_time("7.30pm"), "19:30")
+        self.assertEqual(normalise_time("12:15 AM"), "00:15")
+        self.assertIsNone(normalise_time("Book now"))
+
+    def test_provider_for_url(self):
+        self.assertEqual(provider_for_url("https://booking.resdiary.com/widget/Standard/Olle/123"), "resdiary")
+        self.assertEqual(provider_for_url("https://www.opentable.co.uk/r/bab"), "opentable")
+        self.assertIsNone(provider_for_url("https://notresdiary.com/"))
+
+    def test_resdiary_iframe(self):
+        html = '<html><body><iframe src="https://booking.resdiary.com/widget/Standard/Olle/123"></iframe></body></html>'
+        result = extract_booking_info(html, "https://olle.co.uk/")
+        self.assertEqual(result["next_url"], "https://booking.resdiary.com/widget/Standard/Olle/123")
+        self.assertEqual(result["extractor"], "resdiary_widget")
+
+    def test_opentable_loader_script(self):
+        html = '<script src="//www.opentable.co.uk/widget/reservation/loader?rid=4242&type=standard"></script>'
+        result = extract_booking_info(html, "https://bab.co.uk/")
+        self.assertEqual(result["next_url"], "https://www.opentable.co.uk/restref/client/?rid=4242")
+
+    def test_sevenrooms_script(self):
+        html = ('<script src="https://www.sevenrooms.com/widget/embed.js"></script>'
+                '<script>SevenroomsWidget.init({venueId: "bab-london", triggerId: "book"});</script>')
+        result = extract_booking_info(html, "https://bab.co.uk/")
+        self.assertEqual(result["next_url"], "https://www.sevenrooms.com/reservations/bab-london")
+
+    def test_designmynight_iframe(self):
+        html = '<iframe src="https://bookings.designmynight.com/book?venue_id=abc"></iframe>'
+        result = extract_booking_info(html, "https://bab.co.uk/book")
+        self.assertEqual(result["next_url"], "https://bookings.designmynight.com/book?venue_id=abc")
+
+    def test_time_slots_on_provider_page(self):
+        html = ('<div class="slots">'
+                '<button class="time-slot">7:30 PM</button>'
+                '<button data-test="time-slot"><span>18:00</span></button>'
+                '<button class="time-slot" disabled>20:00</button>'
+                '<button class="cta">Find a time</button>'
+                '</div>')
+        result = extract_booking_info(html, "https://www.opentable.co.uk/restref/client/?rid=4242")
+        self.assertEqual(result["available_times"], ["18:00", "19:30"])
+
+    def test_time_slots_ignored_off_provider(self):
+        html = '<button class="time-slot">19:00</button>'
+        self.assertIsNone(extract_booking_info(html, "https://bab.co.uk/"))
+
+    def test_unrecognised_page(self):
+        html = '<html><body><a href="/book">Book a table</a></body></html>'
+        self.assertIsNone(extract_booking_info(html, "https://bab.co.uk/"))
+
+
+if __name__ == '__main__':
+    unittest.main()
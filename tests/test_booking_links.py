@@ -0,0 +1,40 @@
+import unittest
+
+from booking_links import best_booking_link, find_booking_links
+
+
+class TestBookingLinks(unittest.TestCase):
+    def test_provider_iframe_ranks_first(self):
+        html = ('<a href="/menu">Menu</a>'
+                '<a href="/book-a-table">Book a table</a>'
+                '<iframe src="https://booking.resdiary.com/widget/Standard/Olle/123"></iframe>')
+        links = find_booking_links(html, "https://olle.co.uk/")
+        self.assertEqual([url for _, url in links],
+                         ["https://booking.resdiary.com/widget/Standard/Olle/123", "https://olle.co.uk/book-a-table"])
+
+    def test_provider_link_beats_booking_text(self):
+        html = ('<a href="/reservations">Reservations</a>'
+                '<a href="https://www.sevenrooms.com/reservations/bab">Here</a>')
+        self.assertEqual(best_booking_link(html, "https://bab.co.uk/"), "https://www.sevenrooms.com/reservations/bab")
+
+    def test_ignores_social_and_other_bookings(self):
+        html = ('<a href="https://www.facebook.com/bab">Facebook</a>'
+                '<a href="/gift-vouchers">Book a gift voucher</a>'
+                '<a href="mailto:book@bab.co.uk">Book by email</a>'
+                '<a href="/book">Book now</a>')
+        links = find_booking_links(html, "https://bab.co.uk/")
+        self.assertEqual(links[0], (60, "https://bab.co.uk/book"))
+        self.assertNotIn("https://www.facebook.com/bab", [url for _, url in links])
+        self.assertNotIn("mailto:book@bab.co.uk", [url for _, url in links])
+
+    def test_no_booking_link(self):
+        html = '<a href="/menu">Menu</a><a href="/">Home</a>'
+        self.assertIsNone(best_booking_link(html, "https://bab.co.uk/"))
+
+    def test_path_only_link_on_other_host_is_too_weak(self):
+        html = '<a href="https://example.com/booking">Click here</a>'
+        self.assertIsNone(best_booking_link(html, "https://bab.co.uk/"))
+
+
+if __name__ == '__main__':
+    unittest.main()
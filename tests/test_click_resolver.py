@@ -0,0 +1,65 @@
+import json
+import shutil
+import subprocess
+import unittest
+from unittest.mock import MagicMock
+
+from click_resolver import CLICK_SCRIPT, SCORE_SCRIPT, click_by_label
+from selenium_ai import WebsiteWalker
+
+
+class TestClickResolver(unittest.TestCase):
+    def test_click_by_label(self):
+        driver = MagicMock()
+        driver.execute_script.return_value = {"description": 'a "Book a Table"', "score": 1}
+        self.assertEqual(click_by_label(driver, "BOOK A TABLE")["description"], 'a "Book a Table"')
+        driver.execute_script.assert_called_once_with(CLICK_SCRIPT, "BOOK A TABLE", 0.5)
+
+    def test_script_error(self):
+        driver = MagicMock()
+        driver.execute_script.side_effect = Exception("stale element")
+        self.assertIsNone(click_by_label(driver, "Reserve"))
+
+    def test_walker_remembers_labels_it_could_not_click(self):
+        driver = MagicMock()
+        walker = WebsiteWalker(driver=driver)
+        driver.execute_script.return_value = None
+        self.assertFalse(walker._click_button_by_label("Order online"))
+        driver.execute_script.return_value = {"description": 'button "Reserve"', "score": 0.81}
+        self.assertTrue(walker._click_button_by_label("Reservations"))
+        self.assertEqual(walker.incorrect_button_labels, ["Order online"])
+        # One script call per click, no element lookups
+        self.assertEqual(driver.execute_script.call_count, 2)
+        driver.find_element.assert_not_called()
+
+
+
+@unittest.skipUnless(shutil.which("node"), "node is needed to run the scoring script")
+class TestScoring(unittest.TestCase):
+    def scores(self, label, texts):
+        script = SCORE_SCRIPT + f"console.log(JSON.stringify({json.dumps(texts)}.map(scorer({json.dumps(label)}))));"
+        output = subprocess.run(["node", "-e", script], capture_output=True, text=True, check=True).stdout
+        return json.loads(output)
+
+    def test_exact_text_scores_one(self):
+        self.assertEqual(self.scores("BOOK A TABLE", ["Book a table!"]), [1])
+
+    def test_page_wrapper_scores_below_the_button(self):
+        wrapper = ("Welcome to Olle. Korean barbecue in the heart of Soho, open every day from noon. "
+                   "Book a table for lunch or dinner, or order online for delivery. Book now")
+        wrapper_score, button_score = self.scores("Book a table", [wrapper, "Book now"])
+        self.assertLess(wrapper_score, button_score)
+        self.assertLess(wrapper_score, 0.5)
+
+    def test_extra_text_weakens_the_match(self):
+        short, long = self.scores("Reserve", ["Reserve now", "Reserve a table for your party tonight"])
+        self.assertGreater(short, 0.5)
+        self.assertLess(long, short)
+
+    def test_click_script_is_valid(self):
+        # Compiles the script the way Selenium wraps it, without running it
+        subprocess.run(["node", "-e", "new Function(process.argv[1])", CLICK_SCRIPT], check=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
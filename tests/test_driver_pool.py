@@ -0,0 +1,158 @@
+import unittest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from driver_pool import DriverPool
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        if handle not in self.driver.window_handles:
+            raise WebDriverException(f"No window {handle}")
+        self.driver.current_handle = handle
+
+
+class FakeDriver:
+    """
+    Stands in for a Chrome WebDriver so the pool can be tested without a browser.
+    Cookies and storage are kept per browser context, like Chrome does.
+    """
+    def __init__(self, cdp=True):
+        self.window_handles = ["main"]
+        self.current_handle = "main"
+        self.cdp = cdp
+        # The browser context of each window, None being the default context
+        self.window_contexts = {"main": None}
+        self.cookies = {None: {}}
+        self.storage = {None: {}}
+        self.quit_called = False
+        self.switch_to = FakeSwitchTo(self)
+
+    def visit(self, site):
+        """
+        Leaves a cookie and some storage in the current window's browser context.
+        """
+        context = self.window_contexts[self.current_handle]
+        self.cookies[context][site] = "session"
+        self.storage[context][f"https://{site}"] = {"basket": "1"}
+
+    def close(self):
+        self.window_handles.remove(self.current_handle)
+
+    def execute_cdp_cmd(self, command, params):
+        if command == "Target.createBrowserContext":
+            if not self.cdp:
+                raise WebDriverException("Unknown command")
+            context_id = f"context{len(self.cookies)}"
+            self.cookies[context_id] = {}
+            self.storage[context_id] = {}
+            return {"browserContextId": context_id}
+        if command == "Target.createTarget":
+            handle = f"tab{len(self.window_contexts)}"
+            self.window_handles.append(handle)
+            self.window_contexts[handle] = params.get("browserContextId")
+            return {"targetId": handle}
+        if command == "Target.disposeBrowserContext":
+            context_id = params["browserContextId"]
+            if context_id not in self.cookies or context_id is None:
+                raise WebDriverException(f"Failed to find context with id {context_id}")
+            del self.cookies[context_id]
+            del self.storage[context_id]
+        elif command == "Network.clearBrowserCookies":
+            self.cookies[self.window_contexts[self.current_handle]] = {}
+        elif command == "Storage.clearDataForOrigin":
+            if "://" not in params["origin"]:
+                raise WebDriverException(f"Invalid origin: {params['origin']}")
+            self.storage[self.window_contexts[self.current_handle]].pop(params["origin"], None)
+        return {}
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get(self, url):
+        self.url = url
+
+    def quit(self):
+        self.quit_called = True
+
+
+class TestDriverPool(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+        def factory():
+            driver = FakeDriver()
+            self.created.append(driver)
+            return driver
+
+        self.pool = DriverPool(size=2, max_uses=3, driver_factory=factory)
+
+    def test_driver_is_reused_and_reset(self):
+        with self.pool.lease() as driver:
+            driver.visit("bab.co.uk")
+            driver.window_handles.append("popup")
+        self.assertEqual(driver.window_handles, ["main"])
+        with self.pool.lease() as second:
+            self.assertIs(driver, second)
+            context = second.window_contexts[second.current_handle]
+            self.assertIsNotNone(context)
+            self.assertEqual(second.cookies[context], {})
+            self.assertEqual(second.storage[context], {})
+        # The lease's context and everything stored in it are gone
+        self.assertEqual(list(driver.cookies), [None])
+        self.assertEqual(driver.cookies[None], {})
+        self.assertEqual(driver.storage[None], {})
+        self.assertEqual(len(self.created), 1)
+
+    def test_driver_without_browser_contexts_is_not_reused(self):
+        pool = DriverPool(size=1, driver_factory=lambda: FakeDriver(cdp=False))
+        with pool.lease() as driver:
+            driver.visit("bab.co.uk")
+        self.assertTrue(driver.quit_called)
+        with pool.lease() as second:
+            self.assertIsNot(driver, second)
+
+    def test_driver_is_recycled_after_max_uses(self):
+        for _ in range(3):
+            with self.pool.lease():
+                pass
+        self.assertTrue(self.created[0].quit_called)
+        with self.pool.lease() as driver:
+            self.assertIs(driver, self.created[1])
+
+    def test_crashed_driver_is_discarded(self):
+        with self.assertRaises(WebDriverException):
+            with self.pool.lease():
+                raise WebDriverException("renderer crashed")
+        self.assertTrue(self.created[0].quit_called)
+        with self.pool.lease() as driver:
+            self.assertIs(driver, self.created[1])
+
+    def test_page_load_timeout_keeps_the_driver(self):
+        with self.assertRaises(TimeoutException):
+            with self.pool.lease():
+                raise TimeoutException("page load timed out")
+        self.assertFalse(self.created[0].quit_called)
+        with self.pool.lease() as driver:
+            self.assertIs(driver, self.created[0])
+
+    def test_pool_size_is_bounded(self):
+        with self.pool.lease(), self.pool.lease():
+            with self.assertRaises(TimeoutError):
+                with self.pool.lease(timeout=0.01):
+                    pass
+
+    def test_shutdown_quits_idle_drivers(self):
+        with self.pool.lease():
+            pass
+        self.pool.shutdown()
+        self.assertTrue(self.created[0].quit_called)
+        with self.assertRaises(RuntimeError):
+            with self.pool.lease():
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
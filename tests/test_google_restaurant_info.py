@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+from google_restaurant_info import GoogleRestaurantInfo, PlacesCache
+
+
+def places_response(url, params=None, **kwargs):
+    """
+    Answers Places requests the way the API would for a single restaurant.
+    """
+    response = MagicMock(status_code=200)
+    if "findplacefromtext" in url:
+        response.json.return_value = {
+            "status": "OK",
+            "candidates": [{
+                "place_id": "abc",
+                "name": "Olle - KBBQ",
+                "geometry": {"location": {"lat": 51.512069, "lng": -0.131557}}
+            }]
+        }
+    else:
+        response.json.return_value = {"status": "OK", "result": {"website": "https://olle.co.uk"}}
+    return response
+
+
+@patch("google_restaurant_info.requests.Session.get", side_effect=places_response)
+class TestGoogleRestaurantInfo(unittest.TestCase):
+    def setUp(self):
+        self.google_maps_api = GoogleRestaurantInfo()
+
+    def test_places_are_not_requested_twice(self, get):
+        places = self.google_maps_api.get_places_from_queries(["Olle", "Olle"])
+        self.assertEqual(len(places), 1)
+        self.assertEqual(self.google_maps_api.get_website(places[0]), "https://olle.co.uk")
+        self.assertEqual(self.google_maps_api.get_website(places[0]), "https://olle.co.uk")
+        self.assertEqual(self.google_maps_api.get_websites_from_queries(["Olle"]), ["https://olle.co.uk"])
+        self.assertEqual(get.call_count, 2)
+
+    def test_only_needed_fields_are_requested(self, get):
+        place = self.google_maps_api.get_places_from_queries(["Olle"])[0]
+        self.google_maps_api.get_website(place)
+        search_params = get.call_args_list[0].kwargs["params"]
+        details_params = get.call_args_list[1].kwargs["params"]
+        self.assertEqual(search_params["fields"], "place_id,name,geometry")
+        self.assertEqual(details_params["fields"], "website")
+
+    def test_persistent_cache_is_shared_between_instances(self, get):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = PlacesCache(os.path.join(tmpdir, "places.sqlite3"))
+            for _ in range(2):
+                google_maps_api = GoogleRestaurantInfo(cache=cache)
+                place = google_maps_api.get_places_from_queries(["Olle"])[0]
+                self.assertEqual(google_maps_api.get_website(place), "https://olle.co.uk")
+            self.assertEqual(get.call_count, 2)
+            self.assertEqual(cache.stats()["ids"]["hits"], 1)
+
+    def test_find_places_keeps_order(self, get):
+        def place_per_query(url, params=None, **kwargs):
+            response = MagicMock(status_code=200)
+            response.json.return_value = {"status": "OK", "candidates": [{"place_id": params["input"], "name": params["input"]}]}
+            return response
+
+        get.side_effect = place_per_query
+        places = self.google_maps_api.find_places(["Olle", "Olle Soho", "Olle"])
+        self.assertEqual([place["place_id"] for place in places], ["Olle", "Olle Soho", "Olle"])
+        self.assertEqual(get.call_count, 2)
+
+    def test_non_json_answer_is_a_failed_request(self, get):
+        proxy_error = MagicMock(status_code=200)
+        proxy_error.json.side_effect = ValueError("Expecting value: line 1 column 1 (char 0)")
+        get.side_effect = None
+        get.return_value = proxy_error
+        self.assertEqual(self.google_maps_api.fetch_websites([{"place_id": "abc", "name": "Olle - KBBQ"}]), [None])
+
+    @patch("google_restaurant_info.time.sleep")
+    def test_over_query_limit_is_retried(self, sleep, get):
+        limited = MagicMock(status_code=200)
+        limited.json.return_value = {"status": "OVER_QUERY_LIMIT"}
+        get.side_effect = [limited, places_response("findplacefromtext")]
+        self.assertEqual(self.google_maps_api.search_place("Olle"), "abc")
+        self.assertEqual(sleep.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
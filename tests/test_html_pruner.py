@@ -0,0 +1,40 @@
+import unittest
+
+from html_pruner import prune_html
+
+
+class TestHtmlPruner(unittest.TestCase):
+    def test_keeps_interactive_and_booking_text(self):
+        html = '''<html><head><title>Bab</title><style>body {}</style></head><body>
+            <script>var tracking = "19:00";</script>
+            <nav><a href="/">Home</a><a href="/book">Book <span>a table</span></a></nav>
+            <p>Open Monday to Friday</p><p>Lorem ipsum dolor sit amet</p>
+            <button aria-label="Close"><svg><path d="M0"/></svg></button>
+            <form><input type="date" name="day"><input type="hidden" name="csrf" value="x">
+            <select><option>2 guests</option></select></form>
+            <ul><li>19:00</li><li>7:30pm</li></ul>
+        </body></html>'''
+        self.assertEqual(prune_html(html).splitlines(), [
+            "[link] Home",
+            "[link] Book a table",
+            "Open Monday to Friday",
+            "[button] Close",
+            '[input] type="date" name="day"',
+            "[option] 2 guests",
+            "19:00",
+            "7:30pm",
+        ])
+
+    def test_drops_hidden_elements(self):
+        html = ('<div style="display: none"><button>Hidden</button></div>'
+                '<div hidden><a href="/x">Also hidden</a></div><button>Shown</button>')
+        self.assertEqual(prune_html(html), "[button] Shown")
+
+    def test_drops_repeated_lines_and_truncates(self):
+        html = '<a href="/book">Book</a>' * 3 + '<a href="/menu">Menu</a>'
+        self.assertEqual(prune_html(html), "[link] Book\n[link] Menu")
+        self.assertEqual(len(prune_html(html, max_chars=5)), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import requests
+
+from http_prepass import HttpPrepass
+from selenium_ai import TimeRange
+
+
+def response(url, html, status=200, content_type="text/html; charset=utf-8"):
+    page = MagicMock()
+    page.__enter__.return_value = page
+    page.url = url
+    page.status_code = status
+    page.headers = {"Content-Type": content_type}
+    page.encoding = "utf-8"
+    page.iter_content.return_value = [html.encode()]
+    return page
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        page = self.pages.get(url)
+        if page is None:
+            raise requests.ConnectionError(f"Cannot reach {url}")
+        return page
+
+
+class TestHttpPrepass(unittest.TestCase):
+    def test_finds_times_on_static_provider_page(self):
+        session = FakeSession({
+            "https://bab.co.uk/": response("https://bab.co.uk/", '<a href="https://www.opentable.co.uk/r/bab">Book</a>'),
+            "https://www.opentable.co.uk/r/bab": response(
+                "https://www.opentable.co.uk/r/bab",
+                '<button class="time-slot">12:00</button><button class="time-slot">19:30</button>'),
+        })
+        time_range = TimeRange(datetime(2024, 5, 1, 17), datetime(2024, 5, 1, 23))
+        result = HttpPrepass(session=session).check("https://bab.co.uk/", time_range)
+        self.assertEqual(result, {"available_times": ["19:30"], "url": "https://www.opentable.co.uk/r/bab"})
+
+    def test_hands_off_booking_page_that_needs_a_browser(self):
+        session = FakeSession({
+            "https://olle.co.uk/": response("https://olle.co.uk/", '<a href="/book-a-table">Book a table</a>'),
+            "https://olle.co.uk/book-a-table": response(
+                "https://olle.co.uk/book-a-table",
+                '<iframe src="https://booking.resdiary.com/widget/Standard/Olle/123"></iframe>'),
+            "https://booking.resdiary.com/widget/Standard/Olle/123": response(
+                "https://booking.resdiary.com/widget/Standard/Olle/123", '<div id="root"></div>'),
+        })
+        result = HttpPrepass(session=session).check("https://olle.co.uk/")
+        self.assertEqual(result, {"start_url": "https://booking.resdiary.com/widget/Standard/Olle/123"})
+
+    def test_stops_after_max_hops(self):
+        session = FakeSession({
+            "https://olle.co.uk/": response("https://olle.co.uk/", '<a href="/book-a-table">Book a table</a>'),
+            "https://olle.co.uk/book-a-table": response(
+                "https://olle.co.uk/book-a-table", '<a href="/reservations">Reservations</a>'),
+        })
+        result = HttpPrepass(session=session, max_hops=0).check("https://olle.co.uk/")
+        self.assertEqual(result, {"start_url": "https://olle.co.uk/book-a-table"})
+        self.assertEqual(session.requested, ["https://olle.co.uk/"])
+
+    def test_nothing_found(self):
+        session = FakeSession({
+            "https://shitshack.co.uk/": response("https://shitshack.co.uk/", '<a href="/menu">Menu</a>'),
+            "https://pdf.co.uk/": response("https://pdf.co.uk/", "%PDF", content_type="application/pdf"),
+        })
+        prepass = HttpPrepass(session=session)
+        self.assertIsNone(prepass.check("https://shitshack.co.uk/"))
+        self.assertIsNone(prepass.check("https://pdf.co.uk/"))
+        self.assertIsNone(prepass.check("https://unreachable.co.uk/"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import io
+import unittest
+
+from PIL import Image
+
+from image_preparation import ImagePreparer, estimate_image_tokens, perceptual_hash, region_of_interest
+
+
+def screenshot(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (255, 255, 255)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class TestImagePreparation(unittest.TestCase):
+    def test_estimate_image_tokens(self):
+        self.assertEqual(estimate_image_tokens(1024, 512), 64 * 32 + 32)
+        self.assertEqual(estimate_image_tokens(17, 16), 2 + 1)
+
+    def test_region_around_elements(self):
+        region = region_of_interest([[400, 300, 100, 40], [600, 500, 80, 40]], (1280, 800), padding=10, min_size=(100, 100))
+        self.assertEqual(region, (390, 290, 690, 550))
+
+    def test_region_is_scaled(self):
+        region = region_of_interest([[100, 100, 50, 50]], (2560, 1600), scale=2, padding=0, min_size=(0, 0))
+        self.assertEqual(region, (200, 200, 300, 300))
+
+    def test_region_grows_to_minimum_inside_image(self):
+        region = region_of_interest([[1250, 10, 20, 20]], (1280, 800), padding=0, min_size=(512, 384))
+        self.assertEqual(region, (768, 0, 1280, 384))
+
+    def test_no_region_without_elements(self):
+        self.assertIsNone(region_of_interest([], (1280, 800)))
+
+    def test_perceptual_hash(self):
+        image = Image.new("RGB", (320, 200), (255, 255, 255))
+        image.paste((0, 0, 0), (0, 0, 160, 200))
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=20)
+        recompressed = Image.open(io.BytesIO(buffer.getvalue()))
+        self.assertEqual(len(perceptual_hash(image)), 64)
+        self.assertEqual(perceptual_hash(image), perceptual_hash(recompressed))
+        self.assertNotEqual(perceptual_hash(image), perceptual_hash(image.transpose(Image.FLIP_LEFT_RIGHT)))
+
+    def test_prepare_crops_and_scales(self):
+        preparer = ImagePreparer(max_width=256, max_height=256, min_crop=(512, 384), padding=0)
+        prepared = preparer.prepare(screenshot(1280, 800), [[100, 100, 600, 100]])
+        self.assertEqual(prepared.region, (100, 0, 700, 384))
+        self.assertEqual((prepared.width, prepared.height), (256, 164))
+        self.assertEqual(Image.open(io.BytesIO(prepared.data)).size, (256, 164))
+        self.assertEqual(prepared.to_dict()["estimated_tokens"], estimate_image_tokens(256, 164))
+
+    def test_prepare_without_crop(self):
+        preparer = ImagePreparer(max_width=640, max_height=640, crop=False)
+        prepared = preparer.prepare(screenshot(1280, 800), [[100, 100, 50, 50]])
+        self.assertIsNone(prepared.region)
+        self.assertEqual((prepared.width, prepared.height), (640, 400))
+
+
+if __name__ == '__main__':
+    unittest.main()
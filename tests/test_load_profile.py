@@ -0,0 +1,64 @@
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from selenium.webdriver.chrome.options import Options
+
+from load_profile import DEFAULT_BLOCKED_HOSTS, FONT_PATTERNS, LoadProfile
+
+
+def log_entry(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+
+class TestLoadProfile(unittest.TestCase):
+    def test_blocked_url_patterns(self):
+        profile = LoadProfile(blocked_hosts=["hotjar.com"])
+        self.assertEqual(profile.blocked_url_patterns(), ["*://hotjar.com/*", "*.hotjar.com/*"])
+        profile = LoadProfile(blocked_hosts=[], block_fonts=True)
+        self.assertEqual(profile.blocked_url_patterns(), FONT_PATTERNS)
+
+    def test_apply_options(self):
+        options = Options()
+        LoadProfile().apply_options(options)
+        self.assertEqual(options.page_load_strategy, "eager")
+        self.assertEqual(options.to_capabilities()["goog:loggingPrefs"], {"performance": "ALL"})
+
+    def test_apply_blocks_urls(self):
+        driver = MagicMock()
+        profile = LoadProfile(blocked_hosts=["hotjar.com"], page_load_timeout=15)
+        profile.apply(driver)
+        driver.set_page_load_timeout.assert_called_once_with(15)
+        driver.execute_cdp_cmd.assert_called_with("Network.setBlockedURLs", {"urls": profile.blocked_url_patterns()})
+        self.assertIs(driver.load_profile, profile)
+
+    def test_report(self):
+        driver = MagicMock()
+        driver.get_log.return_value = [
+            log_entry("Network.requestWillBeSent"),
+            log_entry("Network.requestWillBeSent"),
+            log_entry("Network.requestWillBeSent"),
+            log_entry("Network.loadingFinished", encodedDataLength=1200),
+            log_entry("Network.loadingFailed", blockedReason="inspector", type="Script"),
+            log_entry("Network.loadingFailed", blockedReason="inspector", type="Ping"),
+            log_entry("Network.loadingFailed", errorText="net::ERR_ABORTED", type="Image"),
+            {"message": "not json"},
+        ]
+        self.assertEqual(LoadProfile().report(driver), {
+            "requests": 3, "blocked_requests": 2, "bytes_loaded": 1200, "estimated_bytes_saved": 70_000,
+        })
+        self.assertIsNone(LoadProfile(report=False).report(driver))
+
+    def test_from_env(self):
+        with patch.dict(os.environ, {"LOAD_STRATEGY": "normal", "LOAD_BLOCKED_HOSTS": "example.com, ",
+                                     "LOAD_BLOCK_MEDIA": "1"}):
+            profile = LoadProfile.from_env()
+        self.assertEqual(profile.page_load_strategy, "normal")
+        self.assertEqual(profile.blocked_hosts, DEFAULT_BLOCKED_HOSTS + ["example.com"])
+        self.assertFalse(profile.block_fonts)
+        self.assertTrue(profile.block_media)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from model_gateway import ModelGateway, ModelGatewayError, TokenBucket, gateway_from_env
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def answer(content):
+    response = MagicMock()
+    response.choices[0].message.content = content
+    return response
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=20, capacity=2)
+        start = time.monotonic()
+        for _ in range(3):
+            self.assertTrue(bucket.acquire())
+        # The third token had to be waited for
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    def test_gives_up_at_deadline(self):
+        bucket = TokenBucket(rate=0.1, capacity=1)
+        self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.acquire(deadline=time.monotonic() + 0.01))
+
+
+class TestModelGateway(unittest.TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.gateway = ModelGateway(client=self.client, rate=1000, burst=10, backoff=0.001)
+
+    def test_complete(self):
+        self.client.chat.complete.return_value = answer("[]")
+        self.assertEqual(self.gateway.complete("pixtral", [{"role": "user", "content": "hi"}]), "[]")
+        self.assertEqual(self.client.chat.complete.call_args.kwargs["timeout_ms"], 10000)
+        stats = self.gateway.stats()["pixtral"]
+        self.assertEqual((stats["requests"], stats["errors"], stats["retries"]), (1, 0, 0))
+
+    def test_retries_transient_errors(self):
+        self.client.chat.complete.side_effect = [StatusError(429), TimeoutError(), answer("{}")]
+        self.assertEqual(self.gateway.complete("pixtral", []), "{}")
+        stats = self.gateway.stats()["pixtral"]
+        self.assertEqual((stats["requests"], stats["errors"], stats["retries"]), (1, 0, 2))
+
+    def test_does_not_retry_client_errors(self):
+        self.client.chat.complete.side_effect = StatusError(400)
+        with self.assertRaises(ModelGatewayError):
+            self.gateway.complete("pixtral", [])
+        self.assertEqual(self.client.chat.complete.call_count, 1)
+        self.assertEqual(self.gateway.stats()["pixtral"]["errors"], 1)
+
+    def test_gives_up_after_max_retries(self):
+        self.client.chat.complete.side_effect = StatusError(503)
+        with self.assertRaises(ModelGatewayError):
+            self.gateway.complete("pixtral", [])
+        self.assertEqual(self.client.chat.complete.call_count, self.gateway.max_retries + 1)
+
+    def test_deadline_already_passed(self):
+        with self.assertRaises(ModelGatewayError):
+            ModelGateway(client=self.client, rate=1, burst=1).complete("pixtral", [], deadline=time.monotonic() - 1)
+        self.client.chat.complete.assert_not_called()
+
+    @patch.dict("os.environ", {"MISTRAL_API_KEY": "test", "MODEL_RATE": "4", "MODEL_BURST": "8", "MODEL_MAX_IN_FLIGHT": "2"})
+    def test_limits_are_split_between_processes(self):
+        gateway = gateway_from_env(share=4)
+        self.assertEqual((gateway.bucket.rate, gateway.bucket.capacity), (1.0, 2))
+        # Every process can still send a request
+        self.assertTrue(gateway._in_flight.acquire(blocking=False))
+        self.assertFalse(gateway._in_flight.acquire(blocking=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
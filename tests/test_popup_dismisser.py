@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock, PropertyMock
+
+from selenium.common.exceptions import NoAlertPresentException
+
+from popup_dismisser import DISMISS_SCRIPT, PopupDismisser
+
+
+def fake_driver(document_result, frames=(), frame_result=()):
+    driver = MagicMock()
+    type(driver.switch_to).alert = PropertyMock(side_effect=NoAlertPresentException())
+    in_frame = []
+    driver.switch_to.frame.side_effect = lambda frame: in_frame.append(frame)
+    driver.switch_to.default_content.side_effect = lambda: in_frame.clear()
+
+    def execute_script(script, *args):
+        if script == DISMISS_SCRIPT:
+            return list(frame_result) if in_frame else list(document_result)
+        return list(frames)
+    driver.execute_script.side_effect = execute_script
+    return driver
+
+
+class TestPopupDismisser(unittest.TestCase):
+    def test_nothing_to_dismiss(self):
+        driver = fake_driver([])
+        self.assertEqual(PopupDismisser().dismiss(driver), [])
+        driver.switch_to.frame.assert_not_called()
+
+    def test_alert_is_dismissed(self):
+        driver = fake_driver([])
+        alert = MagicMock(text="Welcome")
+        type(driver.switch_to).alert = PropertyMock(return_value=alert)
+        self.assertEqual(PopupDismisser().dismiss(driver), ["alert: Welcome"])
+        alert.dismiss.assert_called_once()
+
+    def test_document_and_consent_frames(self):
+        driver = fake_driver(['overlay: button "close"'], frames=["frame-1", "frame-2"],
+                             frame_result=['consent: button "accept all"'])
+        dismissed = PopupDismisser(max_frames=1).dismiss(driver)
+        self.assertEqual(dismissed, ['overlay: button "close"', 'frame consent: button "accept all"'])
+        driver.switch_to.frame.assert_called_once_with("frame-1")
+        driver.switch_to.default_content.assert_called_once()
+
+    def test_overlays_are_not_closed_in_frames(self):
+        driver = fake_driver([], frames=["frame-1"])
+        PopupDismisser().dismiss(driver)
+        overlay_modes = [call.args[-1] for call in driver.execute_script.call_args_list if call.args[0] == DISMISS_SCRIPT]
+        self.assertEqual(overlay_modes, [None, False])
+
+    def test_script_errors_are_not_raised(self):
+        driver = fake_driver([])
+        driver.execute_script.side_effect = Exception("no such window")
+        self.assertEqual(PopupDismisser().dismiss(driver), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
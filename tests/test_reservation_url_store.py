@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+from reservation_url_store import ReservationUrlStore
+
+
+class TestReservationUrlStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "urls.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_urls_are_shared_between_stores(self):
+        """
+        Two stores on the same file stand in for two worker processes.
+        """
+        first = ReservationUrlStore(self.path)
+        second = ReservationUrlStore(self.path)
+        first["https://olle.co.uk"] = "https://olle.co.uk/book"
+        self.assertIn("https://olle.co.uk", second)
+        self.assertEqual(second["https://olle.co.uk"], "https://olle.co.uk/book")
+        self.assertIsNotNone(second.validated_at("https://olle.co.uk"))
+
+    def test_deleted_urls_are_gone(self):
+        store = ReservationUrlStore(self.path)
+        store["https://olle.co.uk"] = "https://olle.co.uk/book"
+        del store["https://olle.co.uk"]
+        self.assertNotIn("https://olle.co.uk", store)
+        self.assertNotIn("https://olle.co.uk", ReservationUrlStore(self.path))
+
+    def test_warm_load(self):
+        ReservationUrlStore(self.path)["https://olle.co.uk"] = "https://olle.co.uk/book"
+        store = ReservationUrlStore(self.path)
+        self.assertEqual(store.warm_load(), 1)
+        self.assertEqual(store.get("https://olle.co.uk"), "https://olle.co.uk/book")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from area_filter import AreaFilter
+from restaurant_catalogue import RestaurantCatalogue
+
+PLACES = [{"place_id": "abc", "name": "Olle - KBBQ",
+           "geometry": {"location": {"lat": 51.512069, "lng": -0.131557}}}]
+
+
+class TestRestaurantCatalogue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "catalogue.sqlite3")
+        self.url = "https://maps.app.goo.gl/example"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @patch.object(RestaurantCatalogue, "_resolve", return_value=PLACES)
+    @patch.object(RestaurantCatalogue, "_scrape_names", return_value=["Olle - KBBQ"])
+    def test_refresh_stores_versioned_snapshots(self, scrape, resolve):
+        catalogue = RestaurantCatalogue(self.url, driver_pool=None, path=self.path)
+        self.assertIsNone(catalogue.latest())
+        first = catalogue.refresh()
+        second = catalogue.refresh()
+        self.assertGreater(second, first)
+        self.assertEqual(catalogue.latest()["restaurants"], PLACES)
+
+        # A restart serves the stored snapshot without scraping
+        restarted = RestaurantCatalogue(self.url, driver_pool=None, path=self.path)
+        self.assertEqual(restarted.latest(wait=0)["version"], second)
+        self.assertEqual(scrape.call_count, 2)
+
+    @patch.object(RestaurantCatalogue, "_resolve", return_value=PLACES)
+    @patch.object(RestaurantCatalogue, "_scrape_names", return_value=["Olle - KBBQ"])
+    def test_latest_is_a_copy(self, scrape, resolve):
+        catalogue = RestaurantCatalogue(self.url, driver_pool=None, path=self.path)
+        catalogue.refresh()
+        catalogue.latest()["restaurants"][0]["website"] = "https://olle.co.uk"
+        self.assertNotIn("website", catalogue.latest()["restaurants"][0])
+
+    @patch.object(RestaurantCatalogue, "_resolve", return_value=PLACES)
+    @patch.object(RestaurantCatalogue, "_scrape_names", return_value=["Olle - KBBQ"])
+    def test_find_in_area(self, scrape, resolve):
+        catalogue = RestaurantCatalogue(self.url, driver_pool=None, path=self.path)
+        catalogue.refresh()
+        inside = AreaFilter.from_ring([[-0.14, 51.5], [-0.12, 51.5], [-0.12, 51.52], [-0.14, 51.52]])
+        outside = AreaFilter.from_ring([[0, 0], [1, 0], [1, 1], [0, 1]])
+        self.assertEqual(catalogue.find_in_area(inside)["restaurants"], PLACES)
+        self.assertEqual(catalogue.find_in_area(outside)["restaurants"], [])
+
+    @patch.object(RestaurantCatalogue, "_scrape_names", return_value=[])
+    def test_failed_scrape_keeps_previous_snapshot(self, scrape):
+        catalogue = RestaurantCatalogue(self.url, driver_pool=None, path=self.path)
+        self.assertIsNone(catalogue.refresh())
+        self.assertIsNone(catalogue.latest())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
+import time
 import unittest
+from unittest.mock import MagicMock, patch
 from restaurant_filter import RestaurantFilter
-from datetime import datetime
+from selenium_ai import TimeRange
+from ttl_cache import TTLCache
+from datetime import datetime, date
 
 """ 
 ------------------------------------------
@@ -63,6 +67,10 @@ class TestRestaurantFilter(unittest.TestCase):
         self.assertEqual(filtered_restaurants[0]['name'], "Olle - KBBQ")
         self.assertEqual(filtered_restaurants[1]['name'], "Bab n Sul - KBBQ")
 
+    def test_filter_by_geometry(self):
+        filtered_restaurants = self.restaurant_filter.filter_by_geometry(self.selected_area)
+        self.assertEqual([r['name'] for r in filtered_restaurants], ["Olle - KBBQ", "Bab n Sul - KBBQ"])
+
     def test_filter_by_area_convex(self):
         """
         0####
@@ -111,6 +119,128 @@ class TestRestaurantFilter(unittest.TestCase):
         restaurant_filter = RestaurantFilter(restaurants)
         filtered_restaurants = restaurant_filter.filter_by_area(coordinates)
         self.assertEqual(len(filtered_restaurants), 1)
-        
+
+    def test_filter_concurrently_keeps_order(self):
+        """
+        The restaurants finishing first should not change the order of the result.
+        """
+        delays = {"Olle - KBBQ": 0.1, "Bab n Sul - KBBQ": 0.0, "Shitshack": 0.05}
+
+        def criteria(restaurant):
+            time.sleep(delays[restaurant['name']])
+            return restaurant['cuisine'] == "Korean"
+
+        filtered_restaurants = self.restaurant_filter.filter_concurrently(criteria, max_workers=3)
+        self.assertEqual([r['name'] for r in filtered_restaurants], ["Olle - KBBQ", "Bab n Sul - KBBQ"])
+
+    def test_filter_concurrently_timeout(self):
+        """
+        A slow restaurant is dropped without holding up the others.
+        """
+        def criteria(restaurant):
+            if restaurant['name'] == "Olle - KBBQ":
+                time.sleep(1)
+            return True
+
+        start = time.monotonic()
+        filtered_restaurants = self.restaurant_filter.filter_concurrently(criteria, max_workers=3, timeout=0.2)
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual([r['name'] for r in filtered_restaurants], ["Bab n Sul - KBBQ", "Shitshack"])
+
+    def test_iter_concurrently_yields_fastest_first(self):
+        delays = {"Olle - KBBQ": 0.2, "Bab n Sul - KBBQ": 0.0, "Shitshack": 0.1}
+
+        def criteria(restaurant):
+            time.sleep(delays[restaurant['name']])
+            return restaurant['cuisine'] == "Korean"
+
+        results = list(self.restaurant_filter.iter_concurrently(criteria, max_workers=3))
+        self.assertEqual([(r['name'], match) for r, match in results],
+                         [("Bab n Sul - KBBQ", True), ("Shitshack", False), ("Olle - KBBQ", True)])
+
+    @patch("restaurant_filter.WebsiteWalker")
+    def test_filter_by_time_uses_cached_availability(self, walker):
+        """
+        A restaurant checked recently is answered from the cache without walking its website.
+        """
+        restaurant = dict(self.restaurants[0], website="https://olle.co.uk")
+        cache = TTLCache()
+        time_range = TimeRange.for_day(date.today())
+        cache.set(RestaurantFilter._availability_key("https://olle.co.uk", time_range), ["19:00", "19:30"])
+
+        restaurant_filter = RestaurantFilter([restaurant], driver_pool=object(), availability_cache=cache)
+        filtered_restaurants = restaurant_filter.filter_by_time(datetime.strptime("19:30", "%H:%M").time())
+        self.assertEqual(len(filtered_restaurants), 1)
+        self.assertTrue(filtered_restaurants[0]['availability']['cached'])
+        walker.assert_not_called()
+
+    @patch("restaurant_filter.WebsiteWalker")
+    def test_filter_by_time_fills_empty_availability_cache(self, walker):
+        """
+        Times found by a walk are cached even when the cache starts empty,
+        so the same search does not walk the website again.
+        """
+        restaurant = dict(self.restaurants[0], website="https://olle.co.uk")
+        walker.return_value.walk_website.return_value = ["19:30"]
+        prepass = MagicMock()
+        prepass.check.return_value = None
+        cache = TTLCache()
+        restaurant_filter = RestaurantFilter([restaurant], driver_pool=MagicMock(), availability_cache=cache,
+                                             http_prepass=prepass)
+        restaurant_filter.filter_by_time("19:30")
+        self.assertEqual(len(cache), 1)
+        filtered_restaurants = restaurant_filter.filter_by_time("19:30")
+        self.assertTrue(filtered_restaurants[0]['availability']['cached'])
+        walker.return_value.walk_website.assert_called_once()
+
+    @patch("restaurant_filter.WebsiteWalker")
+    def test_filter_by_time_uses_prepass_times(self, walker):
+        """
+        Times found without a browser are used without leasing a driver.
+        """
+        restaurant = dict(self.restaurants[0], website="https://olle.co.uk")
+        prepass = MagicMock()
+        prepass.check.return_value = {"available_times": ["19:30"], "url": "https://www.opentable.co.uk/r/olle"}
+        restaurant_filter = RestaurantFilter([restaurant], driver_pool=object(), http_prepass=prepass)
+        filtered_restaurants = restaurant_filter.filter_by_time("19:30")
+        self.assertEqual(filtered_restaurants[0]['availability']['available_times'], ["19:30"])
+        walker.assert_not_called()
+
+    @patch("restaurant_filter.WebsiteWalker")
+    def test_walk_that_runs_out_of_time_is_a_timeout(self, walker):
+        """
+        A walk with the driver pool that ends past its deadline is reported
+        as a timeout, like it is in the walker farm.
+        """
+        restaurant = dict(self.restaurants[0], website="https://olle.co.uk")
+        walker.return_value.walk_website.side_effect = lambda *args, **kwargs: time.sleep(0.02) or []
+        prepass = MagicMock()
+        prepass.check.return_value = None
+        restaurant_filter = RestaurantFilter([restaurant], driver_pool=MagicMock(), http_prepass=prepass)
+        criteria = restaurant_filter._time_criteria("19:30", restaurant_filter.driver_pool, None, timeout=0.01)
+        self.assertFalse(criteria(restaurant))
+        self.assertEqual(restaurant['availability']['outcome'], "timeout")
+
+    @patch("restaurant_filter.WebsiteWalker")
+    def test_filter_by_time_walks_in_farm(self, walker):
+        """
+        With a walker farm the website is walked in a worker and its outcome is reported.
+        """
+        restaurant = dict(self.restaurants[0], website="https://olle.co.uk")
+        prepass = MagicMock()
+        prepass.check.return_value = None
+        farm = MagicMock()
+        farm.walk.return_value = {"outcome": "times", "available_times": ["19:30"],
+                                  "reservation_url": "https://olle.co.uk/book", "elapsed": 1.0}
+        reservation_urls = {}
+        restaurant_filter = RestaurantFilter([restaurant], driver_pool=object(), http_prepass=prepass,
+                                             walker_farm=farm, reservation_urls=reservation_urls)
+        filtered_restaurants = restaurant_filter.filter_by_time("19:30", timeout=30)
+        self.assertEqual(filtered_restaurants[0]['availability']['outcome'], "times")
+        # The farm only gets what is left of the website's time
+        self.assertLessEqual(farm.walk.call_args.kwargs["timeout"], 30)
+        self.assertEqual(reservation_urls, {"https://olle.co.uk": "https://olle.co.uk/book"})
+        walker.assert_not_called()
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,59 @@
+import threading
+import unittest
+
+from search_jobs import JobQueue, JobQueueFull
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+
+    def run_search(self, job, names):
+        job.record({"event": "area", "restaurants": names})
+        for name in names:
+            self.release.wait(5)
+            job.record({"event": "restaurant", "restaurant": {"name": name}, "available": True})
+
+    def test_job_reports_progress_and_results(self):
+        jobs = JobQueue(self.run_search, workers=1)
+        job, created = jobs.submit("key", ["Olle", "Bab n Sul"])
+        self.assertTrue(created)
+        self.release.set()
+        jobs._queue.join()
+        result = jobs.get(job.id).to_dict()
+        self.assertEqual(result["status"], "done")
+        self.assertEqual(result["progress"], {"checked": 2, "total": 2})
+        self.assertEqual([r["name"] for r in result["restaurants"]], ["Olle", "Bab n Sul"])
+
+    def test_identical_searches_share_a_job(self):
+        jobs = JobQueue(self.run_search, workers=1)
+        first, _ = jobs.submit("key", ["Olle"])
+        second, created = jobs.submit("key", ["Olle"])
+        self.assertIs(first, second)
+        self.assertFalse(created)
+        self.release.set()
+
+    def test_queue_depth_is_bounded(self):
+        jobs = JobQueue(self.run_search, workers=1, max_depth=1)
+        jobs.submit("running", ["Olle"])
+        # Wait until the worker has taken the first job off the queue
+        while jobs.depth():
+            pass
+        jobs.submit("waiting", ["Olle"])
+        with self.assertRaises(JobQueueFull):
+            jobs.submit("rejected", ["Olle"])
+        self.release.set()
+
+    def test_failed_job_reports_error(self):
+        def fail(job):
+            raise RuntimeError("Restaurant list is not ready yet")
+
+        jobs = JobQueue(fail, workers=1)
+        job, _ = jobs.submit("key")
+        jobs._queue.join()
+        self.assertEqual(job.to_dict()["status"], "failed")
+        self.assertEqual(job.to_dict()["error"], "Restaurant list is not ready yet")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,16 @@
+import io
+import os
+import tempfile
 import unittest
+from datetime import date
+from unittest.mock import MagicMock
 import requests
+from PIL import Image
+from selenium.common.exceptions import TimeoutException
 
-from selenium_ai import WebsiteWalker
+from model_gateway import ModelGateway
+from selenium_ai import TimeRange, WebsiteWalker
+from ttl_cache import TTLCache
 
 class TestRestaurantFilter(unittest.TestCase):
     """
@@ -45,6 +54,134 @@ class TestRestaurantFilter(unittest.TestCase):
         pass 
         # TODO: Implement this test case
 
-        
 
-        
+class TestWebsiteImage(unittest.TestCase):
+    """
+    These tests use a fake driver, so they do not need test_app.py running.
+    """
+
+    def setUp(self):
+        buffer = io.BytesIO()
+        Image.new("RGBA", (64, 48), (200, 30, 30, 255)).save(buffer, "PNG")
+        self.driver = MagicMock()
+        self.driver.get_screenshot_as_png.return_value = buffer.getvalue()
+        self.driver.execute_script.return_value = {"rects": [[10, 10, 30, 20]], "scale": 1}
+        self.walker = WebsiteWalker(driver=self.driver)
+
+    def test_image_is_compressed_in_memory(self):
+        image = self.walker._get_website_image()
+        self.assertEqual(Image.open(io.BytesIO(image)).format, "JPEG")
+        self.driver.save_screenshot.assert_not_called()
+        self.assertTrue(self.walker._encode_image_to_base64(image))
+        self.assertEqual(self.walker.last_image.estimated_tokens, 4 * 3 + 3)
+
+    def test_permanent_image_is_saved(self):
+        with tempfile.TemporaryDirectory() as directory:
+            save_path = os.path.join(directory, "olle.png")
+            self.walker._get_website_image(True, save_path)
+            self.assertTrue(os.path.exists(save_path))
+            self.assertTrue(os.path.exists(os.path.join(directory, "olle_compressed.jpg")))
+
+    def test_model_answer_reused_for_same_page(self):
+        client = MagicMock()
+        client.chat.complete.return_value.choices[0].message.content = \
+            '{"available_times": null, "next_button": "Book a table"}'
+        self.walker.gateway = ModelGateway(client=client)
+        self.walker.cascade = False
+        self.walker.response_cache = TTLCache()
+        time_range = TimeRange.for_day(date(2024, 5, 1))
+        first = self.walker._get_button_to_next_page_or_times(time_range)
+        second = self.walker._get_button_to_next_page_or_times(time_range)
+        self.walker.incorrect_button_labels = ["Book a table"]
+        self.walker._get_button_to_next_page_or_times(time_range)
+        self.assertEqual(first, {"available_times": None, "next_button": "Book a table"})
+        self.assertEqual(second, first)
+        # The second call was answered from the cache, the third tried other buttons
+        self.assertEqual(client.chat.complete.call_count, 2)
+
+    def test_empty_model_answer_is_not_cached(self):
+        client = MagicMock()
+        client.chat.complete.return_value.choices[0].message.content = \
+            '{"available_times": null, "next_button": null}'
+        self.walker.gateway = ModelGateway(client=client)
+        self.walker.cascade = False
+        self.walker.response_cache = TTLCache()
+        time_range = TimeRange.for_day(date(2024, 5, 1))
+        self.walker._get_button_to_next_page_or_times(time_range)
+        self.walker._get_button_to_next_page_or_times(time_range)
+        self.assertEqual(client.chat.complete.call_count, 2)
+        self.assertEqual(len(self.walker.response_cache), 0)
+
+    def test_cascade_answers_from_page_text(self):
+        client = MagicMock()
+        client.chat.complete.return_value.choices[0].message.content = \
+            '{"available_times": null, "next_button": "Book a table"}'
+        self.walker.gateway = ModelGateway(client=client)
+        self.driver.page_source = '<html><body><a href="/book">Book a table</a></body></html>'
+        result = self.walker._get_button_to_next_page_or_times(TimeRange.for_day(date(2024, 5, 1)))
+        self.assertEqual(result["next_button"], "Book a table")
+        self.assertEqual([c.kwargs["model"] for c in client.chat.complete.call_args_list], ["mistral-small-latest"])
+        self.assertIn("[link] Book a table", client.chat.complete.call_args.kwargs["messages"][0]["content"][0]["text"])
+        self.driver.get_screenshot_as_png.assert_not_called()
+
+    def test_cascade_escalates_to_vision(self):
+        client = MagicMock()
+        text_answer, image_answer = MagicMock(), MagicMock()
+        text_answer.choices[0].message.content = "I could not find anything"
+        image_answer.choices[0].message.content = '{"available_times": ["19:00"], "next_button": null}'
+        client.chat.complete.side_effect = [text_answer, image_answer]
+        self.walker.gateway = ModelGateway(client=client)
+        self.driver.page_source = '<html><body><canvas></canvas><a href="/menu">Menu</a></body></html>'
+        result = self.walker._get_button_to_next_page_or_times(TimeRange.for_day(date(2024, 5, 1)))
+        self.assertEqual(result["available_times"], ["19:00"])
+        self.assertEqual([c.kwargs["model"] for c in client.chat.complete.call_args_list],
+                         ["mistral-small-latest", "pixtral-12b-2409"])
+
+
+class TestWalkWebsite(unittest.TestCase):
+    """
+    Tests where the walk starts, with the page by page walk replaced.
+    """
+
+    def setUp(self):
+        self.walker = WebsiteWalker(driver=MagicMock())
+        self.walks = []
+
+    def fake_walk(self, times_found):
+        def walk(url, original_url, deadline, time_range, prenavigate=False):
+            self.walks.append((url, prenavigate))
+            if prenavigate:
+                self.walker.booking_link = "https://olle.co.uk/events"
+            return times_found.pop(0)
+        return walk
+
+    def test_wrong_booking_link_falls_back_to_the_website(self):
+        self.walker._walk = self.fake_walk([[], ["19:00"]])
+        self.assertEqual(self.walker.walk_website("https://olle.co.uk"), ["19:00"])
+        self.assertEqual(self.walks, [("https://olle.co.uk", True), ("https://olle.co.uk", False)])
+
+    def test_booking_link_with_times_is_not_walked_again(self):
+        self.walker._walk = self.fake_walk([["19:00"]])
+        self.assertEqual(self.walker.walk_website("https://olle.co.uk"), ["19:00"])
+        self.assertEqual(len(self.walks), 1)
+
+    def test_slow_page_is_stopped_and_walked(self):
+        driver = self.walker.driver
+        driver.get.side_effect = TimeoutException("Timed out receiving message from renderer")
+        self.walker._load_page("https://olle.co.uk")
+        driver.execute_script.assert_any_call("window.stop();")
+
+    def walk_cached_page(self, page_dict):
+        self.walker.cached_urls = {"https://olle.co.uk": "https://olle.co.uk/book"}
+        self.walker._load_page = MagicMock()
+        self.walker._close_popups = MagicMock()
+        self.walker._extract_from_page = MagicMock(return_value=None)
+        self.walker._get_button_to_next_page_or_times = MagicMock(return_value=page_dict)
+        self.walker.walk_website("https://olle.co.uk")
+        return self.walker.cached_urls
+
+    def test_cached_url_is_kept_when_the_model_fails(self):
+        self.assertEqual(self.walk_cached_page(None), {"https://olle.co.uk": "https://olle.co.uk/book"})
+
+    def test_cached_url_without_times_is_dropped(self):
+        self.assertEqual(self.walk_cached_page({}), {})
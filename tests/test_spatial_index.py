@@ -0,0 +1,48 @@
+import unittest
+
+from area_filter import AreaFilter
+from spatial_index import GridIndex
+
+
+def place(place_id, lng, lat):
+    return {"place_id": place_id, "name": place_id, "geometry": {"location": {"lat": lat, "lng": lng}}}
+
+
+class TestGridIndex(unittest.TestCase):
+    def setUp(self):
+        self.places = [
+            place("olle", -0.131557, 51.512069),
+            place("bab", -0.123894, 51.511878),
+            place("shitshack", -0.165975, 51.601460),
+        ]
+        self.index = GridIndex(cell_size=0.01)
+        self.index.update(self.places)
+        self.area = AreaFilter.from_ring([[-0.155975, 51.520064], [-0.121154, 51.519974],
+                                          [-0.120863, 51.500841], [-0.152187, 51.502201],
+                                          [-0.155975, 51.520064]])
+
+    def test_query_area(self):
+        self.assertEqual([p["place_id"] for p in self.index.query_area(self.area)], ["olle", "bab"])
+
+    def test_query_bbox_only_returns_places_in_box(self):
+        found = self.index.query_bbox(-0.14, 51.5, -0.13, 51.52)
+        self.assertEqual([item["place_id"] for item, _, _ in found], ["olle"])
+
+    def test_update_inserts_moves_and_removes(self):
+        self.index.update([
+            place("olle", -0.165975, 51.601460),
+            place("bab", -0.123894, 51.511878),
+            place("new", -0.14, 51.51),
+        ])
+        self.assertNotIn("shitshack", self.index)
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual([p["place_id"] for p in self.index.query_area(self.area)], ["bab", "new"])
+
+    def test_remove(self):
+        self.index.remove("olle")
+        self.index.remove("missing")
+        self.assertEqual([p["place_id"] for p in self.index.query_area(self.area)], ["bab"])
+
+
+if __name__ == "__main__":
+    unittest.main()
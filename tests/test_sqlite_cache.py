@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlite_cache import SqliteCache
+
+
+class TestSqliteCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_values_persist_across_instances(self):
+        cache = SqliteCache(self.path, "places")
+        cache.set("Olle", {"place_id": "abc"})
+        cache.close()
+        cache = SqliteCache(self.path, "places")
+        self.assertEqual(cache.get("Olle"), {"place_id": "abc"})
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 0, "size": 1})
+
+    def test_entries_expire(self):
+        cache = SqliteCache(self.path, "places", ttl=60)
+        with patch("sqlite_cache.time.time", return_value=1000):
+            cache.set("Olle", "abc")
+        with patch("sqlite_cache.time.time", return_value=1059):
+            self.assertEqual(cache.get("Olle"), "abc")
+        with patch("sqlite_cache.time.time", return_value=1061):
+            self.assertIsNone(cache.get("Olle"))
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = SqliteCache(self.path, "places", max_entries=2)
+        with patch("sqlite_cache.time.time", return_value=1):
+            cache.set("a", 1)
+        with patch("sqlite_cache.time.time", return_value=2):
+            cache.set("b", 2)
+        with patch("sqlite_cache.time.time", return_value=3):
+            cache.get("a")
+        with patch("sqlite_cache.time.time", return_value=4):
+            cache.set("c", 3)
+        self.assertEqual(sorted(key for key, _, _ in cache.items()), ["a", "c"])
+
+    def test_tables_are_independent(self):
+        ids = SqliteCache(self.path, "place_ids")
+        details = SqliteCache(self.path, "place_details")
+        ids.set("abc", 1)
+        self.assertIsNone(details.get("abc"))
+
+
+if __name__ == "__main__":
+    unittest.main()
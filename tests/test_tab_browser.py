@@ -0,0 +1,195 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from selenium.common.exceptions import WebDriverException
+
+from load_profile import LoadProfile
+from selenium_ai import WebsiteWalker
+from tab_browser import NAVIGATE_SCRIPT, READY_SCRIPT, TabBrowser
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        if handle not in self.driver.window_handles:
+            raise WebDriverException(f"No window {handle}")
+        self.driver.current_window_handle = handle
+
+    def new_window(self, kind):
+        self.driver.current_window_handle = self.driver.open_window()
+
+
+class FakeDriver:
+    """
+    Stands in for a Chrome WebDriver with tabs so the browser can be tested without Chrome.
+    """
+    def __init__(self, cdp=True):
+        self.handles = ["home"]
+        self.current_window_handle = "home"
+        self.switch_to = FakeSwitchTo(self)
+        self.cdp = cdp
+        self.contexts = set()
+        self.urls = {}
+        self.loading = set()
+        self.scripts = []
+        self.quit_called = False
+        self.crashed = False
+
+    @property
+    def window_handles(self):
+        if self.crashed:
+            raise WebDriverException("Browser crashed")
+        return list(self.handles)
+
+    def open_window(self):
+        handle = f"tab{len(self.urls) + 1}"
+        self.handles.append(handle)
+        self.urls[handle] = "about:blank"
+        return handle
+
+    def execute_cdp_cmd(self, command, params):
+        if command == "Target.createBrowserContext":
+            if not self.cdp:
+                raise WebDriverException("Unknown command")
+            context_id = f"context{len(self.contexts) + 1}"
+            self.contexts.add(context_id)
+            return {"browserContextId": context_id}
+        if command == "Target.createTarget":
+            return {"targetId": self.open_window()}
+        if command == "Target.disposeBrowserContext":
+            self.contexts.remove(params["browserContextId"])
+        return {}
+
+    def execute_script(self, script, *args):
+        handle = self.current_window_handle
+        self.scripts.append((handle, script))
+        if script == NAVIGATE_SCRIPT:
+            self.urls[handle] = args[0]
+            self.loading.add(handle)
+            return None
+        if script == READY_SCRIPT:
+            if handle in self.loading:
+                # The page finishes loading between two checks
+                self.loading.discard(handle)
+                return False
+            return True
+        return handle
+
+    @property
+    def current_url(self):
+        if self.crashed:
+            raise WebDriverException("Browser crashed")
+        return self.urls.get(self.current_window_handle)
+
+    def close(self):
+        self.handles.remove(self.current_window_handle)
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get_log(self, kind):
+        return []
+
+    def quit(self):
+        self.quit_called = True
+
+
+class TestTabBrowser(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+        def factory():
+            driver = FakeDriver()
+            self.created.append(driver)
+            return driver
+
+        self.browser = TabBrowser(tabs=2, max_uses=3, driver_factory=factory,
+                                  load_profile=LoadProfile(report=False), poll_interval=0.001)
+
+    def test_tabs_share_one_browser_in_their_own_contexts(self):
+        with self.browser.lease() as first, self.browser.lease() as second:
+            self.assertEqual(len(self.created), 1)
+            self.assertNotEqual(first.context_id, second.context_id)
+            # Each command runs in the tab it was sent from
+            self.assertEqual(first.execute_script("return 1"), first.handle)
+            first.release()
+            self.assertEqual(second.execute_script("return 1"), second.handle)
+            second.release()
+        driver = self.created[0]
+        self.assertEqual(driver.window_handles, ["home"])
+        self.assertEqual(driver.contexts, set())
+
+    def test_tab_waits_for_the_turn_until_the_other_tab_waits(self):
+        with self.browser.lease() as first, self.browser.lease() as second:
+            first.execute_script("return 1")
+            done = threading.Event()
+            thread = threading.Thread(target=lambda: (second.execute_script("return 1"), second.release(), done.set()))
+            thread.start()
+            self.assertFalse(done.wait(0.05))
+            with first.released():
+                self.assertTrue(done.wait(1))
+            thread.join()
+
+    def test_get_navigates_without_blocking_the_browser(self):
+        with self.browser.lease() as tab:
+            tab.get("https://bab.co.uk/")
+            self.assertEqual(tab.current_url, "https://bab.co.uk/")
+            scripts = [script for handle, script in self.created[0].scripts if handle == tab.handle]
+            self.assertEqual(scripts, [NAVIGATE_SCRIPT, READY_SCRIPT, READY_SCRIPT])
+
+    def test_window_handles_only_show_the_tabs_own_windows(self):
+        with self.browser.lease() as first, self.browser.lease() as second:
+            popup = self.created[0].open_window()
+            self.assertEqual(first.window_handles, [first.handle, popup])
+            first.switch_to.window(popup)
+            self.assertEqual(first.current_window_handle, popup)
+            first.release()
+            self.assertEqual(second.window_handles, [second.handle])
+            second.release()
+        self.assertEqual(self.created[0].window_handles, ["home"])
+
+    def test_falls_back_to_plain_tabs_without_browser_contexts(self):
+        browser = TabBrowser(tabs=1, driver_factory=lambda: FakeDriver(cdp=False),
+                             load_profile=LoadProfile(report=False))
+        with browser.lease() as tab:
+            self.assertIsNone(tab.context_id)
+            self.assertEqual(tab.handle, "tab1")
+
+    def test_browser_is_recycled_after_max_uses(self):
+        for _ in range(3):
+            with self.browser.lease():
+                pass
+        self.assertTrue(self.created[0].quit_called)
+        with self.browser.lease():
+            self.assertEqual(len(self.created), 2)
+
+    def test_page_error_keeps_the_browser(self):
+        with self.assertRaises(WebDriverException):
+            with self.browser.lease():
+                raise WebDriverException("Element not interactable")
+        with self.browser.lease():
+            self.assertEqual(len(self.created), 1)
+
+    def test_crashed_browser_is_restarted(self):
+        with self.assertRaises(WebDriverException):
+            with self.browser.lease() as tab:
+                self.created[0].crashed = True
+                tab.current_url
+        self.assertTrue(self.created[0].quit_called)
+        with self.browser.lease():
+            self.assertEqual(len(self.created), 2)
+
+    def test_walker_releases_the_browser_while_waiting_on_the_model(self):
+        with self.browser.lease() as tab:
+            tab.execute_script("return 1")
+            gateway = MagicMock(request_timeout=10, max_retries=0)
+            gateway.complete.side_effect = lambda *args, **kwargs: self.browser._browser.turn.locked()
+            walker = WebsiteWalker(driver=tab, gateway=gateway)
+            self.assertFalse(walker._ask_model("model", []))
+
+
+if __name__ == '__main__':
+    unittest.main()
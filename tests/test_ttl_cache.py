@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlite_cache import SqliteCache
+from ttl_cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_entries_expire(self):
+        cache = TTLCache(ttl=60)
+        with patch("ttl_cache.time.time", return_value=1000):
+            cache.set("key", ["19:00"])
+        with patch("ttl_cache.time.time", return_value=1060):
+            self.assertEqual(cache.get_entry("key"), (["19:00"], 1000))
+        with patch("ttl_cache.time.time", return_value=1061):
+            self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "size": 0})
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_persistent_tier_is_shared(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "cache.sqlite3")
+            first = TTLCache(persistent=SqliteCache(path, "availability"))
+            second = TTLCache(persistent=SqliteCache(path, "availability"))
+            first.set("key", ["19:00"])
+            self.assertEqual(second.get("key"), ["19:00"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+import unittest
+
+from selenium.common.exceptions import WebDriverException
+
+from walker_farm import CRASH, NO_TIMES, TIMEOUT, TIMES, WalkerFarm
+
+
+class FakeWalker:
+    """
+    Stands in for a WebsiteWalker so workers can be tested without a browser.
+    The website decides what the walk does.
+    """
+    def __init__(self, max_depth):
+        self.max_depth = max_depth
+        self.cached_urls = {}
+
+    def walk_website(self, url, deadline=None, time_range=None, start_url=None):
+        if url == "times":
+            self.cached_urls[url] = start_url or "times/book"
+            return ["19:30"]
+        if url == "hang":
+            time.sleep(60)
+        if url == "deadline":
+            time.sleep(max(0, deadline - time.monotonic()) + 0.01)
+            return []
+        if url == "crash":
+            raise WebDriverException("Renderer crashed")
+        if url == "exit":
+            os._exit(1)
+        if url == "pid":
+            return [str(os.getpid())]
+        return []
+
+    def _close(self):
+        pass
+
+
+class TestWalkerFarm(unittest.TestCase):
+    def setUp(self):
+        self.farm = WalkerFarm(workers=1, max_jobs=2, kill_grace=0.5, walker_factory=FakeWalker, start_method="fork")
+
+    def tearDown(self):
+        self.farm.shutdown()
+
+    def test_times_found(self):
+        result = self.farm.walk("times", start_url="times/reserve")
+        self.assertEqual(result["outcome"], TIMES)
+        self.assertEqual(result["available_times"], ["19:30"])
+        self.assertEqual(result["reservation_url"], "times/reserve")
+
+    def test_no_times_found(self):
+        result = self.farm.walk("none")
+        self.assertEqual(result["outcome"], NO_TIMES)
+        self.assertEqual(result["available_times"], [])
+
+    def test_walk_stopped_at_its_deadline_is_a_timeout(self):
+        result = self.farm.walk("deadline", timeout=0.1)
+        self.assertEqual(result["outcome"], TIMEOUT)
+
+    def test_hung_worker_is_killed(self):
+        result = self.farm.walk("hang", timeout=0.1)
+        self.assertEqual(result["outcome"], TIMEOUT)
+        self.assertLess(result["elapsed"], 5)
+        self.assertEqual(self.farm.walk("times")["outcome"], TIMES)
+        self.assertEqual(self.farm.stats()["workers_started"], 2)
+
+    def test_waiting_for_a_worker_counts_against_the_timeout(self):
+        busy = threading.Thread(target=self.farm.walk, args=("hang",), kwargs={"timeout": 0.5})
+        busy.start()
+        time.sleep(0.05)
+        result = self.farm.walk("times", timeout=0.1)
+        self.assertEqual(result["outcome"], TIMEOUT)
+        self.assertLess(result["elapsed"], 0.5)
+        busy.join()
+
+    def test_crashed_walker_is_replaced(self):
+        result = self.farm.walk("crash")
+        self.assertEqual(result["outcome"], CRASH)
+        self.assertIn("Renderer crashed", result["error"])
+        self.assertEqual(self.farm.walk("times")["outcome"], TIMES)
+        self.assertEqual(self.farm.stats()["workers_started"], 2)
+
+    def test_dead_worker_is_a_crash(self):
+        self.assertEqual(self.farm.walk("exit")["outcome"], CRASH)
+        self.assertEqual(self.farm.walk("none")["outcome"], NO_TIMES)
+
+    def test_worker_is_restarted_after_max_jobs(self):
+        first = self.farm.walk("pid")["available_times"]
+        second = self.farm.walk("pid")["available_times"]
+        third = self.farm.walk("pid")["available_times"]
+        self.assertEqual(first, second)
+        self.assertNotEqual(second, third)
+
+    def test_stats_count_outcomes(self):
+        self.farm.walk("times")
+        self.farm.walk("none")
+        self.farm.walk("none")
+        self.assertEqual(self.farm.stats()["outcomes"], {TIMES: 1, NO_TIMES: 2, TIMEOUT: 0, CRASH: 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    This class is an in-memory least recently used cache whose entries expire
+    after ttl seconds. An optional SqliteCache can be given as a second tier,
+    shared between processes, which is read on a memory miss and written
+    through on every set.
+    """
+
+    def __init__(self, ttl=300, max_entries=512, persistent=None):
+        """
+        :param ttl: Seconds an entry stays valid.
+        :param max_entries: The maximum number of entries kept in memory.
+        :param persistent: Optional SqliteCache used as the shared tier.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key):
+        """
+        Gets an entry along with the time.time() it was stored.
+
+        :param key: The key of the entry, a string if a persistent tier is used.
+        :return: A (value, stored_at) tuple if found and not expired, otherwise None.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self._entries.pop(key, None)
+        if self.persistent is not None:
+            entry = self.persistent.get_entry(key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self._remember(key, entry)
+                with self._lock:
+                    self.hits += 1
+                return entry
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value):
+        """
+        Stores a value, evicting the least recently used entry if the cache is full.
+
+        :return: The time.time() the value was stored at.
+        """
+        stored_at = time.time()
+        self._remember(key, (value, stored_at))
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+        return stored_at
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.persistent is not None:
+            self.persistent.delete(key)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """
+        :return: A dictionary with the hit and miss counters and the number of entries in memory.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
@@ -0,0 +1,291 @@
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from functools import partial
+from queue import Queue, Empty
+
+from selenium.common.exceptions import WebDriverException
+
+from model_gateway import gateway_from_env
+from selenium_ai import WebsiteWalker
+from sqlite_cache import SqliteCache
+from ttl_cache import TTLCache
+
+# Configure logging
+logging.basicConfig(filename='all.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# The outcomes of a walk
+TIMES = "times"
+NO_TIMES = "no_times"
+TIMEOUT = "timeout"
+CRASH = "crash"
+OUTCOMES = [TIMES, NO_TIMES, TIMEOUT, CRASH]
+
+
+def _start_walker(driver_path, headless, workers, response_cache_path, response_cache_ttl, max_depth):
+    """
+    Starts the walker of a worker, which owns its browser. The worker gets
+    its share of the model rate limits, and model answers are shared with
+    the other workers through the SQLite response cache if there is one.
+    """
+    response_cache = None
+    if response_cache_path:
+        response_cache = TTLCache(ttl=response_cache_ttl,
+                                  persistent=SqliteCache(response_cache_path, "model_responses", ttl=response_cache_ttl))
+    return WebsiteWalker(driver_path=driver_path, headless=headless, max_depth=max_depth,
+                         gateway=gateway_from_env(share=workers), response_cache=response_cache)
+
+
+def _run_job(walker_factory, walker, job, max_depth):
+    """
+    Walks one website inside a worker.
+
+    :return: A (walker, result) tuple, the walker is started on the first job.
+    """
+    deadline = time.monotonic() + job["timeout"]
+    url = job["url"]
+    try:
+        if walker is None:
+            walker = walker_factory(max_depth)
+        walker.cached_urls = {url: job["reservation_url"]} if job.get("reservation_url") else {}
+        available_times = walker.walk_website(url, deadline=deadline, time_range=job.get("time_range"),
+                                              start_url=job.get("start_url"))
+    except Exception as e:
+        logging.warning(f"Walker worker {os.getpid()} crashed walking {url}: {e}")
+        return walker, {"outcome": CRASH, "available_times": [], "reservation_url": None, "error": str(e)}
+    if available_times:
+        outcome = TIMES
+    elif time.monotonic() > deadline:
+        outcome = TIMEOUT
+    else:
+        outcome = NO_TIMES
+    return walker, {"outcome": outcome, "available_times": list(available_times or []),
+                    "reservation_url": walker.cached_urls.get(url)}
+
+
+def _worker_main(conn, walker_factory, max_depth):
+    """
+    Runs in a worker process: walks the websites sent over the pipe until it
+    is told to stop, the supervisor goes away or its browser crashes.
+    """
+    if hasattr(os, "setpgrp"):
+        # Chromedriver and Chrome join the worker's process group, so killing the group cleans them up
+        os.setpgrp()
+    walker = None
+    try:
+        while True:
+            job = conn.recv()
+            if job is None:
+                break
+            walker, result = _run_job(walker_factory, walker, job, max_depth)
+            conn.send(result)
+            if result["outcome"] == CRASH:
+                # Start again with a fresh browser rather than trust this one
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        if walker is not None:
+            try:
+                walker._close()
+            except (WebDriverException, OSError) as e:
+                logging.warning(f"An error occurred while closing the walker of worker {os.getpid()}: {e}")
+
+
+class _Worker:
+    """
+    A worker process along with its end of the pipe and how many jobs it has run.
+    """
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.jobs = 0
+        self.dead = False
+
+
+class WalkerFarm:
+    """
+    This class walks websites in worker processes, each owning its browser,
+    so a hung chromedriver or a crashed renderer only costs that worker.
+    Every website gets a wall-clock and a step budget. A worker that overruns
+    its budget is killed along with its browser, and workers are restarted
+    after max_jobs walks to contain memory leaks. Each walk reports whether
+    it found times, found none, timed out or crashed.
+    """
+
+    def __init__(self, workers=2, site_timeout=90, max_steps=5, max_jobs=20, kill_grace=5, driver_path='/opt/homebrew/bin/chromedriver', headless=True, response_cache_path=None, response_cache_ttl=24 * 3600, walker_factory=None, start_method=None):
+        """
+        :param workers: The maximum number of worker processes alive at the same time.
+        :param site_timeout: Seconds each website is given by default.
+        :param max_steps: The maximum number of steps taken on a website.
+        :param max_jobs: The number of walks after which a worker is restarted.
+        :param kill_grace: Seconds a walk may overrun its timeout before its worker is killed.
+        :param driver_path: The path to the chromedriver binary.
+        :param headless: If True, Chrome is started without a window.
+        :param response_cache_path: Optional SQLite file of model answers shared by the workers.
+        :param response_cache_ttl: Seconds a model answer is kept.
+        :param walker_factory: Optional picklable callable taking max_steps and returning a walker.
+        :param start_method: The multiprocessing start method, defaults to the platform's.
+        """
+        if workers < 1:
+            raise ValueError("Number of workers must be at least 1.")
+        self.workers = workers
+        self.site_timeout = site_timeout
+        self.max_steps = max_steps
+        self.max_jobs = max_jobs
+        self.kill_grace = kill_grace
+        self.walker_factory = walker_factory or partial(_start_walker, driver_path, headless, workers,
+                                                      response_cache_path, response_cache_ttl)
+        self.context = multiprocessing.get_context(start_method)
+        self._idle = Queue()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self._all = set()
+        self._closed = False
+        self._outcomes = {outcome: 0 for outcome in OUTCOMES}
+        self._started = 0
+
+    def _start_worker(self):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=_worker_main, args=(child_conn, self.walker_factory, self.max_steps),
+                                       daemon=True)
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        with self._lock:
+            self._all.add(worker)
+            self._started += 1
+        logging.info(f"Walker farm started worker {process.pid} ({len(self._all)}/{self.workers}).")
+        return worker
+
+    def _kill(self, worker):
+        worker.dead = True
+        try:
+            os.killpg(worker.process.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError, PermissionError):
+            # The worker has not made its own process group yet, or the platform has none
+            worker.process.kill()
+        worker.process.join(timeout=self.kill_grace)
+
+    def _discard(self, worker):
+        with self._lock:
+            self._all.discard(worker)
+        if not worker.dead:
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        # A worker quits its browser before exiting, one that takes too long is killed
+        worker.process.join(timeout=self.kill_grace)
+        if worker.process.is_alive():
+            self._kill(worker)
+        worker.conn.close()
+
+    def _acquire(self, timeout):
+        if self._closed:
+            raise RuntimeError("Walker farm has been shut down.")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Timed out waiting for a free walker.")
+        try:
+            try:
+                return self._idle.get_nowait()
+            except Empty:
+                return self._start_worker()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, worker):
+        try:
+            if worker.dead or not worker.process.is_alive() or self._closed:
+                self._discard(worker)
+            elif worker.jobs >= self.max_jobs:
+                logging.info(f"Restarting walker worker {worker.process.pid} after {worker.jobs} jobs.")
+                self._discard(worker)
+            else:
+                self._idle.put(worker)
+        finally:
+            self._slots.release()
+
+    def _run(self, worker, job, deadline):
+        """
+        Runs a job on a worker with the time left until the deadline, killing
+        the worker if it does not answer in time.
+        """
+        url = job["url"]
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            return {"outcome": TIMEOUT, "available_times": [], "reservation_url": None}
+        try:
+            worker.jobs += 1
+            worker.conn.send(dict(job, timeout=timeout))
+            # The walker stops itself at the deadline, the grace covers a hung browser
+            if worker.conn.poll(timeout + self.kill_grace):
+                result = worker.conn.recv()
+                if result["outcome"] == CRASH:
+                    worker.dead = True
+                return result
+            logging.warning(f"Killing walker worker {worker.process.pid}, {url} overran {timeout:.1f}s.")
+            self._kill(worker)
+            return {"outcome": TIMEOUT, "available_times": [], "reservation_url": None}
+        except (EOFError, OSError) as e:
+            logging.warning(f"Walker worker {worker.process.pid} died walking {url}: {e}")
+            self._kill(worker)
+            return {"outcome": CRASH, "available_times": [], "reservation_url": None, "error": str(e)}
+
+    def walk(self, url, time_range=None, start_url=None, reservation_url=None, timeout=None):
+        """
+        Walks a website in a worker process.
+
+        :param url: The website to walk.
+        :param time_range: The TimeRange to look for, defaults to today.
+        :param start_url: Optional booking page to start on.
+        :param reservation_url: Optional reservation page found by an earlier walk.
+        :param timeout: Seconds the website is given, defaults to site_timeout.
+                        Waiting for a free worker counts against it.
+        :return: A dictionary with the "outcome", one of OUTCOMES, the
+                 "available_times", the "reservation_url" the times were found
+                 on and the seconds "elapsed".
+        """
+        timeout = self.site_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        job = {"url": url, "time_range": time_range, "start_url": start_url, "reservation_url": reservation_url}
+        try:
+            worker = self._acquire(max(0, deadline - time.monotonic()))
+        except TimeoutError:
+            logging.warning(f"No walker worker was free before the deadline of {url}.")
+            result = {"outcome": TIMEOUT, "available_times": [], "reservation_url": None}
+        else:
+            try:
+                result = self._run(worker, job, deadline)
+            finally:
+                self._release(worker)
+        result["elapsed"] = round(time.monotonic() - started, 3)
+        with self._lock:
+            self._outcomes[result["outcome"]] += 1
+        logging.info(f"Walked {url}: {result['outcome']} in {result['elapsed']}s")
+        return result
+
+    def stats(self):
+        """
+        :return: The number of walks by outcome, the workers alive and the workers started.
+        """
+        with self._lock:
+            return {"outcomes": dict(self._outcomes), "workers": len(self._all), "workers_started": self._started}
+
+    def shutdown(self):
+        """
+        Stops every idle worker. Busy workers are stopped when their walk ends.
+        """
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except Empty:
+                break
+            self._discard(worker)
+        logging.info("Walker farm shut down.")